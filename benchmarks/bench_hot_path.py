@@ -0,0 +1,301 @@
+"""
+Micro-benchmarks for the reaction hot path
+
+Drives RoleHandler.handle_reaction, scan_channel_roles and create_roles with
+synthetic RawReactionActionEvent payloads against stub guilds of 1k, 10k and
+100k members. Runs fully offline and writes the results as JSON so runs from
+different commits can be compared.
+
+Usage:
+    python benchmarks/bench_hot_path.py
+    python benchmarks/bench_hot_path.py --sizes 1000 10000 --events 5000
+    python benchmarks/bench_hot_path.py --compare benchmarks/results/<old>.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Keep the benchmark's registry out of the real data directory and flush edits immediately
+os.environ["REGISTRY_PATH"] = os.path.join(tempfile.mkdtemp(prefix="rolebot-bench-"), "registry.db")
+os.environ["ROLE_EDIT_DEBOUNCE"] = "0"
+
+from config.config import ROLE_CATEGORIES  # noqa: E402
+from handlers.role_handler import RoleHandler  # noqa: E402
+from stubs import StubBot, StubGuild, StubMessage, reaction_payload  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+ROLE_COUNT = 300
+
+
+def percentiles(samples_ns):
+    """
+    Summarises latency samples (nanoseconds) as microsecond percentiles
+    """
+    ordered = sorted(samples_ns)
+    if not ordered:
+        return {}
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] / 1000
+
+    return {
+        "p50_us": round(pick(0.50), 2),
+        "p90_us": round(pick(0.90), 2),
+        "p99_us": round(pick(0.99), 2),
+        "max_us": round(ordered[-1] / 1000, 2),
+    }
+
+
+def config_role_names():
+    return [role_name for data in ROLE_CATEGORIES.values() for role_name in data["roles"].values()]
+
+
+def build_environment(member_count):
+    """
+    Creates a bot, a guild with the configured roles and one role message per category
+    """
+    bot = StubBot()
+    guild = StubGuild(member_count, ROLE_COUNT, bot.user)
+    bot.add_guild(guild)
+
+    handler = RoleHandler(bot)
+    for role_name in config_role_names():
+        if handler.role_index.get(guild, role_name) is None:
+            guild._add_role(role_name)
+    handler.role_index.invalidate(guild.id)
+
+    guild.assign_random_roles(config_role_names(), per_member=3)
+
+    channel = guild.add_channel("role-selection")
+    messages = []
+    for category, data in ROLE_CATEGORIES.items():
+        message = StubMessage(channel, bot.user, data["title"], data["roles"].keys())
+        channel.messages.append(message)
+        handler.register_message(message, category)
+        messages.append((message, list(data["roles"].keys())))
+
+    return bot, guild, handler, channel, messages
+
+
+def build_payloads(guild, channel, messages, count, seed=1):
+    rng = random.Random(seed)
+    members = [member for member in guild.members if member is not guild.me]
+    payloads = []
+    for _ in range(count):
+        message, emojis = rng.choice(messages)
+        member = rng.choice(members)
+        add = rng.random() < 0.7
+        payloads.append(reaction_payload(
+            message.id, channel.id, guild.id, member.id, rng.choice(emojis), add=add, member=member
+        ))
+    return payloads
+
+
+async def drain(handler):
+    """
+    Waits until every queued role change has been flushed
+    """
+    while handler.role_edits.pending_count or handler.role_edits._tasks:
+        await asyncio.sleep(0)
+        if handler.role_edits._tasks:
+            await asyncio.gather(*list(handler.role_edits._tasks))
+
+
+async def bench_handle_reaction(member_count, event_count):
+    bot, guild, handler, channel, messages = build_environment(member_count)
+    payloads = build_payloads(guild, channel, messages, event_count)
+
+    # Warm the role index and code paths
+    for payload in payloads[:100]:
+        await handler.handle_reaction(payload, add=payload.event_type == "REACTION_ADD")
+    await drain(handler)
+
+    samples = []
+    gc.collect()
+    started = time.perf_counter()
+    for payload in payloads:
+        before = time.perf_counter_ns()
+        await handler.handle_reaction(payload, add=payload.event_type == "REACTION_ADD")
+        samples.append(time.perf_counter_ns() - before)
+    dispatched = time.perf_counter() - started
+    await drain(handler)
+    total = time.perf_counter() - started
+
+    # Allocation pass, separate so tracemalloc overhead doesn't skew the timings
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    allocation_payloads = payloads[:min(len(payloads), 2000)]
+    for payload in allocation_payloads:
+        await handler.handle_reaction(payload, add=payload.event_type == "REACTION_ADD")
+    await drain(handler)
+    snapshot_after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = snapshot_after.compare_to(snapshot_before, "filename")
+    allocated = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    allocation_count = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+
+    return {
+        "events": event_count,
+        "events_per_s": round(event_count / dispatched, 1),
+        "end_to_end_events_per_s": round(event_count / total, 1),
+        "latency": percentiles(samples),
+        "alloc_bytes_per_event": round(allocated / len(allocation_payloads), 1),
+        "alloc_blocks_per_event": round(allocation_count / len(allocation_payloads), 2),
+        "alloc_peak_bytes": peak,
+        "rest_calls": dict(handler.rest.calls),
+    }
+
+
+async def bench_scan_channel(member_count, scans):
+    bot, guild, handler, channel, messages = build_environment(member_count)
+
+    # Pad the channel so the first scan reads a full page of history
+    for _ in range(100 - len(channel.messages)):
+        channel.messages.insert(0, StubMessage(channel, guild.me))
+
+    samples = []
+    first = time.perf_counter_ns()
+    await handler.scan_channel_roles(channel, full=True)
+    samples_full = [time.perf_counter_ns() - first]
+
+    for _ in range(scans):
+        before = time.perf_counter_ns()
+        await handler.scan_channel_roles(channel)
+        samples.append(time.perf_counter_ns() - before)
+
+    for _ in range(scans - 1):
+        before = time.perf_counter_ns()
+        await handler.scan_channel_roles(channel, full=True)
+        samples_full.append(time.perf_counter_ns() - before)
+
+    return {
+        "scans": scans,
+        "incremental": percentiles(samples),
+        "full_page": percentiles(samples_full),
+    }
+
+
+async def bench_create_roles(member_count, runs):
+    bot, guild, handler, channel, messages = build_environment(member_count)
+
+    # Steady state: every configured role already exists
+    samples = []
+    for _ in range(runs):
+        before = time.perf_counter_ns()
+        await handler.create_roles(guild)
+        samples.append(time.perf_counter_ns() - before)
+
+    # Fresh guild: every configured role has to be created
+    fresh_samples = []
+    for _ in range(max(1, runs // 10)):
+        fresh_bot = StubBot()
+        fresh_guild = StubGuild(0, ROLE_COUNT, fresh_bot.user)
+        fresh_bot.add_guild(fresh_guild)
+        fresh_handler = RoleHandler(fresh_bot)
+        before = time.perf_counter_ns()
+        await fresh_handler.create_roles(fresh_guild)
+        fresh_samples.append(time.perf_counter_ns() - before)
+
+    return {
+        "runs": runs,
+        "existing_roles": percentiles(samples),
+        "fresh_guild": percentiles(fresh_samples),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(sizes, events, scans, runs):
+    results = {}
+    for size in sizes:
+        print(f"Benchmarking guild with {size:,} members...")
+        results[str(size)] = {
+            "handle_reaction": await bench_handle_reaction(size, events),
+            "scan_channel_roles": await bench_scan_channel(size, scans),
+            "create_roles": await bench_create_roles(size, runs),
+        }
+    return results
+
+
+def print_results(results, baseline=None):
+    for size, benches in results.items():
+        reaction = benches["handle_reaction"]
+        line = (
+            f"{int(size):>8,} members  handle_reaction: {reaction['events_per_s']:>10,.0f} ev/s  "
+            f"p50 {reaction['latency']['p50_us']:>7.1f}us  p99 {reaction['latency']['p99_us']:>8.1f}us  "
+            f"{reaction['alloc_bytes_per_event']:>8.0f} B/ev"
+        )
+        if baseline and size in baseline:
+            old = baseline[size]["handle_reaction"]["events_per_s"]
+            line += f"  ({(reaction['events_per_s'] - old) / old:+.1%} vs baseline)"
+        print(line)
+        print(
+            f"{'':>17}scan_channel_roles: incremental p50 {benches['scan_channel_roles']['incremental']['p50_us']:.1f}us, "
+            f"full page p50 {benches['scan_channel_roles']['full_page']['p50_us']:.1f}us"
+        )
+        print(
+            f"{'':>17}create_roles: existing p50 {benches['create_roles']['existing_roles']['p50_us']:.1f}us, "
+            f"fresh guild p50 {benches['create_roles']['fresh_guild']['p50_us']:.1f}us"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the role bot's reaction hot path")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="guild member counts")
+    parser.add_argument("--events", type=int, default=20_000, help="reaction events per guild size")
+    parser.add_argument("--scans", type=int, default=200, help="channel scans per guild size")
+    parser.add_argument("--runs", type=int, default=200, help="create_roles runs per guild size")
+    parser.add_argument("--output", help="where to write the JSON results")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.sizes, args.events, args.scans, args.runs))
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"events": args.events, "scans": args.scans, "runs": args.runs, "roles": ROLE_COUNT},
+        "results": results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    print_results(results, baseline)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
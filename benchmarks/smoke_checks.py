@@ -0,0 +1,131 @@
+"""
+Offline smoke checks for commands and handlers
+
+Drives cog commands and concurrency-sensitive handler paths against the stub
+guilds used by the benchmarks, and exits with a nonzero code if any check
+fails. Needs no bot token.
+
+Usage:
+    python benchmarks/smoke_checks.py
+    python benchmarks/smoke_checks.py role_stats
+"""
+import argparse
+import asyncio
+import sys
+import traceback
+
+from bench_hot_path import build_environment
+
+CHECKS = {}
+
+
+def check(func):
+    """
+    Registers a check under its function name
+    """
+    CHECKS[func.__name__.removeprefix("check_")] = func
+    return func
+
+
+class StubContext:
+    """
+    Just enough of commands.Context for the cogs' callbacks
+    """
+    def __init__(self, bot, guild, channel):
+        self.bot = bot
+        self.guild = guild
+        self.channel = channel
+        self.clean_prefix = "!"
+        self.sent = []  # (content, kwargs) of every reply
+
+    async def defer(self):
+        pass
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+
+
+@check
+async def check_role_stats():
+    from commands.stats import Stats
+
+    bot, guild, handler, channel, _ = build_environment(500)
+    bot.role_handler = handler
+    cog = Stats(bot)
+    categories = list(handler.catalog_for(guild.id))
+
+    ctx = StubContext(bot, guild, channel)
+    await cog.role_stats.callback(cog, ctx)
+    embed = ctx.sent[-1][1].get("embed")
+    assert embed is not None and embed.fields, f"role_stats sent no embed: {ctx.sent}"
+
+    ctx = StubContext(bot, guild, channel)
+    await cog.role_stats.callback(cog, ctx, categories[0], categories[1])
+    content = ctx.sent[-1][0]
+    assert content and content.startswith("📊") and "```" in content, f"role_stats cross-tab failed: {content}"
+
+    ctx = StubContext(bot, guild, channel)
+    await cog.role_stats_csv.callback(cog, ctx)
+    file = ctx.sent[-1][1].get("file")
+    assert file is not None and file.filename == "role_stats.csv", f"role_stats_csv sent no file: {ctx.sent}"
+
+
+@check
+async def check_member_lock():
+    bot, guild, handler, _, _ = build_environment(50)
+    batcher = handler.role_edits
+    member = next(member for member in guild.members if member is not guild.me)
+    key = (guild.id, member.id)
+    roles = [role for role in guild.roles[1:] if role.id not in member._roles][:4]
+
+    # Slow edits so the callers overlap, counting edits in flight at once
+    in_flight = []
+    overlaps = []
+    edit = member.edit
+
+    async def slow_edit(**kwargs):
+        in_flight.append(None)
+        overlaps.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        await edit(**kwargs)
+        in_flight.pop()
+    member.edit = slow_edit
+
+    async def late_apply():
+        # Arrives once the first edit is done and the second caller holds the lock
+        await asyncio.sleep(0.015)
+        await batcher.apply_now(member, {roles[3].id}, set())
+
+    batcher.queue(member, roles[2])
+    await asyncio.gather(
+        batcher.apply_now(member, {roles[0].id}, set()),
+        batcher.apply_now(member, {roles[1].id}, set()),
+        batcher.flush(key),
+        late_apply()
+    )
+
+    assert max(overlaps) == 1, f"member edits ran concurrently: {overlaps}"
+    assert {role.id for role in roles} <= set(member._roles), f"changes were lost: {member._roles}"
+    assert key not in batcher._locks, "member lock was not released"
+    assert not batcher.is_busy(guild.id, member.id), "member still busy after every caller finished"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run offline smoke checks against stub guilds")
+    parser.add_argument("checks", nargs="*", choices=[[]] + list(CHECKS), help="checks to run (default: all)")
+    args = parser.parse_args()
+
+    failed = 0
+    for name in args.checks or CHECKS:
+        try:
+            asyncio.run(CHECKS[name]())
+            print(f"PASS {name}")
+        except Exception:
+            failed += 1
+            print(f"FAIL {name}")
+            traceback.print_exc()
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
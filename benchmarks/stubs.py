@@ -0,0 +1,299 @@
+"""
+Offline stand-ins for the discord.py objects the role handler touches
+
+They implement just enough of the Guild, Member, Role, Channel and Message
+interfaces for the benchmarks to drive RoleHandler without a gateway
+connection or any REST calls.
+"""
+import functools
+import itertools
+import random
+from typing import Dict, List
+
+import discord
+
+_ids = itertools.count(10**17)
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+@functools.total_ordering
+class StubRole:
+    def __init__(self, guild, name: str, position: int, color: discord.Color = None):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.position = position
+        self.color = color or discord.Color.default()
+        self.mentionable = True
+
+    def __repr__(self):
+        return f"<StubRole {self.name}>"
+
+    # Ordered like discord.Role: by position, then by ID
+    def __eq__(self, other):
+        return isinstance(other, StubRole) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __lt__(self, other):
+        return (self.position, self.id) < (other.position, other.id)
+
+    async def edit(self, color=None, mentionable=None, **kwargs):
+        if color is not None:
+            self.color = color
+        if mentionable is not None:
+            self.mentionable = mentionable
+        return self
+
+
+class StubMember:
+    def __init__(self, guild, member_id: int):
+        self.id = member_id
+        self.guild = guild
+        self.bot = False
+        self._roles = []  # Role IDs, like discord.Member._roles
+
+    @property
+    def roles(self) -> List[StubRole]:
+        return [self.guild.default_role] + [self.guild._roles[role_id] for role_id in self._roles]
+
+    @property
+    def top_role(self) -> StubRole:
+        return max(self.roles)
+
+    def get_role(self, role_id):
+        return self.guild._roles.get(role_id) if role_id in self._roles else None
+
+    async def edit(self, roles=None, **kwargs):
+        if roles is not None:
+            self._roles = [role.id for role in roles]
+        return self
+
+    async def add_roles(self, *roles, **kwargs):
+        self._roles = list(dict.fromkeys(self._roles + [role.id for role in roles]))
+
+    async def remove_roles(self, *roles, **kwargs):
+        removed = {role.id for role in roles}
+        self._roles = [role_id for role_id in self._roles if role_id not in removed]
+
+
+class StubEmbed:
+    def __init__(self, title: str):
+        self.title = title
+        self.description = None
+        self.color = None
+
+
+class StubReaction:
+    def __init__(self, emoji: str, me: bool = True):
+        self.emoji = emoji
+        self.me = me
+
+
+class StubMessage:
+    def __init__(self, channel, author, title=None, emojis=()):
+        self.id = next_id()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.embeds = [StubEmbed(title)] if title else []
+        self.reactions = [StubReaction(emoji) for emoji in emojis]
+        self.components = []
+
+    async def add_reaction(self, emoji):
+        self.reactions.append(StubReaction(emoji))
+
+    async def remove_reaction(self, emoji, member):
+        pass
+
+    async def clear_reaction(self, emoji):
+        self.reactions = [reaction for reaction in self.reactions if reaction.emoji != emoji]
+
+    async def edit(self, embed=None, **kwargs):
+        if embed is not None:
+            self.embeds = [embed]
+
+
+class StubChannel:
+    def __init__(self, guild, name: str):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.messages = []  # Oldest first
+
+    @property
+    def mention(self):
+        return f"<#{self.id}>"
+
+    def permissions_for(self, member):
+        return discord.Permissions.all()
+
+    async def send(self, embed=None, **kwargs):
+        message = StubMessage(self, self.guild.me)
+        message.embeds = [embed] if embed else []
+        self.messages.append(message)
+        return message
+
+    def get_partial_message(self, message_id):
+        for message in self.messages:
+            if message.id == message_id:
+                return message
+        return StubMessage(self, self.guild.me)
+
+    async def fetch_message(self, message_id):
+        for message in self.messages:
+            if message.id == message_id:
+                return message
+        raise LookupError(message_id)
+
+    async def history(self, limit=100, after=None, before=None, oldest_first=None):
+        messages = self.messages
+        if after is not None:
+            messages = [m for m in messages if m.id > after.id]
+        else:
+            messages = list(reversed(messages))
+            if before is not None:
+                messages = [m for m in messages if m.id < before.id]
+        for message in messages if limit is None else messages[:limit]:
+            yield message
+
+
+class StubGuild:
+    def __init__(self, member_count: int, role_count: int, bot_user):
+        self.id = next_id()
+        self.name = f"bench-{member_count}"
+        self.unavailable = False
+        self.chunked = True  # Every member is cached
+        self.default_role = StubRole(self, "@everyone", 0)
+        self._roles: Dict[int, StubRole] = {self.default_role.id: self.default_role}
+        self._members: Dict[int, StubMember] = {}
+        self.text_channels: List[StubChannel] = []
+
+        for position in range(1, role_count + 1):
+            self._add_role(f"filler-{position}")
+
+        for _ in range(member_count):
+            member = StubMember(self, next_id())
+            self._members[member.id] = member
+
+        self.me = StubMember(self, bot_user.id)
+        self._members[self.me.id] = self.me
+
+        # The bot's own role sits above every role it manages
+        bot_role = StubRole(self, "bot", 10**6)
+        self._roles[bot_role.id] = bot_role
+        self.me._roles = [bot_role.id]
+
+    def _add_role(self, name: str, color: discord.Color = None) -> StubRole:
+        role = StubRole(self, name, len(self._roles), color)
+        self._roles[role.id] = role
+        return role
+
+    @property
+    def roles(self) -> List[StubRole]:
+        return sorted(self._roles.values(), key=lambda role: role.position)
+
+    @property
+    def members(self) -> List[StubMember]:
+        return list(self._members.values())
+
+    @property
+    def member_count(self) -> int:
+        return len(self._members)
+
+    def get_member(self, member_id):
+        return self._members.get(member_id)
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+    def get_channel(self, channel_id):
+        for channel in self.text_channels:
+            if channel.id == channel_id:
+                return channel
+        return None
+
+    async def create_role(self, name=None, color=None, **kwargs):
+        # Like Discord, new roles go in at the bottom and push the others up
+        for role in self._roles.values():
+            if role.position >= 1:
+                role.position += 1
+        role = self._add_role(name, color)
+        role.position = 1
+        return role
+
+    async def fetch_roles(self):
+        return self.roles
+
+    async def edit_role_positions(self, positions, **kwargs):
+        for role, position in positions.items():
+            self._roles[role.id].position = position
+        return self.roles
+
+    def add_channel(self, name: str) -> StubChannel:
+        channel = StubChannel(self, name)
+        self.text_channels.append(channel)
+        return channel
+
+    def assign_random_roles(self, role_names: List[str], per_member: int, seed: int = 0):
+        """
+        Gives every member a few roles by name so edits work on realistic role lists
+        """
+        rng = random.Random(seed)
+        role_ids = [role.id for role in self._roles.values() if role.name in role_names]
+        for member in self._members.values():
+            if member is not self.me:
+                member._roles = rng.sample(role_ids, min(per_member, len(role_ids)))
+
+
+class StubUser:
+    def __init__(self):
+        self.id = next_id()
+
+
+class StubBot:
+    def __init__(self):
+        self.user = StubUser()
+        self._guilds: Dict[int, StubGuild] = {}
+
+    @property
+    def guilds(self) -> List[StubGuild]:
+        return list(self._guilds.values())
+
+    def add_guild(self, guild: StubGuild):
+        self._guilds[guild.id] = guild
+
+    def get_guild(self, guild_id):
+        return self._guilds.get(guild_id)
+
+    def get_channel(self, channel_id):
+        for guild in self._guilds.values():
+            channel = guild.get_channel(channel_id)
+            if channel is not None:
+                return channel
+        return None
+
+
+def reaction_payload(message_id, channel_id, guild_id, user_id, emoji, add=True, member=None):
+    """
+    Builds a real RawReactionActionEvent the way the gateway would
+    """
+    data = {
+        "message_id": message_id,
+        "channel_id": channel_id,
+        "user_id": user_id,
+        "guild_id": guild_id,
+        "type": 0,
+        "burst": False,
+    }
+    payload = discord.RawReactionActionEvent(
+        data,
+        discord.PartialEmoji(name=emoji),
+        "REACTION_ADD" if add else "REACTION_REMOVE"
+    )
+    payload.member = member if add else None
+    return payload
@@ -0,0 +1,184 @@
+"""
+Bulk command module for removing, migrating and merging roles across a whole server
+"""
+from typing import List
+import discord
+from discord import app_commands
+from discord.ext import commands
+from utils.role_utils import category_autocomplete, role_autocomplete
+
+
+async def role_or_category_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    """
+    Suggests both categories and role names of the server's role catalog
+    """
+    choices = await category_autocomplete(interaction, current) + await role_autocomplete(interaction, current)
+    return choices[:25]
+
+
+class Bulk(commands.Cog):
+    """
+    Commands for bulk role jobs, which run in the background and survive restarts
+    """
+    def __init__(self, bot):
+        self.bot = bot
+
+    @property
+    def jobs(self):
+        return self.bot.role_handler.bulk_jobs
+
+    async def _start(self, ctx, kind: str, sources: List[discord.Role], target: discord.Role = None):
+        """
+        Starts a job and reports why not if it can't
+        """
+        await ctx.defer()
+        try:
+            await self.jobs.start(ctx.guild, kind, sources, target, ctx.channel)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+        except discord.HTTPException as e:
+            await ctx.send(f"❌ An error occurred: {str(e)}")
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    @app_commands.autocomplete(role=role_or_category_autocomplete)
+    async def bulk_remove(self, ctx, *, role: str):
+        """
+        Removes a role, or every role of a category, from every member who has it
+
+        Usage:
+        !bulk_remove [role or category]
+        Example: !bulk_remove secondary_professions
+
+        Args:
+            role: A role name or category from the catalog
+        """
+        try:
+            roles = self.jobs.resolve_roles(ctx.guild, role, allow_category=True)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+
+        await self._start(ctx, "remove", roles)
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    @app_commands.autocomplete(source=role_autocomplete, target=role_autocomplete)
+    async def bulk_migrate(self, ctx, source: str, target: str):
+        """
+        Moves every member of one role to another role
+
+        Usage:
+        !bulk_migrate [from role] [to role]
+        Example: !bulk_migrate Evoker Mage
+
+        Args:
+            source: Role to take away
+            target: Role to give instead
+        """
+        try:
+            sources = self.jobs.resolve_roles(ctx.guild, source)
+            target_role = self.jobs.resolve_roles(ctx.guild, target)[0]
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+
+        await self._start(ctx, "migrate", sources, target_role)
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    @app_commands.autocomplete(target=role_autocomplete)
+    async def bulk_merge(self, ctx, target: str, *, roles: str):
+        """
+        Moves the members of several roles into one role, then deletes those roles
+
+        Usage:
+        !bulk_merge [into role] [role, role, ...]
+        Example: !bulk_merge Hunter Death Knight, Demon Hunter
+
+        Args:
+            target: Role every member ends up with
+            roles: Comma separated roles to merge into it
+        """
+        try:
+            target_role = self.jobs.resolve_roles(ctx.guild, target)[0]
+            sources = []
+            for name in roles.split(","):
+                if name.strip():
+                    sources.extend(self.jobs.resolve_roles(ctx.guild, name.strip()))
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+
+        if not sources:
+            await ctx.send("❌ Name at least one role to merge.")
+            return
+
+        await self._start(ctx, "merge", sources, target_role)
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    async def bulk_status(self, ctx):
+        """
+        Shows the progress of this server's bulk role job
+
+        Usage:
+        !bulk_status
+        """
+        job = self.jobs.running_in(ctx.guild.id)
+        if job is None:
+            await ctx.send("✅ No bulk role job is running in this server.")
+            return
+
+        await ctx.send(self.jobs.progress_text(job, ctx.guild))
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    async def bulk_resume(self, ctx):
+        """
+        Continues this server's last bulk role job if it stopped on an error
+
+        Usage:
+        !bulk_resume
+        """
+        try:
+            job = self.jobs.resume_failed(ctx.guild)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+
+        await ctx.send(f"🔄 Resuming the job with {len(job.remaining):,} members left.")
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    async def bulk_cancel(self, ctx):
+        """
+        Stops this server's bulk role job; members already edited keep their new roles
+
+        Usage:
+        !bulk_cancel
+        """
+        job = self.jobs.cancel(ctx.guild.id)
+        if job is None:
+            await ctx.send("✅ No bulk role job is running in this server.")
+            return
+
+        await ctx.send(f"⏹️ Stopping the job after {job.done:,} of {job.total:,} members.")
+
+async def setup(bot):
+    """
+    Setup function for loading the cog
+    """
+    await bot.add_cog(Bulk(bot))
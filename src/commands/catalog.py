@@ -0,0 +1,208 @@
+"""
+Catalog command module for managing a server's own role categories
+"""
+import discord
+from discord import app_commands
+from discord.ext import commands
+from utils.role_utils import category_autocomplete
+
+class Catalog(commands.Cog):
+    """
+    Commands for customizing the role categories of a server
+    """
+    def __init__(self, bot):
+        self.bot = bot
+
+    @property
+    def catalogs(self):
+        return self.bot.role_handler.guild_catalogs
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    async def catalog(self, ctx):
+        """
+        Shows the role categories this server uses
+
+        Usage:
+        !catalog
+        """
+        catalog = self.bot.role_handler.catalog_for(ctx.guild.id)
+        source = "this server's own catalog" if self.catalogs.is_custom(ctx.guild.id) else "the shared catalog"
+
+        lines = [f"📋 This server uses {source}:"]
+        for category in catalog.categories.values():
+            roles = ", ".join(f"{emoji} {role_name}" for emoji, role_name in category.roles.items()) or "no roles yet"
+            choice = " (single choice)" if category.exclusive else ""
+            lines.append(f"**{category.name}**{choice} - {category.title}\n{roles}")
+
+        if len(catalog) == 0:
+            lines.append(f"No categories. Add one with `{ctx.clean_prefix}add_category`.")
+
+        await ctx.send("\n".join(lines)[:2000])
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    async def add_category(self, ctx, name: str, color: discord.Colour, *, title: str):
+        """
+        Adds a role category to this server, or changes a category's color and title
+
+        Usage:
+        !add_category [name] [color] [title]
+        Example: !add_category raids #e67e22 Which raids do you run?
+
+        Args:
+            name: Category name used in commands
+            color: Category color, like #e67e22
+            title: Title of the category's role message
+        """
+        try:
+            self.catalogs.add_category(ctx.guild.id, name, title, color.value)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+
+        await ctx.send(f"✅ Category `{name}` saved. Add roles with `{ctx.clean_prefix}add_role {name} [emoji] [role name]`.")
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    @app_commands.autocomplete(name=category_autocomplete)
+    async def set_exclusive(self, ctx, name: str, value: bool):
+        """
+        Makes a category single-choice or multiple-choice
+
+        Usage:
+        !set_exclusive [name] [on|off]
+        In a single-choice category, picking a role removes the member's other roles from it.
+
+        Args:
+            name: Category name
+            value: Whether members can hold only one of the category's roles
+        """
+        try:
+            self.catalogs.set_exclusive(ctx.guild.id, name, value)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+
+        kind = "single-choice" if value else "multiple-choice"
+        await ctx.send(f"✅ Category `{name}` is now {kind}. Run `{ctx.clean_prefix}repost_category {name}` to update select menus.")
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    @app_commands.autocomplete(name=category_autocomplete)
+    async def remove_category(self, ctx, name: str):
+        """
+        Removes a role category from this server
+
+        Usage:
+        !remove_category [name]
+        The category's role messages stop giving roles; existing roles are kept.
+
+        Args:
+            name: Category name
+        """
+        try:
+            self.catalogs.remove_category(ctx.guild.id, name)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+
+        # Stop tracking the category's messages in this server
+        role_handler = self.bot.role_handler
+        for message_id, data in list(role_handler.role_messages.items()):
+            if data["guild_id"] == ctx.guild.id and data["category"] == name:
+                role_handler.unregister_message(message_id)
+
+        await ctx.send(f"✅ Category `{name}` removed. You can delete its role message.")
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    @app_commands.autocomplete(category=category_autocomplete)
+    async def add_role(self, ctx, category: str, emoji: str, *, role_name: str):
+        """
+        Adds an emoji and the role it gives to a category, or changes an emoji's role
+
+        Usage:
+        !add_role [category] [emoji] [role name]
+        Example: !add_role player_types 🎉 Social
+
+        Args:
+            category: Category name
+            emoji: Reaction emoji
+            role_name: Name of the role the emoji gives
+        """
+        emoji = str(discord.PartialEmoji.from_str(emoji))
+
+        try:
+            self.catalogs.add_role(ctx.guild.id, category, emoji, role_name)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+
+        await ctx.send(
+            f"✅ {emoji} now gives **{role_name}** in `{category}`. "
+            f"Run `{ctx.clean_prefix}repost_category {category}` to update the role message."
+        )
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    @app_commands.autocomplete(category=category_autocomplete)
+    async def remove_role(self, ctx, category: str, emoji: str):
+        """
+        Removes an emoji from a category
+
+        Usage:
+        !remove_role [category] [emoji]
+
+        Args:
+            category: Category name
+            emoji: Reaction emoji
+        """
+        emoji = str(discord.PartialEmoji.from_str(emoji))
+
+        try:
+            self.catalogs.remove_role(ctx.guild.id, category, emoji)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+
+        await ctx.send(
+            f"✅ Removed {emoji} from `{category}`. "
+            f"Run `{ctx.clean_prefix}repost_category {category}` to update the role message."
+        )
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    async def reset_catalog(self, ctx):
+        """
+        Deletes this server's own role categories and goes back to the shared ones
+
+        Usage:
+        !reset_catalog
+        """
+        if not self.catalogs.is_custom(ctx.guild.id):
+            await ctx.send("✅ This server already uses the shared catalog.")
+            return
+
+        self.catalogs.reset(ctx.guild.id)
+        await ctx.send("✅ This server now uses the shared catalog again.")
+
+async def setup(bot):
+    """
+    Setup function for loading the cog
+    """
+    await bot.add_cog(Catalog(bot))
@@ -1,8 +1,13 @@
 """
 Event handler module for Discord events like reactions
 """
+import logging
 import discord
 from discord.ext import commands
+from utils.perf import perf
+from utils.role_utils import member_role_ids
+
+logger = logging.getLogger(__name__)
 
 class Events(commands.Cog):
     """
@@ -12,6 +17,7 @@ class Events(commands.Cog):
         self.bot = bot
 
     @commands.Cog.listener()
+    @perf.timed()
     async def on_raw_reaction_add(self, payload):
         """
         Event handler for when a reaction is added to a message
@@ -19,10 +25,11 @@ class Events(commands.Cog):
         Args:
             payload (discord.RawReactionActionEvent): Reaction data
         """
-        # Forward to role handler
-        await self.bot.role_handler.handle_reaction(payload, add=True)
+        # Forward to role handler's reaction queue
+        await self.bot.role_handler.queue_reaction(payload, add=True)
 
     @commands.Cog.listener()
+    @perf.timed()
     async def on_raw_reaction_remove(self, payload):
         """
         Event handler for when a reaction is removed from a message
@@ -30,10 +37,97 @@ class Events(commands.Cog):
         Args:
             payload (discord.RawReactionActionEvent): Reaction data
         """
-        # Forward to role handler
-        await self.bot.role_handler.handle_reaction(payload, add=False)
+        # Forward to role handler's reaction queue
+        await self.bot.role_handler.queue_reaction(payload, add=False)
 
     @commands.Cog.listener()
+    @perf.timed()
+    async def on_guild_role_create(self, role):
+        """
+        Event handler for when a role is created
+
+        Args:
+            role (discord.Role): The created role
+        """
+        self.bot.role_handler.role_index.add(role)
+        self.bot.role_handler.provisioner.invalidate(role.guild.id)
+
+    @commands.Cog.listener()
+    @perf.timed()
+    async def on_guild_role_update(self, before, after):
+        """
+        Event handler for when a role is updated
+
+        Args:
+            before (discord.Role): The role before the update
+            after (discord.Role): The role after the update
+        """
+        self.bot.role_handler.role_index.update(before, after)
+        self.bot.role_handler.provisioner.invalidate(after.guild.id)
+
+    @commands.Cog.listener()
+    @perf.timed()
+    async def on_guild_role_delete(self, role):
+        """
+        Event handler for when a role is deleted
+
+        Args:
+            role (discord.Role): The deleted role
+        """
+        self.bot.role_handler.role_index.remove(role)
+        self.bot.role_handler.provisioner.invalidate(role.guild.id)
+        # Remembered member roles may still list the deleted role
+        self.bot.role_handler.role_shadow.forget_guild(role.guild.id)
+
+    @commands.Cog.listener()
+    @perf.timed()
+    async def on_raw_member_remove(self, payload):
+        """
+        Event handler for when a member leaves a guild
+
+        Args:
+            payload (discord.RawMemberRemoveEvent): The raw event payload
+        """
+        role_handler = self.bot.role_handler
+
+        # Cached members arrive whole; otherwise use the roles remembered for them, if any
+        if isinstance(payload.user, discord.Member):
+            role_ids = member_role_ids(payload.user)
+        else:
+            role_ids = role_handler.role_shadow.roles(payload.guild_id, payload.user.id)
+        role_handler.role_stats.member_left(payload.guild_id, role_ids)
+
+        role_handler.member_cache.remove(payload.guild_id, payload.user.id)
+        role_handler.role_shadow.forget(payload.guild_id, payload.user.id)
+
+    @commands.Cog.listener()
+    @perf.timed()
+    async def on_member_join(self, member):
+        """
+        Event handler for when a member joins a guild
+
+        Args:
+            member (discord.Member): The member who joined
+        """
+        self.bot.role_handler.role_stats.member_joined(member)
+
+    @commands.Cog.listener()
+    @perf.timed()
+    async def on_member_update(self, before, after):
+        """
+        Event handler for when a member's roles or profile change
+
+        Args:
+            before (discord.Member): The member before the update
+            after (discord.Member): The member after the update
+        """
+        # Keeps remembered roles and role counts current, including changes made by other bots and admins
+        role_handler = self.bot.role_handler
+        role_handler.role_shadow.observe(after)
+        role_handler.role_stats.member_updated(after.guild.id, member_role_ids(before), member_role_ids(after))
+
+    @commands.Cog.listener()
+    @perf.timed()
     async def on_guild_join(self, guild):
         """
         Event handler for when the bot joins a new guild
@@ -41,7 +135,7 @@ class Events(commands.Cog):
         Args:
             guild (discord.Guild): The guild the bot joined
         """
-        print(f"Joined a new guild: {guild.name} (ID: {guild.id})")
+        logger.info("Joined a new guild: %s", guild.name, extra={"event": "guild_join", "guild_id": guild.id})
 
         # If the guild has a system channel, send a welcome message
         if guild.system_channel:
@@ -51,9 +145,9 @@ class Events(commands.Cog):
                     "The Bear has arrived.Thanks for adding me to your server! "
                     "I'm designed to help manage roles through reactions.\n\n"
                     "**Commands**:\n"
-                    "• `!setup_roles` - Creates all the roles\n"
-                    "• `!create_role_messages` - Creates all reaction role messages\n"
-                    "• `!setup_category [category] [channel]` - Sets up roles for a specific category\n\n"
+                    "• `/setup_roles` - Creates all the roles\n"
+                    "• `/create_role_messages` - Creates all reaction role messages\n"
+                    "• `/setup_category [category] [channel]` - Sets up roles for a specific category\n\n"
                     "You need admin permissions to use these commands."
                 ),
                 color=discord.Color.blue()
@@ -89,7 +183,16 @@ class Events(commands.Cog):
         else:
             await ctx.send(f"❌ An error occurred: {str(error)}")
             # Log the error for debugging
-            print(f"Error in command {ctx.command}: {error}")
+            logger.error(
+                "Error in command %s: %s", ctx.command, error,
+                exc_info=error,
+                extra={
+                    "event": "command_error",
+                    "guild_id": ctx.guild.id if ctx.guild else None,
+                    "channel_id": ctx.channel.id,
+                    "member_id": ctx.author.id
+                }
+            )
 
 async def setup(bot):
     """
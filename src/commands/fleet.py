@@ -0,0 +1,139 @@
+"""
+Fleet command module for provisioning many servers from one place
+"""
+import io
+from typing import Optional
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+# Result rows shown in a message; the full table is attached as a file
+TABLE_ROWS = 15
+
+
+class Fleet(commands.Cog):
+    """
+    Owner-only commands for provisioning roles and role messages across servers
+    """
+    def __init__(self, bot):
+        self.bot = bot
+
+    @property
+    def fleet(self):
+        return self.bot.role_handler.fleet
+
+    @staticmethod
+    async def _send_results(send, job):
+        """
+        Sends a job's totals and result table, attaching the full table if it doesn't fit
+        """
+        lines = job.table_lines(TABLE_ROWS)
+        text = f"{job.summary()}\n```\n" + "\n".join(lines) + "\n```"
+        file = None
+        if len(job.guilds) > TABLE_ROWS or len(text) > 2000:
+            text = f"{job.summary()}\n```\n" + "\n".join(lines)[:1800] + "\n```"
+            table = "\n".join(job.table_lines()).encode("utf-8")
+            file = discord.File(io.BytesIO(table), filename=f"fleet_job_{job.job_id}.txt")
+
+        await send(text, file=file)
+
+    @commands.is_owner()
+    @app_commands.default_permissions(administrator=True)
+    @commands.hybrid_command()
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="reactions", value="reactions"),
+        app_commands.Choice(name="components", value="components")
+    ])
+    async def fleet_provision(self, ctx, guilds: str, channel: Optional[str] = None, mode: Optional[str] = None):
+        """
+        Provisions the catalog's roles in many servers, and posts missing role messages
+
+        Usage:
+        !fleet_provision [all|server IDs] [channel name] [reactions|components]
+        Example: !fleet_provision all role-selection
+        Without a channel name only roles are provisioned.
+
+        Args:
+            guilds: `all`, or server IDs separated by commas
+            channel: Name of the channel to post role messages in
+            mode: 'reactions' or 'components' (defaults to ROLE_PICKER_MODE)
+        """
+        if mode is not None and mode.lower() not in ("reactions", "components"):
+            await ctx.send("❌ Unknown mode. Use `reactions` or `components`.")
+            return
+
+        try:
+            guild_ids = self.fleet.select_guilds(guilds)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+
+        await ctx.defer()
+        target = f" and posting role messages in #{channel.lstrip('#')}" if channel else ""
+        await ctx.send(f"🚀 Provisioning roles in {len(guild_ids)} servers{target}...")
+
+        try:
+            job = await self.fleet.start(guild_ids, channel.lstrip("#") if channel else None, mode and mode.lower())
+        except ValueError as e:
+            await ctx.channel.send(f"❌ {e}")
+            return
+
+        # Jobs can outlive the slash command's response window
+        await self._send_results(ctx.channel.send, job)
+
+    @commands.is_owner()
+    @app_commands.default_permissions(administrator=True)
+    @commands.hybrid_command()
+    async def fleet_retry(self, ctx, job_id: Optional[int] = None):
+        """
+        Runs a fleet job again for the servers that failed
+
+        Usage:
+        !fleet_retry [job ID]
+        Retries the latest job when no ID is given
+
+        Args:
+            job_id: ID of the job to retry
+        """
+        job = self.fleet.load(job_id)
+        if job is None:
+            await ctx.send("❌ No such fleet job.")
+            return
+
+        await ctx.defer()
+        await ctx.send(f"🔁 Retrying job #{job.job_id} in {len(job.guilds) - job.count('done')} servers...")
+
+        try:
+            job = await self.fleet.retry(job.job_id)
+        except ValueError as e:
+            await ctx.channel.send(f"❌ {e}")
+            return
+
+        await self._send_results(ctx.channel.send, job)
+
+    @commands.is_owner()
+    @app_commands.default_permissions(administrator=True)
+    @commands.hybrid_command()
+    async def fleet_status(self, ctx, job_id: Optional[int] = None):
+        """
+        Shows the per-server results of a fleet job
+
+        Usage:
+        !fleet_status [job ID]
+        Shows the latest job when no ID is given
+
+        Args:
+            job_id: ID of the job
+        """
+        job = self.fleet.load(job_id)
+        if job is None:
+            await ctx.send("❌ No such fleet job.")
+            return
+
+        await self._send_results(ctx.send, job)
+
+async def setup(bot):
+    """
+    Setup function for loading the cog
+    """
+    await bot.add_cog(Fleet(bot))
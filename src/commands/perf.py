@@ -0,0 +1,82 @@
+"""
+Performance command module for inspecting handler timings and event loop lag
+"""
+from discord import app_commands
+from discord.ext import commands
+from utils.perf import perf
+
+
+def format_duration(seconds: float) -> str:
+    """
+    Formats a duration in the most readable unit
+    """
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 0.001:
+        return f"{seconds * 1000:.1f}ms"
+    return f"{seconds * 1_000_000:.0f}us"
+
+
+class Perf(commands.Cog):
+    """
+    Commands for diagnosing slow reactions
+    """
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.hybrid_command()
+    async def perf(self, ctx):
+        """
+        Shows recent timing percentiles per handler and the event loop lag
+
+        Usage:
+        !perf
+        REST is the time spent waiting on Discord's API, including rate limits;
+        the rest of the wall time is local work or waiting on the event loop.
+        """
+        summary = perf.summary()
+        if not summary:
+            await ctx.send("📊 No handlers have run yet.")
+            return
+
+        header = f"{'handler':<40} {'calls':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'rest p95':>8} {'rest':>5}"
+        lines = [header]
+        for name, stats in summary.items():
+            line = (
+                f"{name[:40]:<40} {stats['calls']:>7} {format_duration(stats['p50']):>8} "
+                f"{format_duration(stats['p95']):>8} {format_duration(stats['p99']):>8} "
+                f"{format_duration(stats['rest_p95']):>8} {stats['rest_share']:>5.0%}"
+            )
+            # Leave room for the loop summary; handlers are sorted slowest first
+            if sum(len(existing) + 1 for existing in lines) + len(line) > 1700:
+                break
+            lines.append(line)
+
+        message = "📊 Handler timings (recent calls)\n```\n" + "\n".join(lines) + "\n```"
+
+        monitor = self.bot.loop_monitor
+        if monitor:
+            loop = monitor.summary()
+            message += (
+                f"Event loop lag: p50 {format_duration(loop['p50'])}, p99 {format_duration(loop['p99'])}, "
+                f"max {format_duration(loop['max'])}"
+            )
+            if monitor.stall_threshold > 0:
+                message += f", {loop['stalls']} stalls over {format_duration(monitor.stall_threshold)}"
+
+        reactions = self.bot.role_handler.reaction_queue
+        fullest = max(reactions.guild_depths().values(), default=0)
+        message += (
+            f"\nReaction queue: {reactions.depth} waiting (fullest server {fullest}/{reactions.max_per_guild}), "
+            f"{reactions.busy}/{reactions.worker_count} workers busy, overflow policy `{reactions.policy}`"
+        )
+
+        await ctx.send(message)
+
+async def setup(bot):
+    """
+    Setup function for loading the cog
+    """
+    await bot.add_cog(Perf(bot))
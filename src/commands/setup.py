@@ -1,10 +1,14 @@
 """
 Setup command module for creating roles and setting up reaction messages
 """
+import asyncio
+from typing import Optional
 import discord
 from discord.ext import commands
 from discord import app_commands
-from config.config import ROLE_CATEGORIES
+from config.config import RECONCILE_PRUNE, ROLE_CATALOG_PATH
+from utils.role_utils import category_autocomplete
+from utils.perf import perf
 
 class Setup(commands.Cog):
     """
@@ -13,19 +17,58 @@ class Setup(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_before_invoke(self, ctx):
+        # Time each command, including the REST calls it makes
+        ctx.perf_token = perf.start(f"Setup.{ctx.command.name}")
+
+    async def cog_after_invoke(self, ctx):
+        perf.finish(ctx.perf_token, failed=ctx.command_failed)
+
     @commands.has_permissions(administrator=True)
-    @commands.command()
-    async def setup_roles(self, ctx):
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="plan", value="plan"),
+        app_commands.Choice(name="apply", value="apply")
+    ])
+    async def setup_roles(self, ctx, mode: str = "apply"):
         """
-        Creates all roles defined in the config
+        Creates the roles defined in the config and fixes roles whose settings drifted
+
+        Usage:
+        !setup_roles [plan|apply]
+        Pass `plan` to only list the roles that would be created, updated or reordered
+
+        Args:
+            mode: 'plan' to only show the changes or 'apply' to make them (default)
         """
-        await ctx.send("📋 Setting up roles... This may take a moment.")
+        if mode not in ("plan", "apply"):
+            await ctx.send(f"❌ Unknown mode. Use `{ctx.clean_prefix}setup_roles plan` or `{ctx.clean_prefix}setup_roles apply`.")
+            return
+
+        await ctx.defer()
+        provisioner = self.bot.role_handler.provisioner
 
         try:
-            # Create all roles
-            created_roles = await self.bot.role_handler.create_roles(ctx.guild)
+            plan = provisioner.plan(ctx.guild)
+            lines = "\n".join(plan.summary_lines())
+
+            if mode == "plan":
+                if plan.empty:
+                    await ctx.send(f"✅ All roles match the catalog.\n{lines}".strip())
+                else:
+                    await ctx.send(
+                        f"📋 Role changes needed:\n{lines}\n"
+                        f"Run `{ctx.clean_prefix}setup_roles` to make these changes."
+                    )
+                return
 
-            # Send confirmation with count of roles created
+            if not plan.empty:
+                await ctx.send(f"📋 Setting up roles... This may take a moment.\n{lines}")
+            created_roles = await provisioner.apply(plan)
+
+            # Send confirmation with count of roles set up
             total_roles = sum(len(roles) for roles in created_roles.values())
             await ctx.send(f"✅ Successfully set up {total_roles} roles across {len(created_roles)} categories!")
         except discord.Forbidden:
@@ -34,33 +77,57 @@ class Setup(commands.Cog):
             await ctx.send(f"❌ An error occurred: {str(e)}")
 
     @commands.has_permissions(administrator=True)
-    @commands.command()
-    async def create_role_messages(self, ctx, channel: discord.TextChannel = None):
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="reactions", value="reactions"),
+        app_commands.Choice(name="components", value="components")
+    ])
+    async def create_role_messages(self, ctx, channel: Optional[discord.TextChannel] = None, mode: str = None):
         """
         Creates reaction role messages in the specified channel
 
+        Usage:
+        !create_role_messages [#channel] [reactions|components]
+        Add `components` to post select menus instead of reactions
+
         Args:
             channel: The channel to send messages to (defaults to current channel)
+            mode: 'reactions' or 'components' (defaults to ROLE_PICKER_MODE)
         """
         if channel is None:
             channel = ctx.channel
 
+        if mode is not None and mode.lower() not in ("reactions", "components"):
+            await ctx.send("❌ Unknown mode. Use `reactions` or `components`.")
+            return
+
+        await ctx.defer()
         await ctx.send(f"📝 Creating role messages in {channel.mention}...")
 
         try:
             # Create roles first to ensure they exist
             created_roles = await self.bot.role_handler.create_roles(ctx.guild)
 
-            # Send a reaction message for each category
+            # Send a reaction message for each category, in order
             sent_messages = []
-            for category in ROLE_CATEGORIES:
+            for category in self.bot.role_handler.catalog_for(ctx.guild.id):
                 message = await self.bot.role_handler.send_reaction_message(
                     channel,
                     category,
-                    created_roles.get(category, [])
+                    created_roles.get(category, []),
+                    seed=False,
+                    mode=mode and mode.lower()
                 )
                 if message:
-                    sent_messages.append(message)
+                    sent_messages.append((message, category))
+
+            # Seed every message's reactions at once through the REST scheduler
+            await asyncio.gather(*(
+                self.bot.role_handler.seed_reactions(message, category)
+                for message, category in sent_messages
+            ))
 
             await ctx.send(f"✅ Successfully created {len(sent_messages)} role selection messages!")
         except discord.Forbidden:
@@ -69,7 +136,10 @@ class Setup(commands.Cog):
             await ctx.send(f"❌ An error occurred: {str(e)}")
 
     @commands.has_permissions(administrator=True)
-    @commands.command()
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    @app_commands.autocomplete(category=category_autocomplete)
     async def setup_category(self, ctx, category: str, channel: discord.TextChannel = None):
         """
         Creates roles and reaction message for a specific category
@@ -78,18 +148,20 @@ class Setup(commands.Cog):
             category: The category to set up (e.g., 'classes', 'timezones')
             channel: The channel to send message to (defaults to current channel)
         """
-        if category not in ROLE_CATEGORIES:
-            await ctx.send(f"❌ Category '{category}' not found. Available categories: {', '.join(ROLE_CATEGORIES.keys())}")
+        catalog = self.bot.role_handler.catalog_for(ctx.guild.id)
+        if category not in catalog:
+            await ctx.send(f"❌ Category '{category}' not found. Available categories: {', '.join(catalog)}")
             return
 
         if channel is None:
             channel = ctx.channel
 
+        await ctx.defer()
         await ctx.send(f"📝 Setting up {category} roles and message in {channel.mention}...")
 
         try:
             # Create roles for this category
-            created_roles = await self.bot.role_handler.create_roles(ctx.guild)
+            created_roles = await self.bot.role_handler.create_roles(ctx.guild, [category])
             category_roles = created_roles.get(category, [])
 
             # Send reaction message
@@ -105,11 +177,15 @@ class Setup(commands.Cog):
             await ctx.send(f"❌ An error occurred: {str(e)}")
 
     @commands.has_permissions(administrator=True)
-    @commands.command()
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    @app_commands.autocomplete(category=category_autocomplete)
     async def repost_category(self, ctx, category: str, channel: discord.TextChannel = None):
         """
-        Reposts a category's role message by deleting the old one and creating a new one
-        Useful when you've made changes to roles and want to update the message
+        Updates a category's role message in place, or posts one if the channel has none
+        Useful when you've made changes to roles and want to update the message;
+        members keep their reactions
 
         Usage:
         !repost_category [category] #channel
@@ -119,110 +195,106 @@ class Setup(commands.Cog):
             category: The category to repost (e.g., 'classes', 'timezones')
             channel: The channel to send message to (defaults to current channel)
         """
-        if category not in ROLE_CATEGORIES:
-            categories_list = ", ".join(f"`{cat}`" for cat in ROLE_CATEGORIES.keys())
+        catalog = self.bot.role_handler.catalog_for(ctx.guild.id)
+        if category not in catalog:
+            categories_list = ", ".join(f"`{cat}`" for cat in catalog)
             await ctx.send(f"❌ Category '{category}' not found.\nAvailable categories: {categories_list}")
             return
 
         if channel is None:
             channel = ctx.channel
 
-        await ctx.send(f"🔄 Reposting {category} roles message in {channel.mention}...")
+        await ctx.defer()
+        await ctx.send(f"🔄 Updating {category} roles message in {channel.mention}...")
 
+        handler = self.bot.role_handler
         try:
-            # Find and delete existing message for this category
-            existing_message_id = None
-            for msg_id, data in self.bot.role_handler.role_messages.items():
-                if data.get("category") == category:
-                    try:
-                        existing_message = await channel.fetch_message(msg_id)
-                        await existing_message.delete()
-                        del self.bot.role_handler.role_messages[msg_id]
-                        break
-                    except (discord.NotFound, discord.Forbidden):
-                        continue
-
             # Create roles for this category
-            created_roles = await self.bot.role_handler.create_roles(ctx.guild)
+            created_roles = await handler.create_roles(ctx.guild, [category])
             category_roles = created_roles.get(category, [])
 
+            # Fetch the category's message in this channel, if it has one
+            existing_message = None
+            message_id = handler.find_message(ctx.guild.id, channel.id, category)
+            if message_id is not None:
+                try:
+                    existing_message = await handler.rest.run("fetch_message", channel.id, channel.fetch_message, message_id)
+                except discord.NotFound:
+                    handler.unregister_message(message_id)
+
+            if existing_message:
+                added, removed = await handler.update_role_message(existing_message, category)
+                await ctx.send(
+                    f"✅ Updated {category} roles message in {channel.mention} "
+                    f"({added} emojis added, {removed} removed)!"
+                )
+                return
+
             # Send new reaction message
-            message = await self.bot.role_handler.send_reaction_message(channel, category, category_roles)
+            message = await handler.send_reaction_message(channel, category, category_roles)
 
             if message:
-                await ctx.send(f"✅ Successfully reposted {category} roles message in {channel.mention}!")
+                await ctx.send(f"✅ Successfully posted {category} roles message in {channel.mention}!")
             else:
-                await ctx.send(f"❌ Failed to repost {category} message.")
+                await ctx.send(f"❌ Failed to post {category} message.")
         except discord.Forbidden:
             await ctx.send("❌ I don't have permission to manage messages or roles. Please check my permissions and try again.")
         except Exception as e:
             await ctx.send(f"❌ An error occurred: {str(e)}")
 
     @commands.has_permissions(administrator=True)
-    @commands.command()
-    async def scan_roles(self, ctx, channel: discord.TextChannel = None):
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    @app_commands.choices(mode=[app_commands.Choice(name="deep", value="deep")])
+    async def scan_roles(self, ctx, channel: Optional[discord.TextChannel] = None, mode: str = None):
         """
         Scans a channel for existing role messages and reconnects them to the bot
 
         Usage:
-        !scan_roles [#channel]
+        !scan_roles [#channel] [deep]
         If no channel is specified, scans the current channel
+        Only messages posted since the last scan are read; add `deep` to page
+        through the channel's full history in the background
 
         Args:
             channel: The channel to scan for role messages
+            mode: Pass 'deep' to scan the full channel history
         """
         if channel is None:
             channel = ctx.channel
 
-        await ctx.send(f"🔍 Scanning {channel.mention} for role messages...")
+        if mode is not None and mode.lower() != "deep":
+            await ctx.send(f"❌ Unknown scan mode. Use `{ctx.clean_prefix}scan_roles [#channel] deep` for a full history scan.")
+            return
+
+        await ctx.defer()
 
         try:
-            # Get bot's messages in the channel
-            messages = []
-            async for message in channel.history(limit=100):  # Scan last 100 messages
-                if message.author == self.bot.user and message.embeds:
-                    messages.append(message)
-
-            if not messages:
-                await ctx.send("❌ No role messages found in this channel.")
+            if mode is not None:
+                task = self.bot.role_handler.start_deep_scan(channel)
+                if task is None:
+                    await ctx.send(f"⏳ A deep scan of {channel.mention} is already running.")
+                    return
+
+                await ctx.send(f"🔍 Deep scanning {channel.mention} in the background...")
+                reconnected = await task
+                # Deep scans can outlive the slash command's response window
+                await ctx.channel.send(f"✅ Deep scan of {channel.mention} finished: reconnected {reconnected} role messages.")
                 return
 
-            reconnected = 0
-
-            # Check each message for role category titles
-            for message in messages:
-                if not message.embeds:
-                    continue
-
-                embed = message.embeds[0]
-                if not embed.title:
-                    continue
-
-                # Find matching category by title
-                matching_category = None
-                for category, data in ROLE_CATEGORIES.items():
-                    if data["title"] == embed.title:
-                        matching_category = category
-                        break
+            await ctx.send(f"🔍 Scanning {channel.mention} for role messages...")
 
-                if matching_category:
-                    # Register message for reaction handling
-                    self.bot.role_handler.role_messages[message.id] = {
-                        "category": matching_category,
-                        "roles": ROLE_CATEGORIES[matching_category]["roles"]
-                    }
-                    reconnected += 1
-
-                    # Verify/add reactions
-                    existing_reactions = {str(reaction.emoji) for reaction in message.reactions}
-                    needed_reactions = set(ROLE_CATEGORIES[matching_category]["roles"].keys())
-
-                    # Add missing reactions
-                    for emoji in needed_reactions - existing_reactions:
-                        await message.add_reaction(emoji)
+            reconnected = await self.bot.role_handler.scan_channel_roles(channel)
+            known = sum(
+                1 for data in self.bot.role_handler.role_messages.values()
+                if data.get("channel_id") == channel.id
+            )
 
             if reconnected > 0:
                 await ctx.send(f"✅ Successfully reconnected {reconnected} role messages!")
+            elif known > 0:
+                await ctx.send(f"✅ No new role messages found; {known} role messages in this channel are already connected.")
             else:
                 await ctx.send("❌ No matching role messages found in this channel.")
 
@@ -231,14 +303,95 @@ class Setup(commands.Cog):
         except Exception as e:
             await ctx.send(f"❌ An error occurred: {str(e)}")
 
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="dry_run", value="dry_run"),
+        app_commands.Choice(name="apply", value="apply")
+    ])
+    async def reconcile(self, ctx, mode: str = "dry_run"):
+        """
+        Compares reactions on this server's role messages with member roles
+
+        Usage:
+        !reconcile [dry_run|apply]
+        Shows the role changes needed to match the reactions; pass `apply` to make them
+
+        Args:
+            mode: 'dry_run' to only report (default) or 'apply' to fix roles
+        """
+        if mode not in ("dry_run", "apply"):
+            await ctx.send(f"❌ Unknown mode. Use `{ctx.clean_prefix}reconcile` for a dry run or `{ctx.clean_prefix}reconcile apply`.")
+            return
+
+        await ctx.defer()
+        dry_run = mode == "dry_run"
+        await ctx.send("🔍 Comparing reactions with member roles... This may take a moment.")
+
+        try:
+            plan = await self.bot.role_handler.reconciler.reconcile_guild(
+                ctx.guild,
+                dry_run=dry_run,
+                prune=RECONCILE_PRUNE
+            )
+
+            if plan.empty:
+                await ctx.send(f"✅ Checked {plan.messages_checked} role messages: all member roles match the reactions.")
+                return
+
+            lines = "\n".join(plan.summary_lines())
+            if dry_run:
+                await ctx.send(
+                    f"📋 {len(plan.changes)} members need role changes:\n{lines}\n"
+                    f"Run `{ctx.clean_prefix}reconcile apply` to make these changes."
+                )
+            else:
+                await ctx.send(f"✅ Updated roles for {len(plan.changes)} members:\n{lines}")
+        except discord.Forbidden:
+            await ctx.send("❌ I don't have permission to read reactions or manage roles.")
+        except Exception as e:
+            await ctx.send(f"❌ An error occurred: {str(e)}")
+
+    @commands.is_owner()
+    @app_commands.default_permissions(administrator=True)
+    @commands.hybrid_command()
+    async def reload_roles(self, ctx):
+        """
+        Reloads the role catalog file without restarting the bot
+
+        Usage:
+        !reload_roles
+        Reads ROLE_CATALOG_PATH again; if the file is invalid the current catalog stays active.
+        Only the bot owner can use this, since the catalog is shared by every server
+        that doesn't have its own catalog.
+        """
+        if not ROLE_CATALOG_PATH:
+            await ctx.send("❌ No role catalog file is configured. Set `ROLE_CATALOG_PATH` to reload roles from a file.")
+            return
+
+        try:
+            catalog = self.bot.role_handler.reload_catalog()
+        except (OSError, ValueError) as e:
+            await ctx.send(f"❌ Could not reload the role catalog; keeping the current one.\n{e}")
+            return
+
+        role_count = sum(len(category.roles) for category in catalog.categories.values())
+        message = f"✅ Reloaded {len(catalog)} categories with {role_count} roles from `{catalog.source}`."
+        if catalog.shared_emojis:
+            shared = ", ".join(f"{emoji} ({', '.join(names)})" for emoji, names in catalog.shared_emojis.items())
+            message += f"\nEmojis shared between categories: {shared}"
+        await ctx.send(message)
+
     @repost_category.error
     async def repost_category_error(self, ctx, error):
         """Error handler for repost_category command"""
         if isinstance(error, commands.MissingRequiredArgument):
-            categories_list = ", ".join(f"`{cat}`" for cat in ROLE_CATEGORIES.keys())
+            categories_list = ", ".join(f"`{cat}`" for cat in self.bot.role_handler.catalog_for(ctx.guild.id))
             await ctx.send(
                 "❌ Please specify a category and optionally a channel.\n"
-                f"Usage: `!repost_category [category] #channel`\n"
+                f"Usage: `{ctx.clean_prefix}repost_category [category] #channel`\n"
                 f"Available categories: {categories_list}"
             )
         elif isinstance(error, commands.ChannelNotFound):
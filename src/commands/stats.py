@@ -0,0 +1,183 @@
+"""
+Stats command module for showing how many members hold each role
+"""
+import csv
+import io
+import time
+from typing import List, Optional
+import discord
+from discord import app_commands
+from discord.ext import commands
+from utils.role_utils import category_autocomplete
+
+# Widest cross-tab that still fits in a Discord message
+MAX_CROSSTAB_WIDTH = 110
+
+
+def format_crosstab(row_names: List[str], column_names: List[str], table: List[List[int]]) -> Optional[str]:
+    """
+    Lays out a cross-tab as a fixed width text table
+
+    Returns:
+        The table, or None if it's too wide or long for a message
+    """
+    label_width = min(16, max(len(name) for name in row_names))
+    cell_width = max(
+        [min(10, len(name)) for name in column_names] + [len(str(count)) for row in table for count in row]
+    )
+
+    header = " " * label_width + " |" + "".join(f" {name[:cell_width]:>{cell_width}}" for name in column_names)
+    lines = [header, "-" * len(header)]
+    for name, row in zip(row_names, table):
+        lines.append(f"{name[:label_width]:<{label_width}} |" + "".join(f" {count:>{cell_width}}" for count in row))
+
+    text = "\n".join(lines)
+    if len(header) > MAX_CROSSTAB_WIDTH or len(text) > 1800:
+        return None
+    return text
+
+
+class Stats(commands.Cog):
+    """
+    Commands for counting the members of each role
+    """
+    def __init__(self, bot):
+        self.bot = bot
+
+    @property
+    def stats(self):
+        return self.bot.role_handler.role_stats
+
+    def _footer(self, stats) -> str:
+        """
+        Says how many members were counted and how current the counts are
+        """
+        footer = f"{stats.members:,} members"
+        if not stats.exact:
+            age = int((time.time() - stats.built_at) // 60)
+            footer += f" · counted {age} min ago"
+            if stats.untracked_leaves:
+                footer += f", {stats.untracked_leaves} left since"
+        return footer
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    @app_commands.autocomplete(category=category_autocomplete, by=category_autocomplete)
+    async def role_stats(self, ctx, category: Optional[str] = None, by: Optional[str] = None):
+        """
+        Shows how many members have each role, per category or as a cross-tab of two categories
+
+        Usage:
+        !role_stats [category] [by]
+        Example: !role_stats classes timezones
+
+        Args:
+            category: Only show this category
+            by: Cross-tab the category with this second category
+        """
+        await ctx.defer()
+        stats = await self.stats.get(ctx.guild)
+
+        if by is not None:
+            if category is None or category == by:
+                await ctx.send("❌ Pick two different categories to cross-tab.")
+                return
+            try:
+                row_names, column_names, table = self.stats.crosstab(ctx.guild, stats, category, by)
+            except ValueError as e:
+                await ctx.send(f"❌ {e}")
+                return
+
+            text = format_crosstab(row_names, column_names, table) if row_names and column_names else None
+            if text is None:
+                await ctx.send(
+                    f"❌ `{category}` × `{by}` is too large to show here. "
+                    f"Use `{ctx.clean_prefix}role_stats_csv {category} {by}` to download it."
+                )
+                return
+
+            await ctx.send(f"📊 **{category}** × **{by}** ({self._footer(stats)})\n```\n{text}\n```")
+            return
+
+        breakdown = self.stats.category_breakdown(ctx.guild, stats)
+        if category is not None:
+            if category not in breakdown:
+                await ctx.send(f"❌ Category '{category}' not found")
+                return
+            breakdown = {category: breakdown[category]}
+
+        embed = discord.Embed(title="📊 Role members", color=discord.Color.blurple())
+        for name, rows in list(breakdown.items())[:25]:
+            lines = [
+                f"{emoji} {role_name}: **{count:,}** ({count / stats.members:.0%})" if stats.members
+                else f"{emoji} {role_name}: **{count:,}**"
+                for emoji, role_name, count in sorted(rows, key=lambda row: row[2], reverse=True)
+            ]
+            embed.add_field(name=name, value="\n".join(lines)[:1024] or "No roles", inline=True)
+
+        embed.set_footer(text=self._footer(stats))
+        await ctx.send(embed=embed)
+
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.hybrid_command()
+    @app_commands.autocomplete(category=category_autocomplete, by=category_autocomplete)
+    async def role_stats_csv(self, ctx, category: Optional[str] = None, by: Optional[str] = None):
+        """
+        Exports role member counts as a CSV file
+
+        Usage:
+        !role_stats_csv [category] [by]
+        Without arguments every category is exported; with two categories, their cross-tab.
+
+        Args:
+            category: Only export this category
+            by: Export the cross-tab of the category with this second category
+        """
+        await ctx.defer()
+        stats = await self.stats.get(ctx.guild)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        if by is not None:
+            if category is None or category == by:
+                await ctx.send("❌ Pick two different categories to cross-tab.")
+                return
+            try:
+                row_names, column_names, table = self.stats.crosstab(ctx.guild, stats, category, by)
+            except ValueError as e:
+                await ctx.send(f"❌ {e}")
+                return
+
+            writer.writerow([f"{category} \\ {by}"] + column_names)
+            for name, row in zip(row_names, table):
+                writer.writerow([name] + row)
+            filename = f"role_stats_{category}_{by}.csv"
+        else:
+            breakdown = self.stats.category_breakdown(ctx.guild, stats)
+            if category is not None:
+                if category not in breakdown:
+                    await ctx.send(f"❌ Category '{category}' not found")
+                    return
+                breakdown = {category: breakdown[category]}
+
+            writer.writerow(["category", "emoji", "role", "members"])
+            for name, rows in breakdown.items():
+                for emoji, role_name, count in rows:
+                    writer.writerow([name, emoji, role_name, count])
+            filename = f"role_stats_{category}.csv" if category else "role_stats.csv"
+
+        data = io.BytesIO(buffer.getvalue().encode("utf-8"))
+        await ctx.send(
+            f"📊 Role members ({stats.members:,} members)",
+            file=discord.File(data, filename=filename)
+        )
+
+async def setup(bot):
+    """
+    Setup function for loading the cog
+    """
+    await bot.add_cog(Stats(bot))
@@ -11,12 +11,68 @@ load_dotenv()
 # Bot configuration
 TOKEN = os.getenv('DISCORD_TOKEN')  # Get token from environment variable
 PREFIX = os.getenv('BOT_PREFIX', '!')  # Get prefix from env with fallback to '!'
+PREFIX_COMMANDS = os.getenv('PREFIX_COMMANDS', 'true').lower() == 'true'  # Read messages for prefix commands (needs the message content intent)
+SYNC_COMMANDS = os.getenv('SYNC_COMMANDS', 'true').lower() == 'true'  # Register slash commands with Discord at startup
 APPLICATION_ID = int(os.getenv('APPLICATION_ID', '1351980775112704110'))
 # PUBLIC_KEY = os.getenv('PUBLIC_KEY', '0546fa0a1223d30abc4b97299bdeb9fcb6234d969bc1c69426a7b90d718469c2')
 
 # Server configuration
 SERVER_ID = int(os.getenv('SERVER_ID', '0'))  # Get server ID from environment variable
 
+# Sharding configuration
+SHARDED = os.getenv('SHARDED', 'false').lower() == 'true'  # Run as an AutoShardedBot
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '0')) or None  # Total shards (None lets Discord recommend one)
+SHARD_IDS = [int(shard) for shard in os.getenv('SHARD_IDS', '').split(',') if shard.strip()] or None  # Shards this process runs
+CLUSTER_WORKERS = int(os.getenv('CLUSTER_WORKERS', '1'))  # Worker processes started by launcher.py
+STATUS_DIR = os.getenv('STATUS_DIR', 'data/status')  # Where each worker writes its status file
+STATUS_INTERVAL = float(os.getenv('STATUS_INTERVAL', '15'))  # Seconds between status file updates
+
+# Metrics configuration
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))  # Port for the Prometheus /metrics endpoint (0 disables it)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')  # Interface the metrics endpoint listens on
+
+# Performance monitoring configuration
+PERF_SAMPLES = int(os.getenv('PERF_SAMPLES', '1000'))  # Recent timings kept per handler for percentiles
+LOOP_MONITOR_INTERVAL = float(os.getenv('LOOP_MONITOR_INTERVAL', '0.25'))  # Seconds between event loop lag checks (0 disables)
+LOOP_STALL_THRESHOLD = float(os.getenv('LOOP_STALL_THRESHOLD', '0.5'))  # Log the loop's stack when it's blocked this long (0 disables)
+
+# Logging configuration
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()  # Minimum level written to stdout and the log file
+LOG_FILE = os.getenv('LOG_FILE', 'bot.log')  # JSON lines log file (empty logs to stdout only)
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))  # Rotate the log file at this size (0 disables)
+LOG_ROTATE_HOURS = float(os.getenv('LOG_ROTATE_HOURS', '24'))  # Rotate the log file after this many hours (0 disables)
+LOG_BACKUPS = int(os.getenv('LOG_BACKUPS', '5'))  # Rotated log files to keep
+LOG_SAMPLE_WINDOW = float(os.getenv('LOG_SAMPLE_WINDOW', '10'))  # Seconds over which repeated log messages are counted
+LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', '20'))  # Times a message is logged per window before sampling (0 disables)
+LOG_SAMPLE_RATE = int(os.getenv('LOG_SAMPLE_RATE', '100'))  # Keep one in this many records of a sampled message
+
+# Role message registry configuration
+REGISTRY_PATH = os.getenv('REGISTRY_PATH', 'data/role_registry.db')  # SQLite file that remembers role messages
+STARTUP_HISTORY_SCAN = os.getenv('STARTUP_HISTORY_SCAN', 'false').lower() == 'true'  # Walk channel history on startup
+REGISTRY_VERIFY_SAMPLE = int(os.getenv('REGISTRY_VERIFY_SAMPLE', '3'))  # Registered messages spot-checked per guild on startup
+
+# Member caching configuration
+LOW_MEMORY_MODE = os.getenv('LOW_MEMORY_MODE', 'false').lower() == 'true'  # Don't chunk and cache every member
+MEMBER_CACHE_SIZE = int(os.getenv('MEMBER_CACHE_SIZE', '10000'))  # Members kept by the low-memory LRU cache
+MEMBER_CACHE_TTL = float(os.getenv('MEMBER_CACHE_TTL', '60'))  # Seconds a fetched member stays cached
+ROLE_SHADOW_SIZE = int(os.getenv('ROLE_SHADOW_SIZE', '200000'))  # Members whose role IDs are remembered to skip no-op edits
+ROLE_SHADOW_TTL = float(os.getenv('ROLE_SHADOW_TTL', '600'))  # Seconds a member's remembered roles are trusted
+ROLE_STATS_MAX_AGE = float(os.getenv('ROLE_STATS_MAX_AGE', '3600'))  # Seconds before low-memory mode role counts are recounted
+PROVISION_REORDER = os.getenv('PROVISION_REORDER', 'false').lower() == 'true'  # Keep catalog roles in catalog order
+FLEET_CONCURRENCY = int(os.getenv('FLEET_CONCURRENCY', '4'))  # Servers provisioned at once by fleet jobs
+BULK_EDITS_PER_SECOND = float(os.getenv('BULK_EDITS_PER_SECOND', '2'))  # Pace of member edits made by bulk role jobs
+BULK_PROGRESS_INTERVAL = float(os.getenv('BULK_PROGRESS_INTERVAL', '5'))  # Seconds between bulk job progress updates
+
+# Reaction handling configuration
+ROLE_EDIT_DEBOUNCE = float(os.getenv('ROLE_EDIT_DEBOUNCE', '0.5'))  # Seconds to coalesce a member's role changes
+SCAN_CONCURRENCY = int(os.getenv('SCAN_CONCURRENCY', '4'))  # Channels scanned at once during startup scans
+REST_CONCURRENCY = int(os.getenv('REST_CONCURRENCY', '10'))  # REST requests in flight across all rate limit buckets
+REACTION_WORKERS = int(os.getenv('REACTION_WORKERS', '8'))  # Workers handling queued reaction events
+REACTION_QUEUE_SIZE = int(os.getenv('REACTION_QUEUE_SIZE', '1000'))  # Reaction events queued per guild before the overflow policy applies
+REACTION_OVERFLOW = os.getenv('REACTION_OVERFLOW', 'merge').lower()  # Full queue policy: 'merge', 'shed' or 'delay'
+RECONCILE_ON_READY = os.getenv('RECONCILE_ON_READY', 'false').lower() == 'true'  # Repair roles missed while offline
+RECONCILE_PRUNE = os.getenv('RECONCILE_PRUNE', 'false').lower() == 'true'  # Remove roles whose reaction is gone
+
 # WoW Class Colors in hex format
 CLASS_COLORS = {
     "Death Knight": 0xC41E3A,  # Red
@@ -34,6 +90,12 @@ CLASS_COLORS = {
     "Warrior": 0xC69B6D      # Brown
 }
 
+# How members pick roles on new role messages: 'reactions' or 'components' (select menus)
+ROLE_PICKER_MODE = os.getenv('ROLE_PICKER_MODE', 'reactions').lower()
+
+# Role catalog configuration
+ROLE_CATALOG_PATH = os.getenv('ROLE_CATALOG_PATH', '')  # JSON or YAML role catalog (empty uses the categories below)
+
 # Role categories and their emoji mappings
 ROLE_CATEGORIES = {
     "primary_professions": {
@@ -67,6 +129,7 @@ ROLE_CATEGORIES = {
     },
     "classes": {
         "title": "Choose Your Class:",
+        "exclusive": True,  # Members can only pick one role
         "roles": {
             "💀": "Death Knight",
             "😈": "Demon Hunter",
@@ -85,6 +148,7 @@ ROLE_CATEGORIES = {
     },
     "timezones": {
         "title": "Choose Your Timezone!",
+        "exclusive": True,
         "roles": {
             "🌎": "US-Eastern (EST/EDT)",
             "🌍": "US-Central (CST/CDT)",
@@ -106,6 +170,7 @@ ROLE_CATEGORIES = {
     },
     "player_types": {
         "title": "How do you play?",
+        "exclusive": True,
         "roles": {
             "😎": "Casual",
             "🔥": "Competitive",
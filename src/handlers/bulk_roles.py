@@ -0,0 +1,507 @@
+"""
+Bulk role module for removing, migrating and merging catalog roles across every member of a guild
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Set
+import discord
+from utils.role_utils import member_role_ids
+from utils.shard_utils import owns_guild
+
+logger = logging.getLogger(__name__)
+
+# Kinds of bulk job and what they do to each member holding a source role
+BULK_KINDS = ("remove", "migrate", "merge")
+
+# Slowest pace a job backs off to after rate limits, in seconds per edit
+MAX_EDIT_INTERVAL = 5.0
+
+# A member edit request taking longer than this waited on the rate limit
+SLOW_EDIT_SECONDS = 1.0
+
+
+class BulkRoleJob:
+    """
+    A bulk role job and its progress
+    """
+    def __init__(
+        self,
+        job_id: int,
+        guild_id: int,
+        kind: str,
+        source_ids: List[int],
+        target_id: Optional[int],
+        channel_id: int,
+        message_id: Optional[int],
+        total: int,
+        remaining: List[int],
+        done: int = 0,
+        failed: int = 0
+    ):
+        self.job_id = job_id
+        self.guild_id = guild_id
+        self.kind = kind
+        self.source_ids = source_ids  # Roles taken away from every member holding them
+        self.target_id = target_id  # Role given instead, for migrate and merge
+        self.channel_id = channel_id
+        self.message_id = message_id  # Progress message edited in place
+        self.total = total
+        self.remaining = remaining  # Member IDs not yet edited, in order
+        self.done = done
+        self.failed = failed
+        self.status = "running"
+        self.cancelled = False
+        self.task = None
+        self.started = time.monotonic()  # When this process started or resumed the job
+        self.done_at_start = done  # Members already done then, for the time estimate
+        self.role_names = {}  # role_id -> name, kept for roles a merge deletes
+
+    @classmethod
+    def from_registry(cls, row: Dict, remaining: List[int]) -> "BulkRoleJob":
+        """
+        Rebuilds an unfinished job from its registry row
+        """
+        return cls(
+            row["job_id"], row["guild_id"], row["kind"], row["source_ids"], row["target_id"],
+            row["channel_id"], row["message_id"], row["total"], remaining, row["done"], row["failed"]
+        )
+
+    def describe(self, guild: discord.Guild) -> str:
+        """
+        Says what the job does, with role names
+        """
+        def name(role_id):
+            role = guild.get_role(role_id)
+            if role is not None:
+                self.role_names[role_id] = role.name
+            return self.role_names.get(role_id, str(role_id))
+
+        sources = ", ".join(f"**{name(role_id)}**" for role_id in self.source_ids)
+        if self.kind == "remove":
+            return f"Removing {sources}"
+        if self.kind == "migrate":
+            return f"Moving {sources} to **{name(self.target_id)}**"
+        return f"Merging {sources} into **{name(self.target_id)}**"
+
+
+class BulkRoleJobs:
+    """
+    Runs bulk role jobs in the background, one per guild, and resumes them after a restart
+
+    Cached members get one edit through the role edit batcher, which shares the
+    member's lock with reaction flushes so the two never overwrite each other.
+    Members that aren't cached (low-memory mode) are only known from the list
+    loaded when the job started, so they get per-role add and remove requests
+    instead of a full role list that would undo changes made since. Edits are
+    paced to edits_per_second so reaction edits in the same rate limit bucket
+    still get through. discord.py waits out rate limits inside the request, so
+    the pace halves whenever a request takes long enough to have waited.
+
+    The members still to edit are journaled in the registry along with the
+    progress message. A restart resumes the job from the journal; members
+    edited after the last journal write are edited again, which is a no-op.
+    A job that stopped on an error keeps its journal and can be resumed with
+    resume_failed.
+    """
+    def __init__(self, role_handler, edits_per_second: float, progress_interval: float):
+        self.role_handler = role_handler
+        self.bot = role_handler.bot
+        self.registry = role_handler.registry
+        self.rest = role_handler.rest
+        self.edit_interval = 1 / edits_per_second if edits_per_second > 0 else 0.0
+        self.progress_interval = progress_interval  # Seconds between journal writes and progress edits
+        self._jobs = {}  # guild_id -> running BulkRoleJob
+        self._starting = set()  # Guilds whose job is loading members before it runs
+        self._resumed = False
+
+    def running_in(self, guild_id: int) -> Optional[BulkRoleJob]:
+        """
+        Gets the job running in a guild, if any
+        """
+        return self._jobs.get(guild_id)
+
+    def resolve_roles(self, guild: discord.Guild, name: str, allow_category: bool = False) -> List[discord.Role]:
+        """
+        Looks up catalog roles by role name, or every role of a category
+
+        Args:
+            guild: The guild
+            name: A role name from the catalog, or a category name if allow_category is set
+            allow_category: Whether a category name stands for all of its roles
+
+        Returns:
+            The roles
+
+        Raises:
+            ValueError: If the name isn't in the catalog, the role doesn't exist, or the bot can't manage it
+        """
+        catalog = self.role_handler.catalog_for(guild.id)
+        category = catalog.get(name) if allow_category else None
+
+        if category is not None:
+            role_names = list(category.roles.values())
+        elif any(name in entry.roles.values() for entry in catalog.categories.values()):
+            role_names = [name]
+        else:
+            raise ValueError(f"'{name}' isn't a role{' or category' if allow_category else ''} in this server's catalog")
+
+        roles = []
+        for role_name in role_names:
+            role = self.role_handler.role_index.get(guild, role_name)
+            if role is None:
+                if category is not None:
+                    continue
+                raise ValueError(f"Role '{role_name}' doesn't exist in this server")
+            if role >= guild.me.top_role:
+                raise ValueError(f"Role '{role.name}' is above my highest role, so I can't manage it")
+            roles.append(role)
+
+        if not roles:
+            raise ValueError(f"None of the roles of '{name}' exist in this server")
+        return roles
+
+    async def start(
+        self,
+        guild: discord.Guild,
+        kind: str,
+        sources: List[discord.Role],
+        target: Optional[discord.Role],
+        channel: discord.abc.Messageable
+    ) -> BulkRoleJob:
+        """
+        Starts a bulk role job in the background
+
+        Args:
+            guild: The guild
+            kind: 'remove', 'migrate' or 'merge'
+            sources: Roles to take away from every member holding them
+            target: Role to give those members instead (migrate and merge)
+            channel: Channel to post and update the progress message in
+
+        Returns:
+            The started job
+
+        Raises:
+            ValueError: If a job is already running in the guild or the roles don't make sense
+        """
+        if kind not in BULK_KINDS:
+            raise ValueError(f"Unknown bulk job '{kind}'")
+        if guild.id in self._jobs or guild.id in self._starting:
+            raise ValueError("A bulk role job is already running in this server")
+        if (target is None) != (kind == "remove"):
+            raise ValueError("Only migrate and merge take a target role")
+        if target is not None and target in sources:
+            raise ValueError(f"'{target.name}' can't be moved into itself")
+
+        source_ids = [role.id for role in sources]
+        wanted = set(source_ids)
+        self._starting.add(guild.id)
+        try:
+            members = await self.role_handler.reconciler.load_members(guild)
+        finally:
+            self._starting.discard(guild.id)
+        holders = {
+            member.id: member for member in members
+            if member.id != self.bot.user.id and not wanted.isdisjoint(member_role_ids(member))
+        }
+
+        job_id = self.registry.create_bulk_job(
+            guild.id, kind, source_ids, target.id if target else None, channel.id, list(holders)
+        )
+        job = BulkRoleJob(
+            job_id, guild.id, kind, source_ids, target.id if target else None, channel.id, None,
+            len(holders), list(holders)
+        )
+
+        try:
+            message = await channel.send(self.progress_text(job, guild))
+            job.message_id = message.id
+            self.registry.set_bulk_job_message(job_id, message.id)
+        except discord.HTTPException as e:
+            logger.warning(
+                "Could not post progress of bulk job %s: %s", job_id, e,
+                extra={"event": "bulk_progress_failed", "guild_id": guild.id, "channel_id": channel.id}
+            )
+
+        logger.info(
+            "Started bulk %s job %s for %d members", kind, job_id, job.total,
+            extra={"event": "bulk_job_started", "guild_id": guild.id}
+        )
+        self._launch(job, holders)
+        return job
+
+    def resume(self) -> int:
+        """
+        Restarts the jobs a previous run didn't finish, once per process
+
+        Returns:
+            Number of jobs resumed
+        """
+        if self._resumed:
+            return 0
+        self._resumed = True
+
+        resumed = 0
+        for row in self.registry.load_bulk_jobs():
+            # Other worker processes resume jobs on shards we don't run
+            if not owns_guild(self.bot, row["guild_id"]) or row["guild_id"] in self._jobs:
+                continue
+            if self.bot.get_guild(row["guild_id"]) is None:
+                continue
+
+            job = BulkRoleJob.from_registry(row, self.registry.load_bulk_job_members(row["job_id"]))
+            logger.info(
+                "Resuming bulk %s job %s with %d members left", job.kind, job.job_id, len(job.remaining),
+                extra={"event": "bulk_job_resumed", "guild_id": job.guild_id}
+            )
+            self._launch(job, None)
+            resumed += 1
+        return resumed
+
+    def resume_failed(self, guild: discord.Guild) -> BulkRoleJob:
+        """
+        Restarts the latest job in a guild that stopped on an error, from its journal
+
+        Args:
+            guild: The guild
+
+        Returns:
+            The resumed job
+
+        Raises:
+            ValueError: If a job is running in the guild or the latest job didn't fail
+        """
+        if guild.id in self._jobs or guild.id in self._starting:
+            raise ValueError("A bulk role job is already running in this server")
+
+        rows = [row for row in self.registry.load_bulk_jobs(running=False) if row["guild_id"] == guild.id]
+        if not rows or rows[-1]["status"] != "failed":
+            raise ValueError("The last bulk role job in this server didn't stop on an error")
+
+        row = rows[-1]
+        self.registry.reopen_bulk_job(row["job_id"])
+        job = BulkRoleJob.from_registry(row, self.registry.load_bulk_job_members(row["job_id"]))
+        logger.info(
+            "Resuming failed bulk %s job %s with %d members left", job.kind, job.job_id, len(job.remaining),
+            extra={"event": "bulk_job_resumed", "guild_id": job.guild_id}
+        )
+        self._launch(job, None)
+        return job
+
+    def cancel(self, guild_id: int) -> Optional[BulkRoleJob]:
+        """
+        Asks the job running in a guild to stop after its current edit
+
+        Returns:
+            The job, or None if none is running
+        """
+        job = self._jobs.get(guild_id)
+        if job is not None:
+            job.cancelled = True
+        return job
+
+    async def stop(self):
+        """
+        Stops every job without finishing it, e.g. before shutting down, so the next run resumes them
+        """
+        jobs = list(self._jobs.values())
+        for job in jobs:
+            job.task.cancel()
+        await asyncio.gather(*(job.task for job in jobs), return_exceptions=True)
+
+    def _launch(self, job: BulkRoleJob, members: Optional[Dict[int, discord.Member]]):
+        self._jobs[job.guild_id] = job
+        job.task = asyncio.create_task(self._run(job, members), name=f"bulk-job-{job.job_id}")
+
+    async def _run(self, job: BulkRoleJob, members: Optional[Dict[int, discord.Member]]):
+        """
+        Edits the job's remaining members, journaling progress as it goes
+        """
+        guild = self.bot.get_guild(job.guild_id)
+        removes = set(job.source_ids)
+        adds = {job.target_id} if job.target_id is not None else set()
+        finished = []  # Member IDs edited since the last journal write
+        status = "failed"
+
+        try:
+            if members is None:
+                # Resumed jobs look their members up again, fetching them in low-memory mode
+                remaining = set(job.remaining)
+                members = {
+                    member.id: member for member in await self.role_handler.reconciler.load_members(guild)
+                    if member.id in remaining
+                }
+
+            interval = self.edit_interval
+            next_edit = time.monotonic()
+            last_report = time.monotonic()
+
+            for member_id in list(job.remaining):
+                if job.cancelled:
+                    break
+
+                # Members who left since the job started have nothing to edit
+                cached = guild.get_member(member_id)
+                member = cached or members.get(member_id)
+                if member is not None:
+                    delay = next_edit - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                    requests = 1
+                    sent = time.monotonic()
+                    try:
+                        if cached is not None:
+                            await self.role_handler.role_edits.apply_now(member, adds, removes)
+                        else:
+                            requests = await self._edit_snapshot(job, member, adds, removes)
+                    except discord.Forbidden:
+                        raise
+                    except discord.HTTPException as e:
+                        job.failed += 1
+                        logger.warning(
+                            "Bulk job %s failed to edit member %s: %s", job.job_id, member_id, e,
+                            extra={"event": "bulk_edit_failed", "guild_id": guild.id, "member_id": member_id}
+                        )
+
+                    # Back off while edits wait on the rate limit, then ease towards the configured pace
+                    if time.monotonic() - sent > SLOW_EDIT_SECONDS * max(1, requests):
+                        interval = min(MAX_EDIT_INTERVAL, max(interval * 2, 0.1))
+                    else:
+                        interval = max(self.edit_interval, interval * 0.9)
+                    next_edit = time.monotonic() + interval
+
+                job.done += 1
+                finished.append(member_id)
+
+                if time.monotonic() - last_report >= self.progress_interval:
+                    self._journal(job, finished)
+                    finished = []
+                    last_report = time.monotonic()
+                    await self._report(job, guild)
+
+            self._journal(job, finished)
+            finished = []
+
+            if job.cancelled:
+                status = "cancelled"
+            else:
+                if job.kind == "merge":
+                    await self._delete_sources(job, guild)
+                status = "done"
+        except asyncio.CancelledError:
+            # Shutting down; keep the job running in the journal so the next run resumes it
+            self._journal(job, finished)
+            self._jobs.pop(job.guild_id, None)
+            raise
+        except discord.Forbidden as e:
+            logger.warning(
+                "Bulk job %s stopped: %s", job.job_id, e,
+                extra={"event": "bulk_job_failed", "guild_id": job.guild_id}
+            )
+        except Exception:
+            logger.exception(
+                "Error running bulk job %s", job.job_id,
+                extra={"event": "bulk_job_failed", "guild_id": job.guild_id}
+            )
+
+        self._journal(job, finished)
+        job.status = status
+        self.registry.finish_bulk_job(job.job_id, status)
+        self._jobs.pop(job.guild_id, None)
+        logger.info(
+            "Bulk %s job %s %s: %d/%d members, %d failed", job.kind, job.job_id, status, job.done, job.total,
+            job.failed, extra={"event": "bulk_job_finished", "guild_id": job.guild_id}
+        )
+        if guild is not None:
+            await self._report(job, guild)
+
+    async def _edit_snapshot(self, job: BulkRoleJob, member: discord.Member, adds: Set[int], removes: Set[int]) -> int:
+        """
+        Edits a member known only from the member list, one role per request
+
+        Returns:
+            Number of requests sent
+        """
+        guild = member.guild
+        member_cache = self.role_handler.member_cache
+        known = member_cache.get(guild.id, member.id) or member
+        held = set(member_role_ids(known))
+
+        remove = [discord.Object(id=role_id) for role_id in removes & held]
+        add = [discord.Object(id=role_id) for role_id in adds - held]
+        reason = f"Bulk {job.kind} job {job.job_id}"
+        if remove:
+            await self.rest.run("edit_member", guild.id, member.remove_roles, *remove, reason=reason)
+        if add:
+            await self.rest.run("edit_member", guild.id, member.add_roles, *add, reason=reason)
+
+        # The cached copy no longer matches; a reaction flush must not send its roles back
+        member_cache.remove(guild.id, member.id)
+        if remove or add:
+            self.role_handler.record_edit(member, held, (held - removes) | adds)
+        return len(remove) + len(add)
+
+    def _journal(self, job: BulkRoleJob, finished: List[int]):
+        if finished:
+            done = set(finished)
+            job.remaining = [member_id for member_id in job.remaining if member_id not in done]
+        self.registry.save_bulk_progress(job.job_id, finished, job.done, job.failed)
+
+    async def _delete_sources(self, job: BulkRoleJob, guild: discord.Guild):
+        """
+        Deletes the roles a merge emptied
+        """
+        for role_id in job.source_ids:
+            role = guild.get_role(role_id)
+            if role is None:
+                continue
+            try:
+                await self.rest.run("delete_role", guild.id, role.delete, reason=f"Merged by bulk job {job.job_id}")
+            except discord.HTTPException as e:
+                logger.warning(
+                    "Could not delete merged role %s: %s", role.name, e,
+                    extra={"event": "role_delete_failed", "guild_id": guild.id, "role_id": role_id}
+                )
+
+    def progress_text(self, job: BulkRoleJob, guild: discord.Guild) -> str:
+        """
+        Describes a job's progress for its progress message
+        """
+        share = job.done / job.total if job.total else 1.0
+        text = f"{job.describe(guild)}: {job.done:,}/{job.total:,} members ({share:.0%})"
+        if job.failed:
+            text += f", {job.failed:,} failed"
+
+        if job.status == "running":
+            elapsed = time.monotonic() - job.started
+            progressed = job.done - job.done_at_start
+            if progressed > 0 and elapsed > 0:
+                left = (job.total - job.done) * elapsed / progressed
+                text += f", about {max(1, round(left / 60))} min left"
+            return f"🔄 {text}"
+        if job.status == "done":
+            return f"✅ {text}"
+        if job.status == "cancelled":
+            return f"⏹️ {text} - cancelled"
+        return f"❌ {text} - stopped early, see the logs; `bulk_resume` continues it"
+
+    async def _report(self, job: BulkRoleJob, guild: discord.Guild):
+        """
+        Updates the job's progress message in place
+        """
+        channel = guild.get_channel(job.channel_id)
+        if job.message_id is None or channel is None:
+            return
+
+        message = channel.get_partial_message(job.message_id)
+        try:
+            await self.rest.run("edit_message", channel.id, message.edit, content=self.progress_text(job, guild))
+        except discord.NotFound:
+            job.message_id = None
+        except discord.HTTPException as e:
+            logger.warning(
+                "Could not update progress of bulk job %s: %s", job.job_id, e,
+                extra={"event": "bulk_progress_failed", "guild_id": guild.id, "channel_id": channel.id}
+            )
@@ -0,0 +1,150 @@
+"""
+Cluster status module for sharing each worker's health with the launcher
+"""
+import asyncio
+import glob
+import json
+import logging
+import math
+import os
+import time
+from typing import Dict, List
+from utils.shard_utils import format_shard_ids
+
+logger = logging.getLogger(__name__)
+
+
+class ClusterStatus:
+    """
+    Periodically writes this process's status to a JSON file
+
+    Every worker writes its own file in the status directory, and
+    `python src/launcher.py status` combines them into one view.
+    """
+    def __init__(self, bot, directory: str, interval: float, worker_id: int = 0):
+        self.bot = bot
+        self.directory = directory
+        self.interval = interval
+        self.worker_id = worker_id
+        self._task = None
+
+    @property
+    def path(self) -> str:
+        """
+        Path of this worker's status file
+        """
+        return os.path.join(self.directory, f"worker-{self.worker_id}.json")
+
+    def start(self):
+        """
+        Starts writing status in the background
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """
+        Stops writing status
+        """
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self):
+        while True:
+            try:
+                self.write()
+            except OSError as e:
+                logger.warning("Could not write status file %s: %s", self.path, e)
+            await asyncio.sleep(self.interval)
+
+    def snapshot(self) -> Dict:
+        """
+        Collects the current status of this process
+
+        Returns:
+            JSON serialisable status dictionary
+        """
+        bot = self.bot
+        role_handler = bot.role_handler
+        latencies = getattr(bot, "latencies", None) or [(None, bot.latency)]
+
+        return {
+            "worker_id": self.worker_id,
+            "pid": os.getpid(),
+            "shard_ids": list(bot.shard_ids) if getattr(bot, "shard_ids", None) else None,
+            "shard_count": getattr(bot, "shard_count", None),
+            "ready": bot.is_ready(),
+            "guilds": len(bot.guilds),
+            # Latency is NaN until a shard's first heartbeat
+            "latencies": {
+                str(shard): round(latency * 1000, 1) for shard, latency in latencies if not math.isnan(latency)
+            },
+            "registered_messages": len(role_handler.role_messages),
+            "pending_role_edits": role_handler.role_edits.pending_count,
+            "reconnect_attempts": bot.reconnect_attempts,
+            "updated_at": time.time()
+        }
+
+    def write(self):
+        """
+        Writes the status file atomically
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temp_path, self.path)
+
+
+def read_cluster_status(directory: str) -> List[Dict]:
+    """
+    Reads every worker's status file
+
+    Args:
+        directory: The status directory
+
+    Returns:
+        List of worker status dictionaries, ordered by worker ID
+    """
+    statuses = []
+    for path in glob.glob(os.path.join(directory, "worker-*.json")):
+        try:
+            with open(path, encoding="utf-8") as f:
+                statuses.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(statuses, key=lambda status: status["worker_id"])
+
+
+def format_cluster_status(statuses: List[Dict], stale_after: float) -> str:
+    """
+    Formats worker statuses as a table with a total row
+
+    Args:
+        statuses: Worker status dictionaries
+        stale_after: Seconds after which a worker that hasn't written is shown as stale
+
+    Returns:
+        The formatted table
+    """
+    now = time.time()
+    lines = [f"{'worker':<7}{'pid':<9}{'shards':<10}{'state':<9}{'guilds':>8}{'messages':>10}{'pending':>9}{'latency':>10}"]
+
+    for status in statuses:
+        if now - status["updated_at"] > stale_after:
+            state = "stale"
+        else:
+            state = "ready" if status["ready"] else "starting"
+
+        latencies = list(status["latencies"].values())
+        latency = f"{max(latencies):.0f}ms" if latencies else "-"
+        lines.append(
+            f"{status['worker_id']:<7}{status['pid']:<9}{format_shard_ids(status['shard_ids']):<10}{state:<9}"
+            f"{status['guilds']:>8}{status['registered_messages']:>10}{status['pending_role_edits']:>9}{latency:>10}"
+        )
+
+    lines.append(
+        f"{'total':<35}{sum(s['guilds'] for s in statuses):>8}"
+        f"{sum(s['registered_messages'] for s in statuses):>10}{sum(s['pending_role_edits'] for s in statuses):>9}"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,262 @@
+"""
+Fleet module for provisioning roles and role messages across many guilds in one job
+"""
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+import discord
+from config.config import ROLE_PICKER_MODE
+
+logger = logging.getLogger(__name__)
+
+# Widest guild name shown in result tables
+NAME_WIDTH = 24
+
+
+class FleetJob:
+    """
+    A fleet provisioning job and its per-guild results
+    """
+    def __init__(self, job_id: int, channel_name: Optional[str], mode: Optional[str], guilds: List[Dict]):
+        self.job_id = job_id
+        self.channel_name = channel_name  # Channel role messages are posted in; None only provisions roles
+        self.mode = mode
+        self.guilds = {guild["guild_id"]: guild for guild in guilds}  # guild_id -> result row
+
+    @classmethod
+    def from_registry(cls, row: Dict) -> "FleetJob":
+        return cls(row["job_id"], row["channel_name"], row["mode"], row["guilds"])
+
+    def count(self, status: str) -> int:
+        return sum(1 for guild in self.guilds.values() if guild["status"] == status)
+
+    def summary(self) -> str:
+        """
+        One line with the job's totals
+        """
+        return (
+            f"Job #{self.job_id}: {self.count('done')} done, {self.count('failed')} failed, "
+            f"{self.count('pending')} pending of {len(self.guilds)} servers"
+        )
+
+    def table_lines(self, limit: Optional[int] = None) -> List[str]:
+        """
+        Lays out the per-guild results as a fixed width table, failed guilds first
+
+        Args:
+            limit: Maximum number of guild rows
+
+        Returns:
+            The table's lines
+        """
+        order = {"failed": 0, "pending": 1, "done": 2}
+        rows = sorted(self.guilds.values(), key=lambda guild: (order.get(guild["status"], 3), guild["guild_name"]))
+
+        lines = [f"{'server':<{NAME_WIDTH}} {'status':<8} {'created':>7} {'updated':>7} {'posted':>6}  detail"]
+        for guild in rows if limit is None else rows[:limit]:
+            lines.append(
+                f"{guild['guild_name'][:NAME_WIDTH]:<{NAME_WIDTH}} {guild['status']:<8} {guild['roles_created']:>7} "
+                f"{guild['roles_updated']:>7} {guild['messages_posted']:>6}  {guild['detail'] or ''}"
+            )
+        if limit is not None and len(rows) > limit:
+            lines.append(f"...and {len(rows) - limit} more servers")
+        return lines
+
+
+class FleetProvisioner:
+    """
+    Provisions the catalog's roles, and optionally posts its role messages, in many guilds at once
+
+    Guilds are handled concurrently up to a fixed limit. Every request still goes
+    through the REST scheduler, so each guild's role and channel buckets are
+    paced separately and a slow guild doesn't hold up the others. The result of
+    each guild is journaled as soon as it finishes, so a job that partly failed
+    can be retried for just the guilds that didn't finish. Posting skips
+    categories that already have a role message in the guild, which makes
+    retries safe.
+    """
+    def __init__(self, role_handler, concurrency: int):
+        self.role_handler = role_handler
+        self.bot = role_handler.bot
+        self.registry = role_handler.registry
+        self.concurrency = max(1, concurrency)
+        self.running = False  # Whether a job is running; one at a time
+
+    def select_guilds(self, selection: str) -> List[int]:
+        """
+        Parses a guild selection
+
+        Args:
+            selection: 'all' for every guild the bot is in, or guild IDs separated by commas or spaces
+
+        Returns:
+            The selected guild IDs
+
+        Raises:
+            ValueError: If the selection can't be parsed
+        """
+        if selection.strip().lower() == "all":
+            return [guild.id for guild in self.bot.guilds]
+
+        guild_ids = []
+        for part in selection.replace(",", " ").split():
+            if not part.isdigit():
+                raise ValueError(f"'{part}' isn't a server ID; pass server IDs or `all`")
+            guild_ids.append(int(part))
+
+        if not guild_ids:
+            raise ValueError("Pass server IDs or `all`")
+        return list(dict.fromkeys(guild_ids))
+
+    async def start(self, guild_ids: Iterable[int], channel_name: Optional[str] = None, mode: Optional[str] = None) -> FleetJob:
+        """
+        Runs a new fleet job
+
+        Args:
+            guild_ids: IDs of the guilds to provision
+            channel_name: Name of the channel to post missing role messages in, or None to only provision roles
+            mode: 'reactions' or 'components' for posted messages (defaults to ROLE_PICKER_MODE)
+
+        Returns:
+            The finished job
+
+        Raises:
+            ValueError: If another fleet job is running
+        """
+        if self.running:
+            raise ValueError("Another fleet job is running")
+
+        guilds = []
+        for guild_id in guild_ids:
+            guild = self.bot.get_guild(guild_id)
+            guilds.append((guild_id, guild.name if guild is not None else str(guild_id)))
+
+        job_id = self.registry.create_fleet_job(guilds, channel_name, mode)
+        job = FleetJob.from_registry(self.registry.load_fleet_job(job_id))
+        logger.info("Started fleet job %s for %d servers", job_id, len(guilds), extra={"event": "fleet_job_started"})
+        await self._run(job)
+        return job
+
+    async def retry(self, job_id: Optional[int] = None) -> Optional[FleetJob]:
+        """
+        Runs a job again for the guilds that failed or never finished
+
+        Args:
+            job_id: ID of the job (defaults to the latest one)
+
+        Returns:
+            The job, or None if there is no such job
+
+        Raises:
+            ValueError: If another fleet job is running
+        """
+        if self.running:
+            raise ValueError("Another fleet job is running")
+
+        row = self.registry.load_fleet_job(job_id)
+        if row is None:
+            return None
+
+        job = FleetJob.from_registry(row)
+        logger.info(
+            "Retrying fleet job %s for %d servers", job.job_id, len(job.guilds) - job.count("done"),
+            extra={"event": "fleet_job_retried"}
+        )
+        await self._run(job)
+        return job
+
+    def load(self, job_id: Optional[int] = None) -> Optional[FleetJob]:
+        """
+        Loads a job's results from the journal
+
+        Args:
+            job_id: ID of the job (defaults to the latest one)
+        """
+        row = self.registry.load_fleet_job(job_id)
+        return FleetJob.from_registry(row) if row is not None else None
+
+    async def _run(self, job: FleetJob):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_guild(guild_id):
+            async with semaphore:
+                await self._run_guild(job, guild_id)
+
+        self.running = True
+        try:
+            await asyncio.gather(*(
+                run_guild(guild_id) for guild_id, guild in job.guilds.items() if guild["status"] != "done"
+            ))
+        finally:
+            self.running = False
+        logger.info(job.summary(), extra={"event": "fleet_job_finished"})
+
+    async def _run_guild(self, job: FleetJob, guild_id: int):
+        """
+        Provisions one guild and journals the result
+        """
+        result = {"roles_created": 0, "roles_updated": 0, "messages_posted": 0}
+        status = "failed"
+        detail = None
+
+        try:
+            guild = self.bot.get_guild(guild_id)
+            if guild is None or guild.unavailable:
+                raise ValueError("not available to this bot or worker")
+
+            provisioner = self.role_handler.provisioner
+            plan = provisioner.plan(guild)
+            roles = await provisioner.apply(plan)
+            result["roles_created"] = len(plan.creates)
+            result["roles_updated"] = len(plan.updates) + len(plan.moves)
+            if plan.unmanageable:
+                detail = f"{len(plan.unmanageable)} roles above my highest role"
+
+            if job.channel_name:
+                result["messages_posted"] = await self._post_messages(guild, job, roles)
+            status = "done"
+        except discord.Forbidden:
+            detail = "missing permissions"
+        except (ValueError, discord.HTTPException) as e:
+            detail = str(e)
+        except Exception as e:
+            logger.exception("Fleet job %s failed in server %s", job.job_id, guild_id, extra={
+                "event": "fleet_guild_failed", "guild_id": guild_id
+            })
+            detail = f"error: {e}"
+
+        job.guilds[guild_id].update(result, status=status, detail=detail)
+        self.registry.save_fleet_result(job.job_id, guild_id, status, detail=detail, **result)
+
+    async def _post_messages(self, guild: discord.Guild, job: FleetJob, roles: Dict[str, List[discord.Role]]) -> int:
+        """
+        Posts the role messages a guild doesn't have yet
+
+        Returns:
+            Number of messages posted
+        """
+        channel = discord.utils.get(guild.text_channels, name=job.channel_name)
+        if channel is None:
+            raise ValueError(f"no #{job.channel_name} channel")
+
+        permissions = channel.permissions_for(guild.me)
+        needs_reactions = (job.mode or ROLE_PICKER_MODE) == "reactions"
+        if not (permissions.send_messages and permissions.embed_links and (permissions.add_reactions or not needs_reactions)):
+            raise ValueError(f"can't post role messages in #{job.channel_name}")
+
+        handler = self.role_handler
+        posted = {data["category"] for data in handler.role_messages.values() if data["guild_id"] == guild.id}
+
+        sent = []
+        for category in handler.catalog_for(guild.id):
+            if category in posted:
+                continue
+            message = await handler.send_reaction_message(
+                channel, category, roles.get(category, []), seed=False, mode=job.mode
+            )
+            if message:
+                sent.append((message, category))
+
+        # Seed every message's reactions at once; they share the channel's bucket
+        await asyncio.gather(*(handler.seed_reactions(message, category) for message, category in sent))
+        return len(sent)
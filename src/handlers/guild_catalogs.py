@@ -0,0 +1,224 @@
+"""
+Per-guild role catalogs stored in the registry and compiled in memory
+"""
+import copy
+import logging
+from typing import Callable, Dict, Optional
+from handlers.role_catalog import RoleCatalog
+
+logger = logging.getLogger(__name__)
+
+
+class GuildCatalogs:
+    """
+    Resolves the role catalog each guild uses
+
+    Guilds use the shared catalog until an admin changes their categories.
+    The first change copies the shared catalog into the registry for that
+    guild; from then on the guild's own copy is compiled once and kept in
+    memory, so the reaction path never reads the database. Every change
+    compiles the new catalog before saving it, so an invalid change is
+    rejected without touching the stored or cached catalog.
+    """
+    def __init__(self, registry, default: Callable[[], RoleCatalog]):
+        self.registry = registry
+        self.default = default  # Returns the shared catalog, which can be reloaded at any time
+        self._compiled = {}  # guild_id -> compiled catalog, only for guilds with their own catalog
+
+    def load(self) -> int:
+        """
+        Compiles every guild catalog stored in the registry
+
+        Returns:
+            Number of guild catalogs loaded
+        """
+        self._compiled.clear()
+
+        for guild_id, data in self.registry.load_guild_catalogs().items():
+            try:
+                self._compiled[guild_id] = RoleCatalog.from_dict(data, source=f"guild {guild_id}")
+            except ValueError as e:
+                logger.warning("Ignoring invalid role catalog of guild %s: %s", guild_id, e)
+
+        return len(self._compiled)
+
+    def get(self, guild_id: Optional[int]) -> RoleCatalog:
+        """
+        Gets the catalog a guild uses
+
+        Args:
+            guild_id: ID of the guild
+
+        Returns:
+            The guild's own catalog, or the shared one
+        """
+        catalog = self._compiled.get(guild_id)
+        return catalog if catalog is not None else self.default()
+
+    def is_custom(self, guild_id: int) -> bool:
+        """
+        Whether a guild has its own catalog
+        """
+        return guild_id in self._compiled
+
+    def invalidate(self, guild_id: int):
+        """
+        Recompiles a guild's catalog from the registry
+
+        Args:
+            guild_id: ID of the guild
+        """
+        self._compiled.pop(guild_id, None)
+        data = self.registry.load_guild_catalogs(guild_id).get(guild_id)
+        if data is not None:
+            self._compiled[guild_id] = RoleCatalog.from_dict(data, source=f"guild {guild_id}")
+
+    def reset(self, guild_id: int):
+        """
+        Deletes a guild's own catalog so it goes back to the shared one
+
+        Args:
+            guild_id: ID of the guild
+        """
+        self.registry.remove_guild_catalog(guild_id)
+        self.invalidate(guild_id)
+
+    def _update(self, guild_id: int, change: Callable[[Dict], None]) -> RoleCatalog:
+        """
+        Applies a change to a copy of a guild's catalog, then validates, saves and caches it
+
+        Raises:
+            ValueError: If the change is invalid; nothing is saved
+        """
+        data = copy.deepcopy(self.get(guild_id).to_dict())
+        change(data["categories"])
+
+        catalog = RoleCatalog.from_dict(data, source=f"guild {guild_id}")
+        self.registry.save_guild_catalog(guild_id, data)
+        self._compiled[guild_id] = catalog
+        return catalog
+
+    def add_category(self, guild_id: int, name: str, title: str, color: int) -> RoleCatalog:
+        """
+        Adds a category, or retitles and recolors an existing one
+
+        Args:
+            guild_id: ID of the guild
+            name: Category name
+            title: Embed title of the category's role message
+            color: Category color
+
+        Returns:
+            The guild's new catalog
+
+        Raises:
+            ValueError: If another category already uses the title
+        """
+        def change(categories):
+            category = categories.setdefault(name, {"roles": {}, "role_colors": {}})
+            category["title"] = title
+            category["color"] = color
+
+        return self._update(guild_id, change)
+
+    def set_exclusive(self, guild_id: int, name: str, exclusive: bool) -> RoleCatalog:
+        """
+        Makes a category single-choice or multiple-choice
+
+        Args:
+            guild_id: ID of the guild
+            name: Category name
+            exclusive: Whether members can hold only one of the category's roles
+
+        Returns:
+            The guild's new catalog
+
+        Raises:
+            ValueError: If the category doesn't exist
+        """
+        def change(categories):
+            if name not in categories:
+                raise ValueError(f"Category '{name}' not found")
+            categories[name]["exclusive"] = exclusive
+
+        return self._update(guild_id, change)
+
+    def remove_category(self, guild_id: int, name: str) -> RoleCatalog:
+        """
+        Removes a category
+
+        Args:
+            guild_id: ID of the guild
+            name: Category name
+
+        Returns:
+            The guild's new catalog
+
+        Raises:
+            ValueError: If the category doesn't exist
+        """
+        def change(categories):
+            if name not in categories:
+                raise ValueError(f"Category '{name}' not found")
+            del categories[name]
+
+        return self._update(guild_id, change)
+
+    def add_role(self, guild_id: int, category: str, emoji: str, role_name: str,
+                 color: Optional[int] = None) -> RoleCatalog:
+        """
+        Maps an emoji in a category to a role, replacing the emoji's current role
+
+        Args:
+            guild_id: ID of the guild
+            category: Category name
+            emoji: Reaction emoji
+            role_name: Name of the role the emoji gives
+            color: Color for the role, instead of the category color
+
+        Returns:
+            The guild's new catalog
+
+        Raises:
+            ValueError: If the category doesn't exist
+        """
+        def change(categories):
+            data = categories.get(category)
+            if data is None:
+                raise ValueError(f"Category '{category}' not found")
+
+            old_role = data["roles"].get(emoji)
+            data["roles"][emoji] = role_name
+            if old_role is not None and old_role not in data["roles"].values():
+                data["role_colors"].pop(old_role, None)
+
+            if color is not None:
+                data["role_colors"][role_name] = color
+
+        return self._update(guild_id, change)
+
+    def remove_role(self, guild_id: int, category: str, emoji: str) -> RoleCatalog:
+        """
+        Removes an emoji from a category
+
+        Args:
+            guild_id: ID of the guild
+            category: Category name
+            emoji: Reaction emoji
+
+        Returns:
+            The guild's new catalog
+
+        Raises:
+            ValueError: If the emoji isn't in the category
+        """
+        def change(categories):
+            data = categories.get(category)
+            if data is None or emoji not in data["roles"]:
+                raise ValueError(f"{emoji} is not in category '{category}'")
+
+            role_name = data["roles"].pop(emoji)
+            if role_name not in data["roles"].values():
+                data["role_colors"].pop(role_name, None)
+
+        return self._update(guild_id, change)
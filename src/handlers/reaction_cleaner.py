@@ -0,0 +1,88 @@
+"""
+Reaction cleaner module for removing stale reactions from single-choice role messages
+"""
+import asyncio
+import logging
+import time
+from typing import Iterable
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for the gateway to echo one of our own reaction removals
+OWN_REMOVAL_TTL = 60
+
+
+class ReactionCleaner:
+    """
+    Removes a member's old reactions in the background after an exclusive role swap
+
+    Every removal the bot makes comes back as a reaction remove event. Those
+    echoes are remembered and ignored, so a late echo can't take away a role
+    the member picked again in the meantime.
+    """
+    def __init__(self, bot, rest):
+        self.bot = bot
+        self.rest = rest  # RestScheduler the removals are sent through
+        self._own_removals = {}  # (message_id, user_id, emoji) -> monotonic() deadline
+        self._tasks = set()  # Running cleanup tasks
+
+    def remove_stale(self, channel_id: int, message_id: int, user_id: int, emojis: Iterable[str]):
+        """
+        Schedules the removal of a member's reactions from a role message
+
+        Args:
+            channel_id: ID of the channel the message is in
+            message_id: ID of the role message
+            user_id: ID of the member
+            emojis: Emojis whose reactions are stale
+        """
+        # Skip reactions already being removed for an earlier click
+        emojis = [emoji for emoji in emojis if (message_id, user_id, emoji) not in self._own_removals]
+        if not emojis:
+            return
+
+        deadline = time.monotonic() + OWN_REMOVAL_TTL
+        for emoji in emojis:
+            self._own_removals[(message_id, user_id, emoji)] = deadline
+
+        task = asyncio.create_task(self._remove(channel_id, message_id, user_id, emojis))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _remove(self, channel_id: int, message_id: int, user_id: int, emojis):
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            return
+
+        message = channel.get_partial_message(message_id)
+        member = discord.Object(id=user_id)
+
+        for emoji in emojis:
+            try:
+                await self.rest.run("remove_reaction", channel_id, message.remove_reaction, emoji, member)
+            except discord.HTTPException as e:
+                # The echo will never come; stop waiting for it
+                self._own_removals.pop((message_id, user_id, emoji), None)
+                logger.warning("Could not remove stale reaction %s from message %s: %s", emoji, message_id, e)
+
+    def is_own_removal(self, payload: discord.RawReactionActionEvent) -> bool:
+        """
+        Checks whether a reaction remove event is the echo of a removal the bot made
+
+        Args:
+            payload: Reaction remove event payload
+
+        Returns:
+            True if the event should be ignored
+        """
+        now = time.monotonic()
+
+        # Forget echoes that never arrived, oldest first
+        while self._own_removals:
+            key, deadline = next(iter(self._own_removals.items()))
+            if deadline >= now:
+                break
+            del self._own_removals[key]
+
+        return self._own_removals.pop((payload.message_id, payload.user_id, str(payload.emoji)), None) is not None
@@ -0,0 +1,224 @@
+"""
+Reaction queue module for processing reaction events with a bounded worker pool
+"""
+import asyncio
+import collections
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+import discord
+from utils.metrics import metrics, Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# What happens to a reaction event when its guild's queue is full
+OVERFLOW_POLICIES = ("merge", "shed", "delay")
+
+reaction_queue_wait = metrics.register(Histogram(
+    "rolebot_reaction_queue_wait_seconds",
+    "Time reaction events waited in their guild's queue before a worker picked them up",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+))
+reaction_queue_events = metrics.register(Counter(
+    "rolebot_reaction_queue_events_total",
+    "Reaction events by what the queue did with them (queued, merged, shed, delayed)",
+    ("outcome",)
+))
+
+
+class QueuedReaction:
+    """
+    A reaction event waiting for a worker
+    """
+    __slots__ = ("payload", "add", "enqueued")
+
+    def __init__(self, payload: discord.RawReactionActionEvent, add: bool, enqueued: float):
+        self.payload = payload
+        self.add = add
+        self.enqueued = enqueued  # perf_counter() when the first event for this slot arrived
+
+
+class ReactionQueue:
+    """
+    Feeds reaction events to a fixed pool of workers through bounded per-guild queues
+
+    Guilds with pending events take turns: a worker takes one event from the
+    guild at the front of the rotation and puts the guild at the back, so a
+    guild flooded with reactions gets its share of workers without starving
+    quieter guilds. When a guild's queue is full, the overflow policy decides:
+
+    - merge: events for the same member, message and emoji replace the queued
+      one, so only the latest click is processed; if the queue is still full
+      the event waits for room
+    - shed: the event is dropped and counted; a reconcile repairs the roles
+    - delay: the event waits for room
+
+    discord.py dispatches every event in its own task, so waiting doesn't slow
+    down the gateway; each waiting event is a parked task. At most max_waiting
+    events wait per guild, and beyond that they are shed as well.
+    """
+    def __init__(
+        self,
+        process: Callable[[discord.RawReactionActionEvent, bool, float], Awaitable],
+        workers: int,
+        max_per_guild: int,
+        policy: str = "merge",
+        max_waiting: Optional[int] = None
+    ):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown reaction overflow policy '{policy}'; use one of {', '.join(OVERFLOW_POLICIES)}")
+
+        self.process = process  # Coroutine function called with (payload, add, enqueued)
+        self.worker_count = max(1, workers)
+        self.max_per_guild = max(1, max_per_guild)
+        self.policy = policy
+        self.max_waiting = self.max_per_guild if max_waiting is None else max(0, max_waiting)  # Events waiting for room per guild
+        self._queues = {}  # guild_id -> OrderedDict of slot key -> QueuedReaction
+        self._ready = asyncio.Queue()  # Guilds with queued events, in the order they get a turn
+        self._waiters = {}  # guild_id -> deque of futures waiting for room
+        self._sequence = itertools.count()  # Slot keys when events aren't merged
+        self._workers = []
+        self.busy = 0  # Workers processing an event right now
+
+    @property
+    def depth(self) -> int:
+        """
+        Events waiting across all guilds
+        """
+        return sum(len(queue) for queue in self._queues.values())
+
+    def guild_depths(self) -> Dict[int, int]:
+        """
+        Events waiting per guild
+        """
+        return {guild_id: len(queue) for guild_id, queue in self._queues.items()}
+
+    def start(self):
+        """
+        Starts the worker pool on the running event loop
+        """
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"reaction-worker-{number}")
+            for number in range(self.worker_count)
+        ]
+
+    async def stop(self):
+        """
+        Stops the workers; events still queued are dropped
+        """
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, payload: discord.RawReactionActionEvent, add: bool):
+        """
+        Queues a reaction event for its guild
+
+        Args:
+            payload: Reaction event payload
+            add: Whether the reaction was added or removed
+        """
+        guild_id = payload.guild_id
+        enqueued = time.perf_counter()
+        merging = self.policy == "merge"
+        key = (payload.message_id, payload.user_id, str(payload.emoji)) if merging else next(self._sequence)
+
+        queue = self._queues.get(guild_id)
+        if merging and queue is not None and key in queue:
+            # The newer click decides; it keeps the wait time of the first one
+            queued = queue.pop(key)
+            queue[key] = QueuedReaction(payload, add, queued.enqueued)
+            reaction_queue_events.inc("merged")
+            return
+
+        if queue is not None and len(queue) >= self.max_per_guild:
+            if self.policy == "shed" or len(self._waiters.get(guild_id, ())) >= self.max_waiting:
+                reaction_queue_events.inc("shed")
+                logger.warning(
+                    "Reaction queue of guild %s is full; dropping event", guild_id,
+                    extra={"event": "reaction_shed", "guild_id": guild_id, "member_id": payload.user_id}
+                )
+                return
+
+            reaction_queue_events.inc("delayed")
+            while queue is not None and len(queue) >= self.max_per_guild:
+                await self._wait_for_room(guild_id)
+                queue = self._queues.get(guild_id)
+
+        if queue is None:
+            queue = self._queues[guild_id] = collections.OrderedDict()
+            self._ready.put_nowait(guild_id)
+        elif merging:
+            # A click for the same slot may have been queued while this one waited
+            queue.pop(key, None)
+        queue[key] = QueuedReaction(payload, add, enqueued)
+        reaction_queue_events.inc("queued")
+
+    async def _wait_for_room(self, guild_id: int):
+        waiter = asyncio.get_running_loop().create_future()
+        waiters = self._waiters.setdefault(guild_id, collections.deque())
+        waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                # A cancelled wait must not keep its place in the line
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters and self._waiters.get(guild_id) is waiters:
+                    del self._waiters[guild_id]
+            else:
+                # Woken but cancelled before taking the room; pass it on
+                self._wake_waiter(guild_id)
+            raise
+
+    def _wake_waiter(self, guild_id: int):
+        waiters = self._waiters.get(guild_id)
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+        if not waiters:
+            self._waiters.pop(guild_id, None)
+
+    def _take(self, guild_id: int) -> QueuedReaction:
+        """
+        Takes the oldest event of a guild and gives the guild its next turn
+        """
+        queue = self._queues[guild_id]
+        _, queued = queue.popitem(last=False)
+
+        if queue:
+            # Back of the line, so other guilds go first; another worker may take the next event
+            self._ready.put_nowait(guild_id)
+        else:
+            del self._queues[guild_id]
+
+        self._wake_waiter(guild_id)
+        return queued
+
+    async def _work(self):
+        while True:
+            guild_id = await self._ready.get()
+            queued = self._take(guild_id)
+            reaction_queue_wait.observe(time.perf_counter() - queued.enqueued)
+
+            self.busy += 1
+            try:
+                await self.process(queued.payload, queued.add, queued.enqueued)
+            except Exception:
+                logger.exception(
+                    "Error handling reaction", extra={
+                        "event": "reaction_failed",
+                        "guild_id": guild_id,
+                        "channel_id": queued.payload.channel_id,
+                        "member_id": queued.payload.user_id
+                    }
+                )
+            finally:
+                self.busy -= 1
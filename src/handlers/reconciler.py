@@ -0,0 +1,408 @@
+"""
+Reconciliation module for repairing role drift caused by reactions missed while offline
+"""
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Set
+import discord
+from handlers.bulk_roles import MAX_EDIT_INTERVAL, SLOW_EDIT_SECONDS
+from utils.role_utils import member_role_ids
+
+logger = logging.getLogger(__name__)
+
+# Reactors returned per reaction users request (Discord's maximum)
+REACTORS_PAGE_SIZE = 100
+
+
+class ReconciliationPlan:
+    """
+    Minimal set of role changes that makes member roles match the reactions
+    """
+    def __init__(self, guild: discord.Guild):
+        self.guild = guild
+        self.changes = {}  # member_id -> (role IDs to add, role IDs to remove)
+        self.members = {}  # member_id -> member, for changed members missing from the member cache
+        self.role_adds = Counter()  # role name -> members gaining it
+        self.role_removes = Counter()  # role name -> members losing it
+        self.messages_checked = 0
+        self.reactors_read = 0
+
+    def add(self, member_ids: Set[int], role: discord.Role, add: bool):
+        """
+        Records that a set of members should gain or lose a role
+
+        Args:
+            member_ids: IDs of the affected members
+            role: The role to add or remove
+            add: Whether the role is added or removed
+        """
+        for member_id in member_ids:
+            adds, removes = self.changes.setdefault(member_id, (set(), set()))
+            (adds if add else removes).add(role.id)
+
+        if add:
+            self.role_adds[role.name] += len(member_ids)
+        else:
+            self.role_removes[role.name] += len(member_ids)
+
+    @property
+    def empty(self) -> bool:
+        """
+        Whether no member needs a change
+        """
+        return not self.changes
+
+    def summary_lines(self, limit: int = 20) -> List[str]:
+        """
+        Describes the plan, one line per changed role
+
+        Args:
+            limit: Maximum number of role lines
+
+        Returns:
+            List of human readable lines
+        """
+        lines = []
+        for role_name in sorted(set(self.role_adds) | set(self.role_removes)):
+            lines.append(f"{role_name}: +{self.role_adds[role_name]} / -{self.role_removes[role_name]}")
+
+        if len(lines) > limit:
+            lines = lines[:limit] + [f"...and {len(lines) - limit} more roles"]
+
+        return lines
+
+
+class ReconciliationEngine:
+    """
+    Compares reactions on registered role messages with member roles and fixes the drift
+
+    Reactors are read a page at a time through the REST scheduler and compared
+    with member roles using set operations from a single pass over the guild's
+    members. Each changed member is then edited through the role edit batcher,
+    under the member's lock and at the same pace as bulk role jobs.
+    """
+    def __init__(self, role_handler):
+        self.role_handler = role_handler
+        self.bot = role_handler.bot
+        self.rest = role_handler.rest
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether a background reconciliation is in progress
+        """
+        return self._task is not None and not self._task.done()
+
+    async def _fetch_reactors(self, message: discord.Message, reaction: discord.Reaction) -> Set[int]:
+        """
+        Reads every user who reacted with an emoji, one page per request
+        """
+        async def read_page(after):
+            return [user.id async for user in reaction.users(limit=REACTORS_PAGE_SIZE, after=after)]
+
+        reactors = set()
+        after = None
+
+        while True:
+            page = await self.rest.run("get_reactions", message.channel.id, read_page, after)
+            reactors.update(page)
+            if len(page) < REACTORS_PAGE_SIZE:
+                return reactors
+            after = discord.Object(id=max(page))
+
+    async def load_members(self, guild: discord.Guild) -> List[discord.Member]:
+        """
+        Gets every member of a guild, fetching them when the guild isn't chunked
+
+        In low-memory mode discord.py doesn't keep members, so they are streamed
+        from the API once per reconciliation instead.
+        """
+        if guild.chunked:
+            return guild.members
+
+        logger.info("Fetching members of %s", guild.name)
+        return [member async for member in guild.fetch_members(limit=None)]
+
+    def _current_holders(self, members: List[discord.Member], role_ids: Set[int]) -> Dict[int, Set[int]]:
+        """
+        Maps each role to the members holding it in one pass over the guild's members
+        """
+        holders = {role_id: set() for role_id in role_ids}
+
+        for member in members:
+            for role_id in role_ids.intersection(member_role_ids(member)):
+                holders[role_id].add(member.id)
+
+        return holders
+
+    async def build_plan(self, guild: discord.Guild, prune: bool = False) -> ReconciliationPlan:
+        """
+        Computes the role changes needed in a guild
+
+        In exclusive categories a member who already holds one of the roles keeps
+        it and gains none, and a member who reacted for several of the roles is
+        skipped, since there's no telling which one they picked last.
+
+        Args:
+            guild: The guild to reconcile
+            prune: Also remove roles from members who no longer have the reaction
+
+        Returns:
+            The reconciliation plan
+        """
+        plan = ReconciliationPlan(guild)
+        reactors_by_role = {}  # role_id -> set of member IDs that reacted for it
+        roles = {}  # role_id -> role
+        exclusive = {}  # exclusive category name -> IDs of its roles
+        unreadable = set()  # role names whose reactions couldn't all be read
+
+        for message_id, data in list(self.role_handler.role_messages.items()):
+            if data["guild_id"] != guild.id:
+                continue
+
+            category = self.role_handler.catalog_for(guild.id).get(data["category"])
+            channel = guild.get_channel(data["channel_id"])
+            if category is None or channel is None:
+                continue
+
+            if data["mode"] != "reactions":
+                # Component picks leave no reactions to compare with; never prune their roles
+                unreadable.update(category.roles.values())
+                continue
+
+            try:
+                message = await self.rest.run("fetch_message", channel.id, channel.fetch_message, message_id)
+            except discord.NotFound:
+                self.role_handler.unregister_message(message_id)
+                continue
+            except discord.HTTPException as e:
+                logger.warning("Could not fetch role message %s: %s", message_id, e)
+                unreadable.update(category.roles.values())
+                continue
+
+            plan.messages_checked += 1
+            reacted_emojis = {str(reaction.emoji): reaction for reaction in message.reactions}
+
+            for emoji, role_name in category.roles.items():
+                role = self.role_handler.role_index.get(guild, role_name)
+                if role is None:
+                    continue
+
+                roles[role.id] = role
+                if category.exclusive:
+                    exclusive.setdefault(category.name, set()).add(role.id)
+                reactors = reactors_by_role.setdefault(role.id, set())
+
+                reaction = reacted_emojis.get(emoji)
+                if reaction is not None:
+                    reactors |= await self._fetch_reactors(message, reaction)
+
+        unreadable_ids = set()
+        for role_name in unreadable:
+            role = self.role_handler.role_index.get(guild, role_name)
+            if role is not None:
+                unreadable_ids.add(role.id)
+
+        members = await self.load_members(guild)
+        holders = self._current_holders(members, set(roles))
+        member_ids = {member.id for member in members}
+        member_ids.discard(self.bot.user.id)
+        exclusive_ids = set().union(*exclusive.values())
+
+        for role_id, role in roles.items():
+            reactors = reactors_by_role[role_id]
+            plan.reactors_read += len(reactors)
+
+            # Reactors who left the guild can't be given roles
+            if role_id not in exclusive_ids:
+                plan.add((reactors & member_ids) - holders[role_id], role, add=True)
+
+            # Never prune from a partial reactor list
+            if prune and role_id not in unreadable_ids:
+                plan.add(holders[role_id] - reactors, role, add=False)
+
+        for name, role_ids in exclusive.items():
+            # Holders who are about to be pruned no longer hold the category's role
+            kept = {
+                role_id: holders[role_id] & reactors_by_role[role_id]
+                if prune and role_id not in unreadable_ids else holders[role_id]
+                for role_id in role_ids
+            }
+            self._plan_exclusive(plan, guild, name, kept, reactors_by_role, member_ids, roles)
+
+        if not guild.chunked:
+            # Keep the fetched members apply() needs; the rest can be freed
+            plan.members = {member.id: member for member in members if member.id in plan.changes}
+
+        return plan
+
+    def _plan_exclusive(
+        self,
+        plan: ReconciliationPlan,
+        guild: discord.Guild,
+        name: str,
+        holders: Dict[int, Set[int]],
+        reactors_by_role: Dict[int, Set[int]],
+        member_ids: Set[int],
+        roles: Dict[int, discord.Role]
+    ):
+        """
+        Adds at most one role of an exclusive category per member to a plan
+        """
+        held = set().union(*holders.values())
+        picks = {}  # member_id -> IDs of the roles they reacted for
+        for role_id in holders:
+            for member_id in (reactors_by_role[role_id] & member_ids) - held:
+                picks.setdefault(member_id, []).append(role_id)
+
+        adds = {}  # role_id -> IDs of the members gaining it
+        ambiguous = 0
+        for member_id, role_ids in picks.items():
+            if len(role_ids) == 1:
+                adds.setdefault(role_ids[0], set()).add(member_id)
+            else:
+                ambiguous += 1
+
+        for role_id, added in adds.items():
+            plan.add(added, roles[role_id], add=True)
+
+        if ambiguous:
+            logger.info(
+                "Skipped %d members of %s who reacted for several roles of exclusive category %s",
+                ambiguous, guild.name, name
+            )
+
+    async def apply(self, plan: ReconciliationPlan) -> int:
+        """
+        Applies a plan through the role edit batcher, paced like bulk role jobs
+
+        Cached members get one edit with their whole role list; members only
+        known from the plan's snapshot get per-role adds and removes, so changes
+        made since the plan was built aren't undone.
+
+        Args:
+            plan: The plan to apply
+
+        Returns:
+            Number of members edited
+        """
+        guild = plan.guild
+        edited = 0
+        total = len(plan.changes)
+        base_interval = self.role_handler.bulk_jobs.edit_interval
+        interval = base_interval
+        next_edit = time.monotonic()
+
+        for done, (member_id, (adds, removes)) in enumerate(plan.changes.items(), start=1):
+            member = guild.get_member(member_id) or plan.members.get(member_id)
+            if member is None:
+                continue
+
+            delay = next_edit - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            sent = time.monotonic()
+            try:
+                if await self.role_handler.role_edits.apply_now(member, adds, removes):
+                    edited += 1
+            except discord.HTTPException as e:
+                logger.warning("Failed to reconcile roles for member %s: %s", member_id, e)
+
+            # Back off while edits wait on the rate limit, then ease towards the configured pace
+            if time.monotonic() - sent > SLOW_EDIT_SECONDS:
+                interval = min(MAX_EDIT_INTERVAL, max(interval * 2, 0.1))
+            else:
+                interval = max(base_interval, interval * 0.9)
+            next_edit = time.monotonic() + interval
+
+            if done % 100 == 0:
+                logger.info("Reconciling %s: %d/%d members", guild.name, done, total)
+
+        return edited
+
+    async def reconcile_guild(
+        self,
+        guild: discord.Guild,
+        dry_run: bool = False,
+        prune: bool = False
+    ) -> ReconciliationPlan:
+        """
+        Builds and (unless dry_run) applies the reconciliation plan for a guild
+
+        Args:
+            guild: The guild to reconcile
+            dry_run: Only compute the plan
+            prune: Also remove roles from members who no longer have the reaction
+
+        Returns:
+            The computed plan
+        """
+        started = time.perf_counter()
+        plan = await self.build_plan(guild, prune=prune)
+
+        if not dry_run and not plan.empty:
+            edited = await self.apply(plan)
+            logger.info(
+                "Reconciled %s: edited %d members in %.1fs",
+                guild.name, edited, time.perf_counter() - started
+            )
+
+        return plan
+
+    async def reconcile_all(self, dry_run: bool = False, prune: bool = False) -> Dict[int, ReconciliationPlan]:
+        """
+        Reconciles every guild with registered role messages concurrently
+
+        Args:
+            dry_run: Only compute the plans
+            prune: Also remove roles from members who no longer have the reaction
+
+        Returns:
+            Dictionary mapping guild IDs to their plans
+        """
+        guild_ids = {data["guild_id"] for data in self.role_handler.role_messages.values()}
+        guilds = [guild for guild in self.bot.guilds if guild.id in guild_ids]
+
+        plans = await asyncio.gather(
+            *(self.reconcile_guild(guild, dry_run=dry_run, prune=prune) for guild in guilds),
+            return_exceptions=True
+        )
+
+        results = {}
+        for guild, plan in zip(guilds, plans):
+            if isinstance(plan, Exception):
+                logger.error("Reconciliation failed in %s: %s", guild.name, plan)
+            else:
+                results[guild.id] = plan
+        return results
+
+    def schedule(self, prune: bool = False, after: Optional[asyncio.Task] = None) -> bool:
+        """
+        Starts a background reconciliation of every guild
+
+        Args:
+            prune: Also remove roles from members who no longer have the reaction
+            after: Task to wait for first, e.g. the startup scan
+
+        Returns:
+            True if a reconciliation was started
+        """
+        if self.running:
+            return False
+
+        async def run():
+            if after is not None:
+                await asyncio.wait([after])
+            try:
+                plans = await self.reconcile_all(prune=prune)
+                drifted = sum(len(plan.changes) for plan in plans.values())
+                logger.info("Reconciliation finished: %d members had drifted roles across %d servers", drifted, len(plans))
+            except Exception:
+                logger.exception("Error during reconciliation")
+
+        self._task = asyncio.create_task(run())
+        return True
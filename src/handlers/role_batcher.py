@@ -0,0 +1,309 @@
+"""
+Role edit batcher module for coalescing reaction-driven role changes
+"""
+import asyncio
+import contextlib
+import copy
+import logging
+import time
+from typing import Iterable, Optional, Set
+import discord
+from utils.metrics import reaction_latency
+from utils.perf import perf
+from utils.role_shadow import noop_role_edits
+
+logger = logging.getLogger(__name__)
+
+
+class PendingEdit:
+    """
+    Role changes waiting to be flushed for a single member
+    """
+    __slots__ = ("member", "adds", "removes", "started")
+
+    def __init__(self, member):
+        self.member = member
+        self.adds = set()  # Role IDs to add
+        self.removes = set()  # Role IDs to remove
+        self.started = []  # perf_counter() timestamps of the events that queued changes
+
+
+class RoleEditBatcher:
+    """
+    Collects a member's role changes for a short window and applies them in one edit
+
+    Every member edit in a guild shares the same rate limit bucket, so a member
+    clicking through several role messages would otherwise cost one REST call
+    per click. Changes are accumulated per (guild, member), opposite toggles
+    cancel out, and the final role set is sent with a single member.edit call.
+    """
+    def __init__(self, bot, window: float, rest, member_cache=None, on_edit=None):
+        self.bot = bot
+        self.window = window  # Seconds to wait for more changes before flushing
+        self.rest = rest  # RestScheduler the edits are sent through
+        self.member_cache = member_cache  # Optional MemberCache refreshed with edited members
+        self.on_edit = on_edit  # Optional callback(member, before, after) with the role IDs of each edit
+        self._pending = {}  # (guild_id, member_id) -> PendingEdit
+        self._locks = {}  # (guild_id, member_id) -> [asyncio.Lock serialising flushes, callers holding or awaiting it]
+        self._tasks = set()  # Scheduled flush tasks
+
+    def queue(self, member: discord.Member, role: discord.Role, add: bool = True, started: Optional[float] = None,
+              exclusive_with: Iterable[int] = ()):
+        """
+        Queues a role change for a member
+
+        Args:
+            member: The member whose roles change
+            role: The role to add or remove
+            add: Whether to add or remove the role
+            started: perf_counter() time the triggering event arrived, for latency metrics
+            exclusive_with: IDs of roles an added role replaces; they are removed in the same edit
+        """
+        key = (member.guild.id, member.id)
+        pending = self._pending.get(key)
+
+        if pending is None:
+            pending = self._pending[key] = PendingEdit(member)
+            task = asyncio.create_task(self._flush_later(key))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            pending.member = member
+
+        if add:
+            # The latest pick wins over earlier picks still waiting in the window
+            for role_id in exclusive_with:
+                if role_id != role.id:
+                    pending.adds.discard(role_id)
+                    pending.removes.add(role_id)
+            pending.removes.discard(role.id)
+            pending.adds.add(role.id)
+        else:
+            pending.adds.discard(role.id)
+            pending.removes.add(role.id)
+
+        if started is not None:
+            pending.started.append(started)
+
+    @perf.timed()
+    async def apply_now(self, member: discord.Member, adds: Set[int], removes: Set[int],
+                        started: Optional[float] = None) -> bool:
+        """
+        Applies a role change immediately, together with any changes still queued for the member
+
+        Used by component pickers, which answer the click right away. The member's
+        flush lock is held, so the edit can't interleave with a reaction flush.
+
+        Args:
+            member: The member whose roles change
+            adds: Role IDs to add
+            removes: Role IDs to remove
+            started: perf_counter() time the triggering event arrived, for latency metrics
+
+        Returns:
+            True if an edit was sent
+
+        Raises:
+            discord.HTTPException: If the edit failed
+        """
+        key = (member.guild.id, member.id)
+
+        async with self._member_lock(key):
+            # Take over queued reaction changes; this edit wins where they disagree
+            queued = self._pending.pop(key, None)
+            pending = PendingEdit(member)
+            if queued is not None:
+                pending.adds = set(queued.adds)
+                pending.removes = set(queued.removes)
+                pending.started = list(queued.started)
+            pending.adds = (pending.adds - removes) | adds
+            pending.removes = (pending.removes - adds) | removes
+            if started is not None:
+                pending.started.append(started)
+
+            try:
+                edited = await self._apply(pending)
+            except BaseException:
+                # Give the queued reaction changes back, merged with anything queued since
+                if queued is not None:
+                    self._requeue(key, queued)
+                raise
+
+            finished = time.perf_counter()
+            for started in pending.started:
+                reaction_latency.observe(finished - started)
+
+        return edited
+
+    @contextlib.asynccontextmanager
+    async def _member_lock(self, key):
+        """
+        Holds a member's flush lock, dropping it once no caller holds or awaits it
+        """
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and self._locks.get(key) is entry:
+                del self._locks[key]
+
+    def _requeue(self, key, queued: PendingEdit):
+        """
+        Puts changes taken from the queue back, behind any queued for the member since
+        """
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = queued
+            task = asyncio.create_task(self._flush_later(key))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return
+
+        # Changes queued later win where they disagree
+        pending.adds |= queued.adds - pending.removes
+        pending.removes |= queued.removes - pending.adds
+        pending.started = queued.started + pending.started
+
+    def pending_adds(self, member: discord.Member) -> Set[int]:
+        """
+        Gets the role IDs queued to be added to a member
+        """
+        pending = self._pending.get((member.guild.id, member.id))
+        return set(pending.adds) if pending is not None else set()
+
+    def pending_change(self, guild_id: int, member_id: int, role_id: int) -> Optional[bool]:
+        """
+        Gets the change queued for one of a member's roles
+
+        Args:
+            guild_id: ID of the guild
+            member_id: ID of the member
+            role_id: ID of the role
+
+        Returns:
+            True if the role is queued to be added, False if queued to be removed, None otherwise
+        """
+        pending = self._pending.get((guild_id, member_id))
+        if pending is None:
+            return None
+        if role_id in pending.adds:
+            return True
+        if role_id in pending.removes:
+            return False
+        return None
+
+    def is_busy(self, guild_id: int, member_id: int) -> bool:
+        """
+        Whether a member has changes queued or an edit in flight
+        """
+        key = (guild_id, member_id)
+        return key in self._pending or key in self._locks
+
+    @property
+    def pending_count(self) -> int:
+        """
+        Number of members with role changes waiting to be flushed
+        """
+        return len(self._pending)
+
+    async def _flush_later(self, key):
+        """
+        Waits for the debounce window and then flushes a member's changes
+        """
+        if self.window > 0:
+            await asyncio.sleep(self.window)
+        await self.flush(key)
+
+    @perf.timed()
+    async def flush(self, key) -> bool:
+        """
+        Applies the pending changes for a (guild, member) key with a single edit
+
+        Args:
+            key: (guild_id, member_id) tuple
+
+        Returns:
+            True if an edit was sent
+        """
+        edited = False
+
+        async with self._member_lock(key):
+            # None if the changes were already applied, e.g. by apply_now
+            pending = self._pending.pop(key, None)
+            if pending is not None:
+                try:
+                    edited = await self._apply(pending)
+                except discord.HTTPException as e:
+                    # Handle permission errors
+                    logger.warning(
+                        "Failed to update roles for member %s: %s", key[1], e,
+                        extra={"event": "role_edit_failed", "guild_id": key[0], "member_id": key[1]}
+                    )
+                else:
+                    finished = time.perf_counter()
+                    for started in pending.started:
+                        reaction_latency.observe(finished - started)
+
+        return edited
+
+    async def _apply(self, pending: PendingEdit) -> bool:
+        """
+        Computes the member's final role set and sends it if anything changed
+        """
+        member = pending.member
+        guild = member.guild
+        # The gateway keeps cached members current, so their roles can be sent whole
+        cached = guild.get_member(member.id)
+        if cached is not None:
+            # roles[0] is @everyone, which can't be sent in a role edit
+            current = {role.id for role in cached.roles[1:]}
+            final = (current - pending.removes) | pending.adds
+            if final == current:
+                noop_role_edits.inc("flush")
+                return False
+
+            await self.rest.edit_member(cached, roles=[discord.Object(id=role_id) for role_id in final])
+            if self.on_edit is not None:
+                self.on_edit(cached, current, final)
+            return True
+
+        # Otherwise the roles may be a snapshot up to the member cache's TTL old;
+        # a full role list would revert changes made since, so send only the delta
+        if self.member_cache is not None:
+            member = self.member_cache.get(guild.id, member.id) or member
+        current = {role.id for role in member.roles[1:]}
+        adds = pending.adds - current
+        removes = pending.removes & current
+        if not adds and not removes:
+            noop_role_edits.inc("flush")
+            return False
+
+        if removes:
+            await self.rest.run(
+                "edit_member", guild.id, member.remove_roles, *(discord.Object(id=role_id) for role_id in removes)
+            )
+        if adds:
+            await self.rest.run(
+                "edit_member", guild.id, member.add_roles, *(discord.Object(id=role_id) for role_id in adds)
+            )
+
+        final = (current - removes) | adds
+        if self.member_cache is not None:
+            # Keep the cached copy in step so the member's next click needs no fetch
+            updated = copy.copy(member)
+            updated._roles = discord.utils.SnowflakeList(final)
+            self.member_cache.put(updated)
+        if self.on_edit is not None:
+            self.on_edit(member, current, final)
+        return True
+
+    async def flush_all(self):
+        """
+        Flushes every pending change immediately, e.g. before shutting down
+        """
+        await asyncio.gather(*(self.flush(key) for key in list(self._pending)))
@@ -0,0 +1,261 @@
+"""
+Compiled role catalog built from the role category configuration
+"""
+import json
+import logging
+import os
+from types import MappingProxyType
+from typing import Dict, Iterator, Mapping, Optional
+from config.config import ROLE_CATEGORIES, ROLE_COLORS, CLASS_COLORS
+
+try:
+    import yaml
+except ImportError:  # YAML catalogs are optional
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+# Color used when a category doesn't set one
+DEFAULT_CATEGORY_COLOR = 0x808080
+
+
+def _parse_color(value, where: str) -> int:
+    """
+    Accepts colors as integers or hex strings like "#3498db" or "0x3498db"
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"{where}: invalid color {value!r}")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value.lstrip("#"), 16) if value.startswith("#") else int(value, 0)
+        except ValueError:
+            pass
+    raise ValueError(f"{where}: invalid color {value!r}")
+
+
+class RoleCategory:
+    """
+    One compiled, read-only role category
+    """
+    __slots__ = ("name", "title", "color", "roles", "emojis", "role_colors", "exclusive")
+
+    def __init__(self, name: str, title: str, color: int, roles: Dict[str, str], role_colors: Dict[str, int],
+                 exclusive: bool = False):
+        self.name = name
+        self.title = title
+        self.color = color
+        self.exclusive = exclusive  # Members can hold only one of the category's roles
+        self.roles = MappingProxyType(dict(roles))  # emoji -> role name, in display order
+        self.emojis = tuple(roles)
+        self.role_colors = MappingProxyType(dict(role_colors))  # role name -> color overriding the category's
+
+    def role_color(self, role_name: str) -> int:
+        """
+        Gets the color a role is created with
+        """
+        return self.role_colors.get(role_name, self.color)
+
+
+class RoleCatalog:
+    """
+    Immutable lookup tables for the role categories
+
+    Built once when the configuration is loaded, so the reaction path does
+    dictionary lookups instead of walking the nested config. Emojis are only
+    unique within a category; the same emoji in several categories (💀 is both
+    Death Knight and Hardcore) is resolved by the category of the message the
+    reaction is on, and listed in shared_emojis.
+    """
+    def __init__(self, categories, source: str = "built-in"):
+        self.source = source  # Where the catalog was loaded from
+        self.categories = MappingProxyType({category.name: category for category in categories})
+
+        by_title = {}
+        roles = {}
+        emoji_categories = {}
+        for category in self.categories.values():
+            if category.title in by_title:
+                raise ValueError(
+                    f"Categories '{by_title[category.title].name}' and '{category.name}' "
+                    f"share the title '{category.title}'"
+                )
+            by_title[category.title] = category
+
+            for emoji, role_name in category.roles.items():
+                roles[(category.name, emoji)] = role_name
+                emoji_categories.setdefault(emoji, []).append(category.name)
+
+        self._by_title = by_title  # embed title -> category
+        self._roles = roles  # (category, emoji) -> role name
+        self.shared_emojis = MappingProxyType({
+            emoji: tuple(names) for emoji, names in emoji_categories.items() if len(names) > 1
+        })
+
+    def __contains__(self, category: str) -> bool:
+        return category in self.categories
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.categories)
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def get(self, category: str) -> Optional[RoleCategory]:
+        return self.categories.get(category)
+
+    def category_for_title(self, title: str) -> Optional[RoleCategory]:
+        """
+        Finds the category whose role message has the given embed title
+        """
+        return self._by_title.get(title)
+
+    def role_for(self, category: str, emoji: str) -> Optional[str]:
+        """
+        Resolves a reaction on a category's message to a role name
+        """
+        return self._roles.get((category, emoji))
+
+    def role_names(self) -> Iterator[str]:
+        """
+        Iterates over every role name in the catalog, in category order
+        """
+        for category in self.categories.values():
+            yield from category.roles.values()
+
+    def to_dict(self) -> dict:
+        """
+        Converts the catalog back to its file representation, with integer colors
+        """
+        return {
+            "categories": {
+                category.name: {
+                    "title": category.title,
+                    "color": category.color,
+                    "roles": dict(category.roles),
+                    "role_colors": dict(category.role_colors),
+                    "exclusive": category.exclusive,
+                }
+                for category in self.categories.values()
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping, source: str = "built-in") -> "RoleCatalog":
+        """
+        Compiles a catalog from its file representation
+
+        Expected layout:
+            {"categories": {name: {"title": str, "color": color, "roles": {emoji: role name},
+                                   "role_colors": {role name: color}, "exclusive": bool}}}
+
+        Args:
+            data: The parsed catalog
+            source: Description of where the data came from, for errors
+
+        Returns:
+            The compiled catalog
+
+        Raises:
+            ValueError: If the data is malformed
+        """
+        raw_categories = data.get("categories") if isinstance(data, Mapping) else None
+        if not isinstance(raw_categories, Mapping):
+            raise ValueError(f"{source}: expected a 'categories' mapping")
+
+        categories = []
+        for name, raw in raw_categories.items():
+            where = f"{source}: category '{name}'"
+            if not isinstance(raw, Mapping):
+                raise ValueError(f"{where}: expected a mapping")
+
+            title = raw.get("title")
+            if not isinstance(title, str) or not title:
+                raise ValueError(f"{where}: missing title")
+
+            roles = raw.get("roles", {})
+            if not isinstance(roles, Mapping):
+                raise ValueError(f"{where}: expected a 'roles' mapping")
+            if not all(isinstance(key, str) and isinstance(value, str) and value for key, value in roles.items()):
+                raise ValueError(f"{where}: roles must map emojis to role names")
+
+            color = _parse_color(raw.get("color", DEFAULT_CATEGORY_COLOR), where)
+            raw_role_colors = raw.get("role_colors") or {}
+            if not isinstance(raw_role_colors, Mapping):
+                raise ValueError(f"{where}: expected a 'role_colors' mapping")
+            role_colors = {
+                role_name: _parse_color(role_color, f"{where}, role '{role_name}'")
+                for role_name, role_color in raw_role_colors.items()
+            }
+            exclusive = raw.get("exclusive", False)
+            if not isinstance(exclusive, bool):
+                raise ValueError(f"{where}: exclusive must be true or false")
+
+            categories.append(RoleCategory(str(name), title, color, roles, role_colors, exclusive))
+
+        return cls(categories, source)
+
+
+def default_catalog_data() -> dict:
+    """
+    Builds the catalog file representation of the categories in config.py
+    """
+    return {
+        "categories": {
+            category: {
+                "title": data["title"],
+                "color": ROLE_COLORS.get(category, DEFAULT_CATEGORY_COLOR),
+                "roles": dict(data["roles"]),
+                "role_colors": {
+                    role_name: CLASS_COLORS[role_name]
+                    for role_name in data["roles"].values()
+                    if category == "classes" and role_name in CLASS_COLORS
+                },
+                "exclusive": data.get("exclusive", False),
+            }
+            for category, data in ROLE_CATEGORIES.items()
+        }
+    }
+
+
+def load_catalog(path: Optional[str] = None) -> RoleCatalog:
+    """
+    Loads and compiles the role catalog
+
+    Args:
+        path: JSON or YAML catalog file; None or empty uses the categories in config.py
+
+    Returns:
+        The compiled catalog
+
+    Raises:
+        OSError: If the file can't be read
+        ValueError: If the file can't be parsed or is malformed
+    """
+    if not path:
+        catalog = RoleCatalog.from_dict(default_catalog_data())
+    else:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            if yaml is None:
+                raise ValueError(f"{path}: install PyYAML to load YAML role catalogs")
+            try:
+                data = yaml.safe_load(text)
+            except yaml.YAMLError as e:
+                raise ValueError(f"{path}: {e}") from e
+        else:
+            try:
+                data = json.loads(text)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}: {e}") from e
+
+        catalog = RoleCatalog.from_dict(data, source=path)
+
+    for emoji, categories in catalog.shared_emojis.items():
+        logger.info("Emoji %s is used by categories %s; reactions resolve by message category",
+                    emoji, ", ".join(categories))
+
+    return catalog
@@ -1,9 +1,44 @@
 """
 Role handler module for managing role creation and role assignment via reactions
 """
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
 import discord
 from discord.ext import commands
-from config.config import ROLE_CATEGORIES, ROLE_COLORS, CLASS_COLORS
+from config.config import (
+    REGISTRY_PATH, REGISTRY_VERIFY_SAMPLE, ROLE_EDIT_DEBOUNCE, SCAN_CONCURRENCY, MEMBER_CACHE_SIZE,
+    MEMBER_CACHE_TTL, ROLE_CATALOG_PATH, ROLE_PICKER_MODE, REACTION_WORKERS, REACTION_QUEUE_SIZE,
+    REACTION_OVERFLOW, ROLE_SHADOW_SIZE, ROLE_SHADOW_TTL, ROLE_STATS_MAX_AGE, BULK_EDITS_PER_SECOND,
+    BULK_PROGRESS_INTERVAL, PROVISION_REORDER, FLEET_CONCURRENCY
+)
+from handlers.role_catalog import RoleCatalog, load_catalog
+from handlers.guild_catalogs import GuildCatalogs
+from handlers.role_registry import RoleRegistry
+from handlers.role_index import RoleIndex
+from handlers.role_batcher import RoleEditBatcher
+from handlers.scan_scheduler import ScanScheduler
+from handlers.reconciler import ReconciliationEngine
+from handlers.role_picker import build_picker_view
+from handlers.reaction_cleaner import ReactionCleaner
+from handlers.reaction_queue import ReactionQueue
+from handlers.role_stats import RoleStats
+from handlers.bulk_roles import BulkRoleJobs
+from handlers.role_provisioner import RoleProvisioner
+from handlers.fleet import FleetProvisioner
+from utils.rest_scheduler import rest_scheduler
+from utils.shard_utils import owns_guild
+from utils.member_cache import MemberCache
+from utils.role_shadow import RoleShadow, noop_role_edits
+from utils.role_utils import build_role_embed, member_role_ids
+from utils.perf import perf
+
+logger = logging.getLogger(__name__)
+
+# Messages read between deep scan checkpoints (one history page)
+DEEP_SCAN_PAGE_SIZE = 100
 
 class RoleHandler:
     """
@@ -11,226 +46,774 @@ class RoleHandler:
     """
     def __init__(self, bot):
         self.bot = bot
+        self.catalog = load_catalog(ROLE_CATALOG_PATH)  # Shared compiled role categories, swapped whole on reload
         self.role_messages = {}  # Tracks message IDs for reaction role messages
+        self.category_messages = {}  # (guild_id, channel_id, category) -> latest role message ID
+        self.registry = RoleRegistry(REGISTRY_PATH)  # Persists role_messages between restarts
+        self.guild_catalogs = GuildCatalogs(self.registry, lambda: self.catalog)  # Guilds' own categories
+        self.rest = rest_scheduler  # Paces REST calls per rate limit bucket
+        self.role_index = RoleIndex(self.registry)  # Resolves configured role names in O(1)
+        self.provisioner = RoleProvisioner(self, PROVISION_REORDER)  # Diffs catalog roles against guild roles
+        self.fleet = FleetProvisioner(self, FLEET_CONCURRENCY)  # Provisions many guilds in one job
+        self.member_cache = MemberCache(MEMBER_CACHE_SIZE, MEMBER_CACHE_TTL)  # Members seen when discord.py doesn't cache them
+        self.role_shadow = RoleShadow(ROLE_SHADOW_SIZE, ROLE_SHADOW_TTL)  # Recently seen member roles, to skip no-op edits
+        self.role_edits = RoleEditBatcher(  # Coalesces role changes per member
+            bot, ROLE_EDIT_DEBOUNCE, self.rest, self.member_cache, self.record_edit
+        )
+        self.scan_scheduler = ScanScheduler(self, SCAN_CONCURRENCY)  # Runs startup scans in the background
+        self.deep_scans = {}  # channel_id -> running deep scan task
+        self.reconciler = ReconciliationEngine(self)  # Repairs roles for reactions missed while offline
+        self.reaction_cleaner = ReactionCleaner(bot, self.rest)  # Removes stale reactions after exclusive swaps
+        self.role_stats = RoleStats(self, ROLE_STATS_MAX_AGE)  # Incrementally kept role member counts
+        self.bulk_jobs = BulkRoleJobs(  # Resumable bulk remove, migrate and merge jobs
+            self, BULK_EDITS_PER_SECOND, BULK_PROGRESS_INTERVAL
+        )
+        self.reaction_queue = ReactionQueue(  # Bounded per-guild queues drained by a worker pool
+            self.handle_reaction, REACTION_WORKERS, REACTION_QUEUE_SIZE, REACTION_OVERFLOW
+        )
 
-    async def create_roles(self, guild):
+    def catalog_for(self, guild_id: int) -> RoleCatalog:
         """
-        Creates all roles defined in the config if they don't already exist
+        Gets the role catalog a guild uses
 
         Args:
-            guild (discord.Guild): The guild to create roles in
+            guild_id: ID of the guild
+
+        Returns:
+            The guild's own catalog, or the shared one
+        """
+        return self.guild_catalogs.get(guild_id)
+
+    def reload_catalog(self) -> RoleCatalog:
+        """
+        Reloads the shared role catalog from ROLE_CATALOG_PATH without a restart
+
+        The new catalog is compiled completely before it replaces the old one, so
+        reactions handled during the reload see either catalog, never a mix.
+        Guilds with their own catalog aren't affected. Messages of categories
+        that no longer exist stay registered but are ignored.
+
+        Returns:
+            The new catalog
+
+        Raises:
+            OSError: If the catalog file can't be read
+            ValueError: If the catalog file is malformed; the old catalog stays active
+        """
+        catalog = load_catalog(ROLE_CATALOG_PATH)
+        self.catalog = catalog
+        return catalog
+
+    def register_message(self, message, category, mode="reactions"):
+        """
+        Tracks a role message for reaction handling and records it in the registry
+
+        Args:
+            message (discord.Message): The role message
+            category (str): Category name from the catalog
+            mode (str): 'reactions' or 'components', how members pick roles on the message
+        """
+        self._track_message(message.id, {
+            "category": category,
+            "guild_id": message.guild.id,
+            "channel_id": message.channel.id,
+            "mode": mode
+        })
+        self.registry.save_message(message.id, message.guild.id, message.channel.id, category, mode)
+
+    def unregister_message(self, message_id):
+        """
+        Stops tracking a role message and removes it from the registry
+
+        Args:
+            message_id (int): ID of the role message
+        """
+        data = self.role_messages.pop(message_id, None)
+        if data is not None:
+            key = (data["guild_id"], data["channel_id"], data["category"])
+            if self.category_messages.get(key) == message_id:
+                del self.category_messages[key]
+        self.registry.remove_message(message_id)
+
+    def _track_message(self, message_id, data):
+        self.role_messages[message_id] = data
+        self.category_messages[(data["guild_id"], data["channel_id"], data["category"])] = message_id
+
+    def find_message(self, guild_id, channel_id, category) -> Optional[int]:
+        """
+        Looks up a category's role message in a channel without any API calls
+
+        Args:
+            guild_id (int): ID of the guild
+            channel_id (int): ID of the channel
+            category (str): Category name from the catalog
+
+        Returns:
+            int: ID of the latest role message posted for the category, or None
+        """
+        return self.category_messages.get((guild_id, channel_id, category))
+
+    def record_edit(self, member, before, after):
+        """
+        Records the roles the bot just gave a member
+
+        Args:
+            member (discord.Member): The edited member
+            before: The member's role IDs before the edit
+            after: The member's role IDs after the edit
+        """
+        self.role_shadow.set_roles(member.guild.id, member.id, after)
+
+        # Edits to cached members come back through on_member_update, which counts them
+        if member.guild.get_member(member.id) is None:
+            self.role_stats.member_updated(member.guild.id, before, after)
+
+    def load_registry(self) -> int:
+        """
+        Loads the role messages and guild catalogs recorded by previous runs without touching the Discord API
 
         Returns:
-            dict: Categories mapped to lists of created role objects
+            Number of role messages loaded
         """
-        created_roles = {}
+        loaded = 0
+        self.guild_catalogs.load()
+
+        for entry in self.registry.load_messages():
+            # Other worker processes handle guilds on shards we don't run
+            if not owns_guild(self.bot, entry["guild_id"]):
+                continue
+
+            category = entry["category"]
+            if category not in self.catalog_for(entry["guild_id"]):
+                # Category was removed from the config since the message was posted
+                self.registry.remove_message(entry["message_id"])
+                continue
+
+            self._track_message(entry["message_id"], {
+                "category": category,
+                "guild_id": entry["guild_id"],
+                "channel_id": entry["channel_id"],
+                "mode": entry["mode"]
+            })
+            loaded += 1
+
+        return loaded
+
+    @perf.timed()
+    async def verify_registered_messages(self, sample_size: int = REGISTRY_VERIFY_SAMPLE) -> int:
+        """
+        Spot-checks a few registered messages per guild and forgets the ones that are gone
 
-        for category, data in ROLE_CATEGORIES.items():
-            category_roles = []
-            category_color = ROLE_COLORS.get(category, 0x808080)  # Default to gray if no color set
+        Entries whose channel no longer exists are dropped without an API call;
+        only a random sample of the rest is fetched.
 
-            for emoji, role_name in data["roles"].items():
-                # Check if role already exists
-                existing_role = discord.utils.get(guild.roles, name=role_name)
+        Args:
+            sample_size: Maximum number of messages fetched per guild
 
-                if existing_role:
-                    category_roles.append(existing_role)
-                else:
-                    # Determine role color
-                    if category == "classes" and role_name in CLASS_COLORS:
-                        role_color = CLASS_COLORS[role_name]
-                    else:
-                        role_color = category_color
+        Returns:
+            Number of stale entries removed
+        """
+        removed = 0
+        by_guild = {}
+
+        for message_id, data in list(self.role_messages.items()):
+            guild = self.bot.get_guild(data["guild_id"])
+            if guild is None:
+                # Guild is unavailable or the bot left it; keep the entry for later
+                continue
+
+            channel = guild.get_channel(data["channel_id"])
+            if channel is None:
+                self.unregister_message(message_id)
+                removed += 1
+                continue
+
+            by_guild.setdefault(guild.id, []).append((message_id, channel))
+
+        for entries in by_guild.values():
+            for message_id, channel in random.sample(entries, min(sample_size, len(entries))):
+                try:
+                    await channel.fetch_message(message_id)
+                except discord.NotFound:
+                    self.unregister_message(message_id)
+                    removed += 1
+                except discord.HTTPException:
+                    # Missing access or a transient error; don't drop the entry on a guess
+                    continue
+
+        return removed
+
+    @perf.timed()
+    async def create_roles(self, guild, categories=None):
+        """
+        Makes sure the catalog's roles exist with the right settings
 
-                    # Create new role
-                    new_role = await guild.create_role(
-                        name=role_name,
-                        color=discord.Color(role_color),
-                        mentionable=True
-                    )
-                    category_roles.append(new_role)
+        Only the difference between the catalog and the guild is applied, and a
+        guild provisioned since its last role event costs no REST calls at all.
 
-            created_roles[category] = category_roles
+        Args:
+            guild (discord.Guild): The guild to create roles in
+            categories (list, optional): Only provision these categories
 
-        return created_roles
+        Returns:
+            dict: Categories mapped to lists of role objects
+        """
+        return await self.provisioner.provision(guild, categories)
 
-    async def send_reaction_message(self, channel, category, roles):
+    @perf.timed()
+    async def send_reaction_message(self, channel, category, roles, seed=True, mode=None):
         """
         Sends a message with reactions for role selection
 
         Args:
             channel (discord.TextChannel): Channel to send the message to
-            category (str): Category name from the config
+            category (str): Category name from the catalog
             roles (list): List of role objects
+            seed (bool): Whether to wait for the bot's reactions to be added;
+                pass False and call seed_reactions to seed several messages at once
+            mode (str): 'reactions', or 'components' for a select menu instead of
+                reactions; defaults to ROLE_PICKER_MODE
 
         Returns:
             discord.Message: The sent message
         """
-        category_data = ROLE_CATEGORIES.get(category)
+        mode = mode or ROLE_PICKER_MODE
+        category_data = self.catalog_for(channel.guild.id).get(category)
 
-        if not category_data:
+        # Categories without roles have nothing to react to
+        if not category_data or not category_data.roles:
             return None
 
-        # Create embed for roles
-        embed = discord.Embed(
-            title=category_data["title"],
-            description="React to get your roles!",
-            color=discord.Color(ROLE_COLORS.get(category, 0x808080))
-        )
-
-        # Add roles to embed description
-        role_descriptions = []
-        for emoji, role_name in category_data["roles"].items():
-            # Simply display emoji and role name without color codes
-            role_descriptions.append(f"{emoji} - {role_name}")
+        # Create embed listing each emoji and its role
+        embed = build_role_embed(category_data.title, category_data.roles, discord.Color(category_data.color))
 
-        embed.description = "\n".join(role_descriptions)
+        if mode == "components":
+            # The select menu needs no seeding; its clicks are routed by custom_id
+            message = await channel.send(embed=embed, view=build_picker_view(category_data))
+            self.register_message(message, category, mode)
+            return message
 
         # Send message with embed
         message = await channel.send(embed=embed)
 
-        # Add reactions to message
-        for emoji in category_data["roles"].keys():
-            await message.add_reaction(emoji)
-
         # Store message ID for reaction handling
-        self.role_messages[message.id] = {
-            "category": category,
-            "roles": {emoji: role_name for emoji, role_name in category_data["roles"].items()}
-        }
+        self.register_message(message, category)
+
+        # Add reactions to message
+        if seed:
+            await self.seed_reactions(message, category)
 
         return message
 
-    async def handle_reaction(self, payload, add=True):
+    @perf.timed()
+    async def seed_reactions(self, message, category):
+        """
+        Adds a category's emojis to a role message through the REST scheduler
+
+        Args:
+            message (discord.Message): The role message
+            category (str): Category name from the catalog
+
+        Returns:
+            int: Number of reactions added
+        """
+        category_data = self.catalog_for(message.guild.id).get(category)
+        message_data = self.role_messages.get(message.id)
+        if category_data is None or (message_data and message_data["mode"] != "reactions"):
+            return 0
+
+        results = await self.rest.add_reactions(message, category_data.emojis)
+        return sum(results)
+
+    @perf.timed()
+    async def update_role_message(self, message, category):
+        """
+        Brings a posted role message in line with its category without reposting it
+
+        The embed is edited only if it changed, and only the emojis that were
+        added to or removed from the category are reacted or cleared, so
+        members' existing reactions keep matching their roles.
+
+        Args:
+            message (discord.Message): The role message, fetched so its embed and reactions are current
+            category (str): Category name from the catalog
+
+        Returns:
+            tuple: Number of emojis added and number removed
+        """
+        category_data = self.catalog_for(message.guild.id).get(category)
+        message_data = self.role_messages.get(message.id)
+        mode = message_data["mode"] if message_data else "reactions"
+        channel_id = message.channel.id
+
+        embed = build_role_embed(category_data.title, category_data.roles, discord.Color(category_data.color))
+        if mode == "components":
+            # The select menu lists the roles too; it has to be rebuilt with the embed
+            view = build_picker_view(category_data)
+            await self.rest.run("edit_message", channel_id, message.edit, embed=embed, view=view)
+            return 0, 0
+
+        current = message.embeds[0] if message.embeds else None
+        if current is None or (current.title, current.description, current.color) != (embed.title, embed.description, embed.color):
+            await self.rest.run("edit_message", channel_id, message.edit, embed=embed)
+
+        emojis = set(category_data.emojis)
+        seeded = {str(reaction.emoji) for reaction in message.reactions if reaction.me}
+        stale = [str(reaction.emoji) for reaction in message.reactions if str(reaction.emoji) not in emojis]
+
+        added = sum(await self.rest.add_reactions(message, [emoji for emoji in category_data.emojis if emoji not in seeded]))
+
+        removed = 0
+        for emoji in stale:
+            try:
+                try:
+                    # Reactions of an emoji that no longer grants a role only mislead members
+                    await self.rest.run("clear_reaction", channel_id, message.clear_reaction, emoji)
+                except discord.Forbidden:
+                    # Without Manage Messages only the bot's own reaction can go
+                    if emoji not in seeded:
+                        continue
+                    await self.rest.run("remove_reaction", channel_id, message.remove_reaction, emoji, message.guild.me)
+                removed += 1
+            except discord.HTTPException as e:
+                logger.warning("Error removing reaction %s: %s", emoji, e, extra={
+                    "event": "reaction_remove_failed", "guild_id": message.guild.id
+                })
+
+        return added, removed
+
+    async def queue_reaction(self, payload, add=True):
+        """
+        Queues a reaction event for the worker pool
+
+        Reactions on messages that aren't role messages are dropped right away,
+        so they never take up room in a guild's queue.
+
+        Args:
+            payload (discord.RawReactionActionEvent): Reaction event payload
+            add (bool): Whether the reaction was added or removed
+        """
+        if payload.message_id not in self.role_messages:
+            return
+
+        await self.reaction_queue.submit(payload, add)
+
+    @perf.timed()
+    async def handle_reaction(self, payload, add=True, started=None):
         """
         Handles reaction addition/removal and updates user roles
 
         Args:
             payload (discord.RawReactionActionEvent): Reaction event payload
             add (bool): Whether to add or remove the role
+            started (float): perf_counter() when the event arrived, if it was queued
         """
+        started = started or time.perf_counter()
+
         # Check if the reaction is on one of our role messages
         if payload.message_id not in self.role_messages:
             return
 
-        # Get message data
+        # Get the role name for this message's category and emoji
         message_data = self.role_messages[payload.message_id]
+        if message_data["mode"] != "reactions":
+            return
+
+        # Removals the bot made after a swap must not undo a newer pick
+        if not add and self.reaction_cleaner.is_own_removal(payload):
+            return
+
         emoji = str(payload.emoji)
+        catalog = self.catalog_for(payload.guild_id)
+        role_name = catalog.role_for(message_data["category"], emoji)
 
         # Check if the emoji is valid for this message
-        if emoji not in message_data["roles"]:
+        if role_name is None:
             return
+        category = catalog.get(message_data["category"])
 
-        # Get the role name and find the corresponding role object
-        role_name = message_data["roles"][emoji]
+        # Find the corresponding role object
         guild = self.bot.get_guild(payload.guild_id)
-        role = discord.utils.get(guild.roles, name=role_name)
+        if not guild:
+            return
+
+        role = self.role_index.get(guild, role_name)
+        if not role:
+            return
 
-        if not guild or not role:
+        # Skip if the reactor is the bot
+        if payload.user_id == self.bot.user.id:
+            return
+
+        # Duplicate events and re-adds often ask for roles the member already has
+        if payload.member is not None:
+            self.role_shadow.observe(payload.member)
+        if self.is_noop_change(guild, payload.user_id, category, emoji, role, add):
+            noop_role_edits.inc("reaction")
             return
 
         # Get the member
-        member = guild.get_member(payload.user_id)
+        member = await self.resolve_member(guild, payload)
+        if member is None:
+            return
 
-        # Skip if the reactor is the bot
-        if member.id == self.bot.user.id:
+        if add and category.exclusive:
+            self.swap_exclusive_role(member, category, emoji, role, payload, started)
             return
 
-        # Add or remove role
-        try:
-            if add:
-                await member.add_roles(role)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "%s role %s for member %s", "Adding" if add else "Removing", role.name, member.id,
+                extra={
+                    "event": "reaction_add" if add else "reaction_remove",
+                    "guild_id": guild.id,
+                    "channel_id": payload.channel_id,
+                    "member_id": member.id,
+                    "role_id": role.id
+                }
+            )
+
+        # Queue the change; bursts of clicks are flushed as one member edit
+        self.role_edits.queue(member, role, add, started=started)
+
+    def holds_role(self, guild_id, member_id, role_id):
+        """
+        Works out whether a member will have a role once queued changes are applied
+
+        Args:
+            guild_id (int): ID of the guild
+            member_id (int): ID of the member
+            role_id (int): ID of the role
+
+        Returns:
+            bool: Whether the member will have the role, or None if that isn't known
+        """
+        queued = self.role_edits.pending_change(guild_id, member_id, role_id)
+        if queued is not None:
+            return queued
+
+        # The shadow is only updated once an edit completes
+        if self.role_edits.is_busy(guild_id, member_id):
+            return None
+
+        return self.role_shadow.has_role(guild_id, member_id, role_id)
+
+    def is_noop_change(self, guild, member_id, category, emoji, role, add):
+        """
+        Checks whether a reaction would leave the member's roles exactly as they are
+
+        Args:
+            guild (discord.Guild): The guild the reaction happened in
+            member_id (int): ID of the member who reacted
+            category (RoleCategory): The role message's category
+            emoji (str): The emoji the member reacted with
+            role (discord.Role): The role the emoji gives
+            add (bool): Whether the reaction was added or removed
+
+        Returns:
+            bool: True only if the member's roles are known and nothing would change
+        """
+        if self.holds_role(guild.id, member_id, role.id) is not add:
+            return False
+
+        if add and category.exclusive:
+            # A swap also takes away the category's other roles
+            for other_emoji, role_name in category.roles.items():
+                if other_emoji == emoji:
+                    continue
+                other_role = self.role_index.get(guild, role_name)
+                if other_role is None or other_role.id == role.id:
+                    continue
+                if self.holds_role(guild.id, member_id, other_role.id) is not False:
+                    return False
+
+        return True
+
+    def swap_exclusive_role(self, member, category, emoji, role, payload, started=None):
+        """
+        Gives a member a role of a single-choice category and takes away the others
+
+        The old roles are removed in the same member edit as the new one is
+        added. Clicks from the same member are applied in order before that
+        edit is sent, so the last pick wins. The member's reactions for the old
+        roles are removed in the background.
+
+        Args:
+            member (discord.Member): The member who reacted
+            category (RoleCategory): The exclusive category
+            emoji (str): The emoji the member reacted with
+            role (discord.Role): The role the emoji gives
+            payload (discord.RawReactionActionEvent): Reaction event payload
+            started (float): perf_counter() time the event arrived, for latency metrics
+        """
+        held = set(member_role_ids(member)) | self.role_edits.pending_adds(member)
+        siblings = []
+        stale_emojis = []
+
+        for other_emoji, role_name in category.roles.items():
+            if other_emoji == emoji:
+                continue
+            other_role = self.role_index.get(member.guild, role_name)
+            if other_role is None or other_role.id == role.id:
+                continue
+
+            siblings.append(other_role.id)
+            if other_role.id in held:
+                stale_emojis.append(other_emoji)
+
+        self.role_edits.queue(member, role, True, started=started, exclusive_with=siblings)
+        self.reaction_cleaner.remove_stale(payload.channel_id, payload.message_id, member.id, stale_emojis)
+
+    @perf.timed()
+    async def reconnect_message(self, message: discord.Message) -> bool:
+        """
+        Registers a message if it is one of the bot's role messages and restores missing reactions
+
+        Args:
+            message: The message to check
+
+        Returns:
+            True if the message was a role message
+        """
+        if message.author != self.bot.user or not message.embeds:
+            return False
+
+        embed = message.embeds[0]
+        if not embed.title:
+            return False
+
+        # Find matching category by title
+        matching_category = self.catalog_for(message.guild.id).category_for_title(embed.title)
+        if not matching_category:
+            return False
+
+        if message.components:
+            # Component pickers are routed by custom_id and need no reactions
+            self.register_message(message, matching_category.name, "components")
+            return True
+
+        # Register message for reaction handling
+        self.register_message(message, matching_category.name)
+
+        # Add missing reactions, keeping the config order
+        existing_reactions = {str(reaction.emoji) for reaction in message.reactions}
+        missing = [emoji for emoji in matching_category.emojis if emoji not in existing_reactions]
+        await self.rest.add_reactions(message, missing)
+
+        return True
+
+    @perf.timed()
+    async def apply_role_choice(self, member, category, emojis, started=None):
+        """
+        Makes a member's roles in a category match the roles picked in a component picker
+
+        Args:
+            member (discord.Member): The member who picked
+            category (str): Category name from the catalog
+            emojis (set): Emojis of the picked roles
+            started (float): perf_counter() time the interaction arrived, for latency metrics
+
+        Returns:
+            list: The picked roles, or None if the category no longer exists
+
+        Raises:
+            discord.HTTPException: If the member edit failed
+        """
+        category_data = self.catalog_for(member.guild.id).get(category)
+        if category_data is None:
+            return None
+
+        picked = []
+        adds = set()
+        removes = set()
+        for emoji, role_name in category_data.roles.items():
+            role = self.role_index.get(member.guild, role_name)
+            if role is None:
+                continue
+            if emoji in emojis:
+                picked.append(role)
+                adds.add(role.id)
             else:
-                await member.remove_roles(role)
+                removes.add(role.id)
+
+        # One edit for the whole set, ordered with any queued reaction changes
+        await self.role_edits.apply_now(member, adds, removes - adds, started=started)
+        return picked
+
+    @perf.timed()
+    async def resolve_member(self, guild, payload):
+        """
+        Finds the member behind a reaction event without relying on the member cache
+
+        Reaction adds carry the member in the payload. Removes don't, so they
+        fall back to discord.py's cache, then the bounded member cache, then a
+        fetch_member call.
+
+        Args:
+            guild (discord.Guild): The guild the reaction happened in
+            payload (discord.RawReactionActionEvent): Reaction event payload
+
+        Returns:
+            discord.Member: The member, or None if they can't be found
+        """
+        member = payload.member
+        if member is not None:
+            # Freshest copy of the member's roles; keep it for later removes
+            self.member_cache.put(member)
+            return member
+
+        member = guild.get_member(payload.user_id) or self.member_cache.get(guild.id, payload.user_id)
+        if member is not None:
+            return member
+
+        try:
+            member = await self.rest.run("fetch_member", guild.id, guild.fetch_member, payload.user_id)
         except discord.HTTPException:
-            # Handle permission errors
-            pass
+            # Member left the guild or can't be fetched
+            return None
+
+        self.member_cache.put(member)
+        self.role_shadow.observe(member)
+        return member
 
-    async def scan_channel_roles(self, channel: discord.TextChannel) -> int:
+    @perf.timed()
+    async def scan_channel_roles(self, channel: discord.TextChannel, full: bool = False) -> int:
         """
         Scans a channel for role messages and reconnects them
-        
+
+        The first scan of a channel reads the latest 100 messages. Later scans
+        only read messages posted after the channel's checkpoint.
+
         Args:
             channel: The channel to scan
-            
+            full: Ignore the checkpoint and re-read the latest 100 messages
+
         Returns:
             Number of messages reconnected
         """
         reconnected = 0
-        
+        checkpoint = self.registry.get_checkpoint(channel.id)
+        last_message_id = checkpoint["last_message_id"] if checkpoint else None
+
+        if last_message_id and not full:
+            history = channel.history(limit=None, after=discord.Object(id=last_message_id))
+        else:
+            history = channel.history(limit=100)
+
+        newest_id = last_message_id or 0
+
         try:
-            # Get bot's messages in the channel
-            async for message in channel.history(limit=100):
-                if message.author == self.bot.user and message.embeds:
-                    embed = message.embeds[0]
-                    if not embed.title:
-                        continue
-                    
-                    # Find matching category by title
-                    matching_category = None
-                    for category, data in ROLE_CATEGORIES.items():
-                        if data["title"] == embed.title:
-                            matching_category = category
-                            break
-                    
-                    if matching_category:
-                        # Register message for reaction handling
-                        self.role_messages[message.id] = {
-                            "category": matching_category,
-                            "roles": ROLE_CATEGORIES[matching_category]["roles"]
-                        }
-                        reconnected += 1
-                        
-                        # Verify/add reactions
-                        existing_reactions = {str(reaction.emoji) for reaction in message.reactions}
-                        needed_reactions = set(ROLE_CATEGORIES[matching_category]["roles"].keys())
-                        
-                        # Add missing reactions
-                        for emoji in needed_reactions - existing_reactions:
-                            await message.add_reaction(emoji)
-        
+            async for message in history:
+                newest_id = max(newest_id, message.id)
+                if await self.reconnect_message(message):
+                    reconnected += 1
+
         except discord.HTTPException as e:
-            print(f"Error scanning channel {channel.name}: {e}")
-        
+            logger.warning(
+                "Error scanning channel %s: %s", channel.name, e,
+                extra={"event": "channel_scan_failed", "guild_id": channel.guild.id, "channel_id": channel.id}
+            )
+
+        if newest_id:
+            self.registry.save_checkpoint(channel.id, channel.guild.id, newest_id)
+
         return reconnected
 
+    def start_deep_scan(self, channel: discord.TextChannel) -> Optional[asyncio.Task]:
+        """
+        Starts paging through a channel's full history in the background
+
+        Args:
+            channel: The channel to scan
+
+        Returns:
+            The scan task, or None if a deep scan of the channel is already running
+        """
+        task = self.deep_scans.get(channel.id)
+        if task is not None and not task.done():
+            return None
+
+        task = asyncio.create_task(self.deep_scan_channel(channel))
+        self.deep_scans[channel.id] = task
+        task.add_done_callback(lambda _: self.deep_scans.pop(channel.id, None))
+        return task
+
+    @perf.timed()
+    async def deep_scan_channel(self, channel: discord.TextChannel) -> int:
+        """
+        Pages through a channel's full history, newest to oldest, for role messages
+
+        Progress is checkpointed after every page, so an interrupted deep scan
+        resumes where it stopped instead of starting over.
+
+        Args:
+            channel: The channel to scan
+
+        Returns:
+            Number of messages reconnected
+        """
+        reconnected = 0
+        checkpoint = self.registry.get_checkpoint(channel.id) or {}
+        before_id = checkpoint.get("deep_before_id")
+
+        if checkpoint.get("deep_complete"):
+            # A finished deep scan is restarted from the newest message
+            before_id = None
+
+        before = discord.Object(id=before_id) if before_id else None
+        newest_id = 0
+        seen = 0
+
+        try:
+            async for message in channel.history(limit=None, before=before):
+                newest_id = max(newest_id, message.id)
+                if await self.reconnect_message(message):
+                    reconnected += 1
+
+                seen += 1
+                if seen % DEEP_SCAN_PAGE_SIZE == 0:
+                    self.registry.save_deep_checkpoint(channel.id, channel.guild.id, message.id, False)
+
+            self.registry.save_deep_checkpoint(channel.id, channel.guild.id, None, True)
+
+            # Let incremental scans start from here if the channel was never scanned
+            if before is None and newest_id and not checkpoint.get("last_message_id"):
+                self.registry.save_checkpoint(channel.id, channel.guild.id, newest_id)
+
+        except discord.HTTPException as e:
+            logger.warning(
+                "Error deep scanning channel %s: %s", channel.name, e,
+                extra={"event": "deep_scan_failed", "guild_id": channel.guild.id, "channel_id": channel.id}
+            )
+
+        return reconnected
+
+    def resume_deep_scans(self) -> int:
+        """
+        Restarts deep scans that were interrupted by a shutdown
+
+        Returns:
+            Number of deep scans resumed
+        """
+        resumed = 0
+
+        for checkpoint in self.registry.load_unfinished_deep_scans():
+            channel = self.bot.get_channel(checkpoint["channel_id"])
+            if channel is None:
+                continue
+            if self.start_deep_scan(channel) is not None:
+                resumed += 1
+
+        return resumed
+
+    @perf.timed()
     async def auto_scan_all_guilds(self) -> dict:
         """
         Automatically scans all guilds for role messages and reconnects them
-        
+
+        Channels are scanned concurrently by the scan scheduler.
+
         Returns:
             Dictionary mapping guild IDs to number of reconnected messages
         """
-        results = {}
-        scanned_channels = set()  # Track channels we've already scanned
-        
-        for guild in self.bot.guilds:
-            guild_total = 0
-            
-            # First check channels that typically contain role messages
-            potential_channels = []
-            
-            # Look for channels with relevant names
-            role_channel_keywords = ['role', 'select', 'assign', 'reaction', 'class', 'profession']
-            for channel in guild.text_channels:
-                if any(keyword in channel.name.lower() for keyword in role_channel_keywords):
-                    potential_channels.append(channel)
-            
-            # If no channels found by name, check recent message history in all channels
-            if not potential_channels:
-                potential_channels = guild.text_channels
-            
-            # Scan channels
-            for channel in potential_channels:
-                if channel.id not in scanned_channels:
-                    reconnected = await self.scan_channel_roles(channel)
-                    if reconnected > 0:
-                        guild_total += reconnected
-                        print(f"Reconnected {reconnected} role messages in #{channel.name}")
-                    scanned_channels.add(channel.id)
-            
-            if guild_total > 0:
-                results[guild.id] = guild_total
-                print(f"Total reconnected messages in {guild.name}: {guild_total}")
-        
-        return results
+        return await self.scan_scheduler.scan_all()
@@ -0,0 +1,173 @@
+"""
+Role index module for resolving configured role names without scanning guild.roles
+"""
+import logging
+from typing import Dict, Optional
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class RoleIndex:
+    """
+    Per-guild index from role name to role ID
+
+    The index is built once per guild and then kept current by the
+    on_guild_role_create/update/delete listeners. Once a configured role name
+    has been resolved it stays bound to that role's ID, so renaming the role
+    in Discord doesn't break reactions for it.
+    """
+    def __init__(self, registry=None):
+        self.registry = registry  # Optional RoleRegistry used to persist bindings
+        self._names = {}  # guild_id -> {role name: role id}
+        self._bindings = {}  # guild_id -> {configured role name: role id}
+
+    def build(self, guild: discord.Guild) -> Dict[str, int]:
+        """
+        (Re)builds the name index for a guild in a single pass over its roles
+
+        Args:
+            guild: The guild to index
+
+        Returns:
+            Dictionary mapping role names to role IDs
+        """
+        names = {}
+        for role in guild.roles:
+            # Keep the lowest role for duplicate names, like discord.utils.get does
+            names.setdefault(role.name, role.id)
+
+        self._names[guild.id] = names
+        self._load_bindings(guild.id)
+
+        return names
+
+    def _load_bindings(self, guild_id: int) -> Dict[str, int]:
+        """
+        Returns a guild's bindings, loading them from the registry on first use
+        """
+        bindings = self._bindings.get(guild_id)
+        if bindings is None:
+            bindings = self.registry.load_bindings(guild_id) if self.registry else {}
+            self._bindings[guild_id] = bindings
+        return bindings
+
+    def get(self, guild: discord.Guild, role_name: str) -> Optional[discord.Role]:
+        """
+        Resolves a configured role name to a role object
+
+        Args:
+            guild: The guild to look the role up in
+            role_name: Role name as written in the config
+
+        Returns:
+            The role, or None if the guild has no such role
+        """
+        names = self._names.get(guild.id)
+        if names is None:
+            names = self.build(guild)
+
+        bindings = self._load_bindings(guild.id)
+        role_id = bindings.get(role_name)
+        if role_id is not None:
+            role = guild.get_role(role_id)
+            if role is not None:
+                return role
+            # Role was deleted while we weren't watching
+            for name in [name for name, bound_id in bindings.items() if bound_id == role_id]:
+                del bindings[name]
+            if self.registry:
+                self.registry.remove_role_bindings(guild.id, role_id)
+
+        role_id = names.get(role_name)
+        if role_id is None:
+            return None
+
+        role = guild.get_role(role_id)
+        if role is not None:
+            self.bind(guild.id, role_name, role.id)
+        return role
+
+    def bind(self, guild_id: int, role_name: str, role_id: int):
+        """
+        Binds a configured role name to a role ID
+
+        Args:
+            guild_id: ID of the guild the role belongs to
+            role_name: Role name as written in the config
+            role_id: ID of the role
+        """
+        bindings = self._load_bindings(guild_id)
+        if bindings.get(role_name) == role_id:
+            return
+
+        bindings[role_name] = role_id
+        if self.registry:
+            self.registry.save_binding(guild_id, role_name, role_id)
+
+    def add(self, role: discord.Role):
+        """
+        Adds a newly created role to its guild's index
+
+        Args:
+            role: The created role
+        """
+        names = self._names.get(role.guild.id)
+        if names is not None:
+            names.setdefault(role.name, role.id)
+
+    def update(self, before: discord.Role, after: discord.Role):
+        """
+        Keeps the index current when a role is renamed
+
+        Args:
+            before: The role before the update
+            after: The role after the update
+        """
+        if before.name == after.name:
+            return
+
+        guild_id = after.guild.id
+        names = self._names.get(guild_id)
+        if names is not None:
+            if names.get(before.name) == before.id:
+                # Another role may share the old name, so re-index lazily
+                del self._names[guild_id]
+            else:
+                names.setdefault(after.name, after.id)
+
+        for role_name, role_id in self._bindings.get(guild_id, {}).items():
+            if role_id == after.id:
+                logger.warning(
+                    "Role '%s' was renamed to '%s' in %s; still matching it by ID",
+                    role_name, after.name, after.guild.name
+                )
+
+    def remove(self, role: discord.Role):
+        """
+        Drops a deleted role from the index and its bindings
+
+        Args:
+            role: The deleted role
+        """
+        guild_id = role.guild.id
+        names = self._names.get(guild_id)
+        if names is not None and names.get(role.name) == role.id:
+            # Another role may share the name, so re-index lazily
+            del self._names[guild_id]
+
+        bindings = self._bindings.get(guild_id, {})
+        for role_name in [name for name, role_id in bindings.items() if role_id == role.id]:
+            del bindings[role_name]
+        if self.registry:
+            self.registry.remove_role_bindings(guild_id, role.id)
+
+    def invalidate(self, guild_id: int):
+        """
+        Forgets everything indexed for a guild
+
+        Args:
+            guild_id: ID of the guild
+        """
+        self._names.pop(guild_id, None)
+        self._bindings.pop(guild_id, None)
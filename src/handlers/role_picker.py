@@ -0,0 +1,120 @@
+"""
+Select menu and button role pickers for role messages in components mode
+"""
+import logging
+import time
+import discord
+from handlers.role_catalog import RoleCategory
+
+logger = logging.getLogger(__name__)
+
+# Discord allows at most 25 options in a select menu
+MAX_PICKER_OPTIONS = 25
+
+
+class RoleSelect(discord.ui.DynamicItem[discord.ui.Select], template=r"rolepick:select:(?P<category>.+)"):
+    """
+    Select menu whose choices become the member's roles in a category
+
+    The category is encoded in the custom_id, so one registration at startup
+    handles the menus of every role message without scanning history.
+    """
+    def __init__(self, category: str, select: discord.ui.Select = None):
+        super().__init__(select or discord.ui.Select(custom_id=f"rolepick:select:{category}"))
+        self.category = category
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        # Keep the menu from the message so its options match what the member saw
+        return cls(match["category"], item)
+
+    async def callback(self, interaction: discord.Interaction):
+        await apply_picked_roles(interaction, self.category, set(self.item.values))
+
+
+class RoleClearButton(discord.ui.DynamicItem[discord.ui.Button], template=r"rolepick:clear:(?P<category>.+)"):
+    """
+    Button that removes every role of a category from the member
+    """
+    def __init__(self, category: str, button: discord.ui.Button = None):
+        super().__init__(button or discord.ui.Button(
+            label="Clear",
+            style=discord.ButtonStyle.secondary,
+            custom_id=f"rolepick:clear:{category}"
+        ))
+        self.category = category
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["category"], item)
+
+    async def callback(self, interaction: discord.Interaction):
+        await apply_picked_roles(interaction, self.category, set())
+
+
+def build_picker_view(category: RoleCategory) -> discord.ui.View:
+    """
+    Builds the persistent view posted with a components mode role message
+
+    Args:
+        category: The compiled category
+
+    Returns:
+        A view with the category's select menu and clear button
+
+    Raises:
+        ValueError: If the category has more roles than a select menu can hold
+    """
+    if len(category.roles) > MAX_PICKER_OPTIONS:
+        raise ValueError(
+            f"Category '{category.name}' has {len(category.roles)} roles; "
+            f"select menus hold at most {MAX_PICKER_OPTIONS}, use reactions instead"
+        )
+
+    select = discord.ui.Select(
+        custom_id=f"rolepick:select:{category.name}",
+        placeholder="Choose your role..." if category.exclusive else "Choose your roles...",
+        min_values=0,
+        max_values=1 if category.exclusive else len(category.roles),
+        options=[
+            discord.SelectOption(label=role_name, value=emoji, emoji=emoji)
+            for emoji, role_name in category.roles.items()
+        ]
+    )
+
+    view = discord.ui.View(timeout=None)
+    view.add_item(RoleSelect(category.name, select))
+    view.add_item(RoleClearButton(category.name))
+    return view
+
+
+async def apply_picked_roles(interaction: discord.Interaction, category: str, emojis: set):
+    """
+    Makes a member's roles in a category match their picks and confirms privately
+
+    Args:
+        interaction: The component interaction
+        category: Category name from the custom_id
+        emojis: Emojis of the picked roles; empty clears the category
+    """
+    started = time.perf_counter()
+
+    # Member edits can wait on rate limits, longer than the interaction allows
+    await interaction.response.defer(ephemeral=True, thinking=True)
+
+    role_handler = interaction.client.role_handler
+    try:
+        picked = await role_handler.apply_role_choice(interaction.user, category, emojis, started=started)
+    except discord.HTTPException as e:
+        logger.warning("Failed to update roles for member %s: %s", interaction.user.id, e)
+        await interaction.followup.send("❌ I couldn't update your roles. Please try again later.", ephemeral=True)
+        return
+
+    if picked is None:
+        await interaction.followup.send("❌ This role menu is no longer in use.", ephemeral=True)
+    elif picked:
+        await interaction.followup.send(
+            f"✅ Your roles: {', '.join(role.mention for role in picked)}", ephemeral=True
+        )
+    else:
+        await interaction.followup.send("✅ Removed your roles from this menu.", ephemeral=True)
@@ -0,0 +1,243 @@
+"""
+Role provisioning module for bringing a guild's roles in line with its catalog
+"""
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class ProvisioningPlan:
+    """
+    Role changes that make a guild's roles match its catalog
+    """
+    def __init__(self, guild: discord.Guild, catalog, categories: List[str]):
+        self.guild = guild
+        self.catalog = catalog  # Catalog the plan was computed from
+        self.categories = categories  # Categories the plan covers
+        self.roles = {}  # role name -> existing role
+        self.creates = []  # (role name, color) of roles to create
+        self.updates = []  # (role, {field: value}) of roles whose settings drifted
+        self.moves = {}  # role -> position, for roles out of catalog order
+        self.unmanageable = []  # Role names at or above the bot's highest role
+
+    @property
+    def empty(self) -> bool:
+        """
+        Whether the guild already matches the catalog
+        """
+        return not (self.creates or self.updates or self.moves)
+
+    def summary_lines(self, limit: int = 20) -> List[str]:
+        """
+        Describes the plan, one line per change
+
+        Args:
+            limit: Maximum number of lines
+
+        Returns:
+            List of human readable lines
+        """
+        lines = [f"➕ Create **{role_name}**" for role_name, _ in self.creates]
+        for role, changes in self.updates:
+            details = []
+            if "color" in changes:
+                details.append(f"color {changes['color']}")
+            if "mentionable" in changes:
+                details.append("mentionable")
+            lines.append(f"🎨 Update **{role.name}**: {', '.join(details)}")
+        if self.moves:
+            lines.append(f"↕️ Reorder {len(self.moves)} roles into catalog order")
+        lines.extend(f"⚠️ Can't manage **{role_name}**, it's above my highest role" for role_name in self.unmanageable)
+
+        if len(lines) > limit:
+            lines = lines[:limit] + [f"...and {len(lines) - limit} more changes"]
+        return lines
+
+
+class RoleProvisioner:
+    """
+    Computes and applies the difference between a guild's catalog and its roles
+
+    Planning is local: roles are resolved through the role index and compared
+    with the catalog, so a guild that already matches costs no REST calls.
+    Creates and updates are queued at once through the REST scheduler, and
+    reordering is a single bulk position edit. Once a guild's categories are
+    provisioned, the result is cached until its catalog changes or a role
+    event in the guild invalidates it.
+    """
+    def __init__(self, role_handler, reorder: bool = True):
+        self.role_handler = role_handler
+        self.rest = role_handler.rest
+        self.reorder = reorder  # Whether to move catalog roles into catalog order
+        self._provisioned = {}  # guild_id -> (catalog, set of provisioned category names)
+
+    def plan(self, guild: discord.Guild, categories: Optional[Iterable[str]] = None) -> ProvisioningPlan:
+        """
+        Computes the role changes a guild needs, without any REST calls
+
+        Args:
+            guild: The guild
+            categories: Only plan these categories (defaults to all of them)
+
+        Returns:
+            The plan
+        """
+        catalog = self.role_handler.catalog_for(guild.id)
+        names = [name for name in (categories or catalog) if name in catalog]
+        plan = ProvisioningPlan(guild, catalog, names)
+        top_role = guild.me.top_role
+
+        ordered = []  # Existing manageable roles, in catalog order
+        seen = set()
+        for name in names:
+            category = catalog.get(name)
+            for role_name in category.roles.values():
+                if role_name in seen:
+                    continue
+                seen.add(role_name)
+
+                color = category.role_color(role_name)
+                role = self.role_handler.role_index.get(guild, role_name)
+                if role is None:
+                    plan.creates.append((role_name, color))
+                    continue
+
+                plan.roles[role_name] = role
+                if role >= top_role:
+                    plan.unmanageable.append(role_name)
+                    continue
+
+                ordered.append(role)
+                changes = {}
+                if role.color.value != color:
+                    changes["color"] = discord.Color(color)
+                if not role.mentionable:
+                    changes["mentionable"] = True
+                if changes:
+                    plan.updates.append((role, changes))
+
+        if self.reorder:
+            plan.moves = self._moves(ordered)
+        return plan
+
+    def _moves(self, ordered: List[discord.Role]) -> Dict[discord.Role, int]:
+        """
+        Positions that put roles in catalog order, first role highest
+
+        Roles already in catalog order relative to each other aren't moved, even
+        if other roles sit between them. Otherwise they swap into each other's
+        positions, so roles outside the catalog keep their place and no role
+        ends up higher than the highest position the roles already hold.
+        """
+        current = sorted(ordered, key=lambda role: (role.position, role.id), reverse=True)
+        if current == ordered:
+            return {}
+
+        slots = sorted({role.position for role in ordered}, reverse=True)
+        if len(slots) < len(ordered):
+            # Shared positions are stale, e.g. new roles all report position 1; don't guess
+            return {}
+
+        return {role: slot for role, slot in zip(ordered, slots) if role.position != slot}
+
+    async def apply(self, plan: ProvisioningPlan) -> Dict[str, List[discord.Role]]:
+        """
+        Makes the planned changes, queuing every create and update at once
+
+        Args:
+            plan: The plan to apply
+
+        Returns:
+            Dictionary mapping the plan's categories to their roles, in catalog order
+        """
+        guild = plan.guild
+
+        async def create(role_name, color):
+            role = await self.rest.create_role(guild, name=role_name, color=discord.Color(color), mentionable=True)
+            self.role_handler.role_index.add(role)
+            self.role_handler.role_index.bind(guild.id, role_name, role.id)
+            plan.roles[role_name] = role
+
+        async def update(role, changes):
+            await self.rest.run("edit_role", guild.id, role.edit, **changes)
+
+        # The scheduler sends them as fast as the guild's role bucket allows
+        await asyncio.gather(
+            *(create(*entry) for entry in plan.creates),
+            *(update(*entry) for entry in plan.updates)
+        )
+
+        moves = plan.moves
+        if self.reorder and plan.creates:
+            # New roles are created at the bottom and all report position 1; read
+            # the real positions before placing them with the rest
+            fresh = {role.id: role for role in await self.rest.run("fetch_roles", guild.id, guild.fetch_roles)}
+            top_role = fresh.get(guild.me.top_role.id, guild.me.top_role)
+            moves = self._moves([
+                fresh[role.id] for role_name, role in self._catalog_order(plan)
+                if role is not None and role.id in fresh and fresh[role.id] < top_role
+            ])
+        if moves:
+            await self.rest.run("edit_role_positions", guild.id, guild.edit_role_positions, positions=moves)
+
+        if not plan.empty:
+            logger.info(
+                "Provisioned roles in %s: %d created, %d updated, %d moved",
+                guild.name, len(plan.creates), len(plan.updates), len(moves),
+                extra={"event": "roles_provisioned", "guild_id": guild.id}
+            )
+
+        catalog, provisioned = self._provisioned.get(guild.id, (None, set()))
+        if catalog is not plan.catalog:
+            provisioned = set()
+        self._provisioned[guild.id] = (plan.catalog, provisioned | set(plan.categories))
+
+        return self._group(plan.catalog, plan.categories, plan.roles)
+
+    async def provision(self, guild: discord.Guild, categories: Optional[Iterable[str]] = None) -> Dict[str, List[discord.Role]]:
+        """
+        Makes sure a guild has the roles of some categories, reusing the last result while nothing changed
+
+        Args:
+            guild: The guild
+            categories: Categories whose roles are needed (defaults to all of them)
+
+        Returns:
+            Dictionary mapping the categories to their roles, in catalog order
+        """
+        catalog = self.role_handler.catalog_for(guild.id)
+        names = [name for name in (categories or catalog) if name in catalog]
+
+        cached_catalog, provisioned = self._provisioned.get(guild.id, (None, set()))
+        if cached_catalog is catalog and provisioned.issuperset(names):
+            roles = {}
+            for name in names:
+                for role_name in catalog.get(name).roles.values():
+                    roles[role_name] = self.role_handler.role_index.get(guild, role_name)
+            return self._group(catalog, names, roles)
+
+        return await self.apply(self.plan(guild, names))
+
+    def invalidate(self, guild_id: int):
+        """
+        Forgets that a guild is provisioned, e.g. after one of its roles changed
+        """
+        self._provisioned.pop(guild_id, None)
+
+    def _catalog_order(self, plan: ProvisioningPlan):
+        seen = set()
+        for name in plan.categories:
+            for role_name in plan.catalog.get(name).roles.values():
+                if role_name not in seen:
+                    seen.add(role_name)
+                    yield role_name, plan.roles.get(role_name)
+
+    @staticmethod
+    def _group(catalog, categories: List[str], roles: Dict[str, Optional[discord.Role]]) -> Dict[str, List[discord.Role]]:
+        return {
+            name: [roles[role_name] for role_name in catalog.get(name).roles.values() if roles.get(role_name) is not None]
+            for name in categories
+        }
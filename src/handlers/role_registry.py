@@ -0,0 +1,667 @@
+"""
+Role registry module for persisting reaction role messages and background jobs between restarts
+"""
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class RoleRegistry:
+    """
+    SQLite-backed store of the role messages the bot is tracking
+
+    The database runs in WAL mode so reads at startup never wait on writers
+    and every write is a single short transaction.
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        """
+        Creates the registry tables if they don't already exist
+        """
+        with self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS role_messages (
+                    message_id INTEGER PRIMARY KEY,
+                    guild_id INTEGER NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    category TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_role_messages_guild ON role_messages (guild_id)"
+            )
+            # Registries created before component pickers have no mode column
+            columns = {row["name"] for row in self.connection.execute("PRAGMA table_info(role_messages)")}
+            if "mode" not in columns:
+                self.connection.execute(
+                    "ALTER TABLE role_messages ADD COLUMN mode TEXT NOT NULL DEFAULT 'reactions'"
+                )
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS scan_checkpoints (
+                    channel_id INTEGER PRIMARY KEY,
+                    guild_id INTEGER NOT NULL,
+                    last_message_id INTEGER,
+                    deep_before_id INTEGER,
+                    deep_complete INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS role_bindings (
+                    guild_id INTEGER NOT NULL,
+                    role_name TEXT NOT NULL,
+                    role_id INTEGER NOT NULL,
+                    PRIMARY KEY (guild_id, role_name)
+                )
+                """
+            )
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS guild_catalogs (
+                    guild_id INTEGER PRIMARY KEY,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS guild_categories (
+                    guild_id INTEGER NOT NULL,
+                    category TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    color INTEGER NOT NULL,
+                    PRIMARY KEY (guild_id, category)
+                )
+                """
+            )
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS guild_category_roles (
+                    guild_id INTEGER NOT NULL,
+                    category TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    emoji TEXT NOT NULL,
+                    role_name TEXT NOT NULL,
+                    color INTEGER,
+                    PRIMARY KEY (guild_id, category, emoji)
+                )
+                """
+            )
+            # Catalogs saved before exclusive categories have no exclusive column
+            columns = {row["name"] for row in self.connection.execute("PRAGMA table_info(guild_categories)")}
+            if "exclusive" not in columns:
+                self.connection.execute(
+                    "ALTER TABLE guild_categories ADD COLUMN exclusive INTEGER NOT NULL DEFAULT 0"
+                )
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS bulk_jobs (
+                    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    guild_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    source_ids TEXT NOT NULL,
+                    target_id INTEGER,
+                    channel_id INTEGER NOT NULL,
+                    message_id INTEGER,
+                    status TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS bulk_job_members (
+                    job_id INTEGER NOT NULL,
+                    member_id INTEGER NOT NULL,
+                    PRIMARY KEY (job_id, member_id)
+                )
+                """
+            )
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS fleet_jobs (
+                    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel_name TEXT,
+                    mode TEXT,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS fleet_job_guilds (
+                    job_id INTEGER NOT NULL,
+                    guild_id INTEGER NOT NULL,
+                    guild_name TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    roles_created INTEGER NOT NULL DEFAULT 0,
+                    roles_updated INTEGER NOT NULL DEFAULT 0,
+                    messages_posted INTEGER NOT NULL DEFAULT 0,
+                    detail TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (job_id, guild_id)
+                )
+                """
+            )
+
+    def save_message(self, message_id: int, guild_id: int, channel_id: int, category: str, mode: str = "reactions"):
+        """
+        Records (or refreshes) a role message
+
+        Args:
+            message_id: ID of the role message
+            guild_id: ID of the guild the message belongs to
+            channel_id: ID of the channel the message was posted in
+            category: Role category the message represents
+            mode: 'reactions' or 'components', how members pick roles on the message
+        """
+        with self.connection:
+            self.connection.execute(
+                """
+                INSERT INTO role_messages (message_id, guild_id, channel_id, category, mode, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(message_id) DO UPDATE SET
+                    guild_id = excluded.guild_id,
+                    channel_id = excluded.channel_id,
+                    category = excluded.category,
+                    mode = excluded.mode,
+                    updated_at = excluded.updated_at
+                """,
+                (message_id, guild_id, channel_id, category, mode, time.time())
+            )
+
+    def remove_message(self, message_id: int):
+        """
+        Forgets a role message
+
+        Args:
+            message_id: ID of the role message to remove
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM role_messages WHERE message_id = ?", (message_id,))
+
+    def load_messages(self) -> List[Dict]:
+        """
+        Loads every recorded role message
+
+        Returns:
+            List of dictionaries with message_id, guild_id, channel_id, category and mode keys
+        """
+        rows = self.connection.execute(
+            "SELECT message_id, guild_id, channel_id, category, mode FROM role_messages"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_checkpoint(self, channel_id: int) -> Optional[Dict]:
+        """
+        Loads the scan checkpoint for a channel
+
+        Args:
+            channel_id: ID of the channel
+
+        Returns:
+            Dictionary with last_message_id, deep_before_id and deep_complete keys, or None
+        """
+        row = self.connection.execute(
+            "SELECT last_message_id, deep_before_id, deep_complete FROM scan_checkpoints WHERE channel_id = ?",
+            (channel_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def save_checkpoint(self, channel_id: int, guild_id: int, last_message_id: int):
+        """
+        Records the newest message an incremental scan has read in a channel
+
+        Args:
+            channel_id: ID of the channel
+            guild_id: ID of the guild the channel belongs to
+            last_message_id: ID of the newest scanned message
+        """
+        with self.connection:
+            self.connection.execute(
+                """
+                INSERT INTO scan_checkpoints (channel_id, guild_id, last_message_id, deep_complete)
+                VALUES (?, ?, ?, 0)
+                ON CONFLICT(channel_id) DO UPDATE SET last_message_id = excluded.last_message_id
+                """,
+                (channel_id, guild_id, last_message_id)
+            )
+
+    def save_deep_checkpoint(self, channel_id: int, guild_id: int, before_id: Optional[int], complete: bool):
+        """
+        Records how far back a deep scan has read in a channel
+
+        Args:
+            channel_id: ID of the channel
+            guild_id: ID of the guild the channel belongs to
+            before_id: ID of the oldest scanned message, where the scan resumes
+            complete: Whether the deep scan reached the start of the channel
+        """
+        with self.connection:
+            self.connection.execute(
+                """
+                INSERT INTO scan_checkpoints (channel_id, guild_id, deep_before_id, deep_complete)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(channel_id) DO UPDATE SET
+                    deep_before_id = excluded.deep_before_id,
+                    deep_complete = excluded.deep_complete
+                """,
+                (channel_id, guild_id, before_id, int(complete))
+            )
+
+    def load_unfinished_deep_scans(self) -> List[Dict]:
+        """
+        Loads the channels whose deep scan was interrupted
+
+        Returns:
+            List of dictionaries with channel_id, guild_id and deep_before_id keys
+        """
+        rows = self.connection.execute(
+            """
+            SELECT channel_id, guild_id, deep_before_id FROM scan_checkpoints
+            WHERE deep_complete = 0 AND deep_before_id IS NOT NULL
+            """
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def save_binding(self, guild_id: int, role_name: str, role_id: int):
+        """
+        Records which role a configured role name resolved to
+
+        Args:
+            guild_id: ID of the guild the role belongs to
+            role_name: Role name as written in the config
+            role_id: ID of the role it resolved to
+        """
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO role_bindings (guild_id, role_name, role_id) VALUES (?, ?, ?)",
+                (guild_id, role_name, role_id)
+            )
+
+    def remove_role_bindings(self, guild_id: int, role_id: int):
+        """
+        Forgets every binding that points at a role
+
+        Args:
+            guild_id: ID of the guild the role belonged to
+            role_id: ID of the deleted role
+        """
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM role_bindings WHERE guild_id = ? AND role_id = ?",
+                (guild_id, role_id)
+            )
+
+    def load_bindings(self, guild_id: int) -> Dict[str, int]:
+        """
+        Loads the role bindings recorded for a guild
+
+        Args:
+            guild_id: ID of the guild
+
+        Returns:
+            Dictionary mapping configured role names to role IDs
+        """
+        rows = self.connection.execute(
+            "SELECT role_name, role_id FROM role_bindings WHERE guild_id = ?",
+            (guild_id,)
+        ).fetchall()
+        return {row["role_name"]: row["role_id"] for row in rows}
+
+    def save_guild_catalog(self, guild_id: int, data: Dict):
+        """
+        Replaces a guild's role catalog
+
+        Args:
+            guild_id: ID of the guild
+            data: Catalog in the role catalog file layout, with integer colors
+        """
+        categories = []
+        roles = []
+        for position, (category, category_data) in enumerate(data["categories"].items()):
+            categories.append((
+                guild_id, category, position, category_data["title"], category_data["color"],
+                int(category_data.get("exclusive", False))
+            ))
+            role_colors = category_data.get("role_colors", {})
+            for role_position, (emoji, role_name) in enumerate(category_data["roles"].items()):
+                roles.append((guild_id, category, role_position, emoji, role_name, role_colors.get(role_name)))
+
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO guild_catalogs (guild_id, updated_at) VALUES (?, ?)",
+                (guild_id, time.time())
+            )
+            self.connection.execute("DELETE FROM guild_categories WHERE guild_id = ?", (guild_id,))
+            self.connection.execute("DELETE FROM guild_category_roles WHERE guild_id = ?", (guild_id,))
+            self.connection.executemany(
+                """
+                INSERT INTO guild_categories (guild_id, category, position, title, color, exclusive)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                categories
+            )
+            self.connection.executemany(
+                """
+                INSERT INTO guild_category_roles (guild_id, category, position, emoji, role_name, color)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                roles
+            )
+
+    def remove_guild_catalog(self, guild_id: int):
+        """
+        Deletes a guild's role catalog so it falls back to the shared one
+
+        Args:
+            guild_id: ID of the guild
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM guild_catalogs WHERE guild_id = ?", (guild_id,))
+            self.connection.execute("DELETE FROM guild_categories WHERE guild_id = ?", (guild_id,))
+            self.connection.execute("DELETE FROM guild_category_roles WHERE guild_id = ?", (guild_id,))
+
+    def load_guild_catalogs(self, guild_id: Optional[int] = None) -> Dict[int, Dict]:
+        """
+        Loads the guilds' own role catalogs
+
+        Args:
+            guild_id: Only load this guild's catalog
+
+        Returns:
+            Dictionary mapping guild IDs to catalogs in the role catalog file layout
+        """
+        where, params = ("WHERE guild_id = ?", (guild_id,)) if guild_id is not None else ("", ())
+        catalogs = {
+            row["guild_id"]: {"categories": {}}
+            for row in self.connection.execute(f"SELECT guild_id FROM guild_catalogs {where}", params)
+        }
+
+        for row in self.connection.execute(
+            f"""
+            SELECT guild_id, category, title, color, exclusive FROM guild_categories {where}
+            ORDER BY guild_id, position
+            """,
+            params
+        ):
+            if row["guild_id"] not in catalogs:
+                continue
+            categories = catalogs[row["guild_id"]]["categories"]
+            categories[row["category"]] = {
+                "title": row["title"],
+                "color": row["color"],
+                "roles": {},
+                "role_colors": {},
+                "exclusive": bool(row["exclusive"])
+            }
+
+        for row in self.connection.execute(
+            f"""
+            SELECT guild_id, category, emoji, role_name, color FROM guild_category_roles {where}
+            ORDER BY guild_id, category, position
+            """,
+            params
+        ):
+            category = catalogs.get(row["guild_id"], {"categories": {}})["categories"].get(row["category"])
+            if category is None:
+                continue
+            category["roles"][row["emoji"]] = row["role_name"]
+            if row["color"] is not None:
+                category["role_colors"][row["role_name"]] = row["color"]
+
+        return catalogs
+
+    def create_bulk_job(
+        self,
+        guild_id: int,
+        kind: str,
+        source_ids: List[int],
+        target_id: Optional[int],
+        channel_id: int,
+        member_ids: List[int]
+    ) -> int:
+        """
+        Records a new bulk role job and the members it still has to edit
+
+        Args:
+            guild_id: ID of the guild
+            kind: 'remove', 'migrate' or 'merge'
+            source_ids: IDs of the roles taken away
+            target_id: ID of the role given instead, if any
+            channel_id: ID of the channel the job reports progress in
+            member_ids: IDs of the members to edit, in order
+
+        Returns:
+            ID of the job
+        """
+        now = time.time()
+        with self.connection:
+            cursor = self.connection.execute(
+                """
+                INSERT INTO bulk_jobs (guild_id, kind, source_ids, target_id, channel_id, status, total, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, 'running', ?, ?, ?)
+                """,
+                (guild_id, kind, ",".join(map(str, source_ids)), target_id, channel_id, len(member_ids), now, now)
+            )
+            job_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO bulk_job_members (job_id, member_id) VALUES (?, ?)",
+                ((job_id, member_id) for member_id in member_ids)
+            )
+        return job_id
+
+    def set_bulk_job_message(self, job_id: int, message_id: Optional[int]):
+        """
+        Records the message a bulk job edits with its progress
+
+        Args:
+            job_id: ID of the job
+            message_id: ID of the progress message
+        """
+        with self.connection:
+            self.connection.execute(
+                "UPDATE bulk_jobs SET message_id = ? WHERE job_id = ?",
+                (message_id, job_id)
+            )
+
+    def save_bulk_progress(self, job_id: int, finished_ids: List[int], done: int, failed: int):
+        """
+        Records the members a bulk job has finished with
+
+        Args:
+            job_id: ID of the job
+            finished_ids: IDs of members finished since the last call
+            done: Members finished so far
+            failed: Members whose edit failed so far
+        """
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM bulk_job_members WHERE job_id = ? AND member_id = ?",
+                ((job_id, member_id) for member_id in finished_ids)
+            )
+            self.connection.execute(
+                "UPDATE bulk_jobs SET done = ?, failed = ?, updated_at = ? WHERE job_id = ?",
+                (done, failed, time.time(), job_id)
+            )
+
+    def finish_bulk_job(self, job_id: int, status: str):
+        """
+        Marks a bulk job as no longer running
+
+        Finished and cancelled jobs forget their remaining members; failed jobs
+        keep them so they can be resumed.
+
+        Args:
+            job_id: ID of the job
+            status: 'done', 'cancelled' or 'failed'
+        """
+        with self.connection:
+            if status != "failed":
+                self.connection.execute("DELETE FROM bulk_job_members WHERE job_id = ?", (job_id,))
+            self.connection.execute(
+                "UPDATE bulk_jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+                (status, time.time(), job_id)
+            )
+
+    def reopen_bulk_job(self, job_id: int):
+        """
+        Marks a failed bulk job as running again
+
+        Args:
+            job_id: ID of the job
+        """
+        with self.connection:
+            self.connection.execute(
+                "UPDATE bulk_jobs SET status = 'running', updated_at = ? WHERE job_id = ?",
+                (time.time(), job_id)
+            )
+
+    def load_bulk_jobs(self, running: bool = True) -> List[Dict]:
+        """
+        Loads bulk role jobs
+
+        Args:
+            running: Only load jobs that haven't finished
+
+        Returns:
+            List of dictionaries with the job's columns, source_ids as a list of role IDs
+        """
+        where = "WHERE status = 'running'" if running else ""
+        rows = self.connection.execute(f"SELECT * FROM bulk_jobs {where} ORDER BY job_id").fetchall()
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job["source_ids"] = [int(role_id) for role_id in job["source_ids"].split(",") if role_id]
+            jobs.append(job)
+        return jobs
+
+    def load_bulk_job_members(self, job_id: int) -> List[int]:
+        """
+        Loads the members a bulk job still has to edit
+
+        Args:
+            job_id: ID of the job
+
+        Returns:
+            List of member IDs
+        """
+        rows = self.connection.execute(
+            "SELECT member_id FROM bulk_job_members WHERE job_id = ? ORDER BY rowid",
+            (job_id,)
+        ).fetchall()
+        return [row["member_id"] for row in rows]
+
+    def create_fleet_job(self, guilds: List[Tuple[int, str]], channel_name: Optional[str], mode: Optional[str]) -> int:
+        """
+        Records a new fleet provisioning job with every guild pending
+
+        Args:
+            guilds: (guild ID, guild name) of each guild in the job
+            channel_name: Name of the channel role messages are posted in, or None to only provision roles
+            mode: 'reactions' or 'components', how members pick roles on posted messages
+
+        Returns:
+            ID of the job
+        """
+        now = time.time()
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO fleet_jobs (channel_name, mode, created_at) VALUES (?, ?, ?)",
+                (channel_name, mode, now)
+            )
+            job_id = cursor.lastrowid
+            self.connection.executemany(
+                """
+                INSERT INTO fleet_job_guilds (job_id, guild_id, guild_name, status, updated_at)
+                VALUES (?, ?, ?, 'pending', ?)
+                """,
+                ((job_id, guild_id, guild_name, now) for guild_id, guild_name in guilds)
+            )
+        return job_id
+
+    def save_fleet_result(
+        self,
+        job_id: int,
+        guild_id: int,
+        status: str,
+        roles_created: int = 0,
+        roles_updated: int = 0,
+        messages_posted: int = 0,
+        detail: Optional[str] = None
+    ):
+        """
+        Records how a fleet job went in one guild
+
+        Args:
+            job_id: ID of the job
+            guild_id: ID of the guild
+            status: 'pending', 'done' or 'failed'
+            roles_created: Roles created in the guild
+            roles_updated: Roles updated or moved in the guild
+            messages_posted: Role messages posted in the guild
+            detail: Why the guild failed, if it did
+        """
+        with self.connection:
+            self.connection.execute(
+                """
+                UPDATE fleet_job_guilds SET
+                    status = ?, roles_created = ?, roles_updated = ?, messages_posted = ?, detail = ?, updated_at = ?
+                WHERE job_id = ? AND guild_id = ?
+                """,
+                (status, roles_created, roles_updated, messages_posted, detail, time.time(), job_id, guild_id)
+            )
+
+    def load_fleet_job(self, job_id: Optional[int] = None) -> Optional[Dict]:
+        """
+        Loads a fleet provisioning job and its per-guild results
+
+        Args:
+            job_id: ID of the job (defaults to the latest one)
+
+        Returns:
+            Dictionary with job_id, channel_name, mode, created_at and guilds keys, or None
+        """
+        if job_id is None:
+            row = self.connection.execute("SELECT * FROM fleet_jobs ORDER BY job_id DESC LIMIT 1").fetchone()
+        else:
+            row = self.connection.execute("SELECT * FROM fleet_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        job["guilds"] = [
+            dict(guild) for guild in self.connection.execute(
+                "SELECT * FROM fleet_job_guilds WHERE job_id = ? ORDER BY rowid", (job["job_id"],)
+            )
+        ]
+        return job
+
+    def close(self):
+        """
+        Closes the underlying database connection
+        """
+        self.connection.close()
@@ -0,0 +1,249 @@
+"""
+Role statistics module for counting role members without walking the member list on every request
+"""
+import itertools
+import logging
+import time
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+import discord
+from utils.role_utils import member_role_ids
+
+logger = logging.getLogger(__name__)
+
+
+def _pairs(role_ids: Iterable[int], tracked: FrozenSet[int]) -> List[Tuple[int, int]]:
+    """
+    Pairs of tracked roles a member holds together, lowest role ID first
+    """
+    held = tracked.intersection(role_ids)
+    if len(held) < 2:
+        return []
+    return list(itertools.combinations(sorted(held), 2))
+
+
+class GuildRoleStats:
+    """
+    Member counts of one guild: per role, and per pair of catalog roles for cross-tabs
+    """
+    __slots__ = ("counts", "pairs", "tracked", "members", "built_at", "exact", "untracked_leaves")
+
+    def __init__(self, counts: Counter, pairs: Counter, tracked: FrozenSet[int], members: int, exact: bool):
+        self.counts = counts  # role_id -> members with the role
+        self.pairs = pairs  # (role_id, role_id) -> members with both roles
+        self.tracked = tracked  # Catalog role IDs the pairs are kept for
+        self.members = members  # Members counted
+        self.built_at = time.time()
+        self.exact = exact  # Built from a complete member cache that member events keep current
+        self.untracked_leaves = 0  # Members who left without their roles being known
+
+    def count(self, role_id: int) -> int:
+        return self.counts.get(role_id, 0)
+
+    def count_both(self, role_a: int, role_b: int) -> int:
+        if role_a == role_b:
+            return self.count(role_a)
+        return self.pairs.get((min(role_a, role_b), max(role_a, role_b)), 0)
+
+    def apply(self, before: Iterable[int], after: Iterable[int]):
+        """
+        Moves one member's contribution from their old roles to their new roles
+        """
+        before = set(before)
+        after = set(after)
+        if before == after:
+            return
+
+        for role_id in after - before:
+            self.counts[role_id] += 1
+        for role_id in before - after:
+            self.counts[role_id] -= 1
+
+        if self.tracked.intersection(before) != self.tracked.intersection(after):
+            self.pairs.subtract(_pairs(before, self.tracked))
+            self.pairs.update(_pairs(after, self.tracked))
+
+
+class RoleStats:
+    """
+    Per-guild role member counts, built once and then kept current incrementally
+
+    Counts are built in a single pass over the guild's members: all role IDs
+    are counted at once, and each member's catalog roles are intersected once
+    to count the pairs behind cross-tabs. After that, member updates, joins and
+    leaves adjust the counts, so reading them costs nothing.
+
+    With the member cache on, discord.py reports every role change and the
+    counts stay exact. In low-memory mode the counts are built from fetched
+    members and then only see joins, the bot's own edits and leaves of members
+    whose roles are known, so they are rebuilt once they are max_age old.
+    """
+    def __init__(self, role_handler, max_age: float):
+        self.role_handler = role_handler
+        self.max_age = max_age  # Seconds before counts that can drift are rebuilt
+        self._guilds = {}  # guild_id -> GuildRoleStats
+
+    def tracked_roles(self, guild: discord.Guild) -> FrozenSet[int]:
+        """
+        IDs of the roles in the guild's catalog
+        """
+        role_ids = set()
+        for category in self.role_handler.catalog_for(guild.id).categories.values():
+            for role_name in category.roles.values():
+                role = self.role_handler.role_index.get(guild, role_name)
+                if role is not None:
+                    role_ids.add(role.id)
+        return frozenset(role_ids)
+
+    def build_from(self, members: Iterable[discord.Member], tracked: FrozenSet[int], exact: bool) -> GuildRoleStats:
+        """
+        Counts role members in one pass
+
+        Args:
+            members: Every member of the guild
+            tracked: Catalog role IDs to count pairs for
+            exact: Whether member events will keep the counts current
+
+        Returns:
+            The new counts
+        """
+        role_lists = [member_role_ids(member) for member in members]
+        counts = Counter(itertools.chain.from_iterable(role_lists))
+
+        pairs = Counter()
+        for role_ids in role_lists:
+            held = tracked.intersection(role_ids)
+            if len(held) > 1:
+                pairs.update(itertools.combinations(sorted(held), 2))
+
+        return GuildRoleStats(counts, pairs, tracked, len(role_lists), exact)
+
+    async def get(self, guild: discord.Guild) -> GuildRoleStats:
+        """
+        Gets a guild's counts, building them first if needed
+
+        Args:
+            guild: The guild
+
+        Returns:
+            The guild's counts
+        """
+        tracked = self.tracked_roles(guild)
+        stats = self._guilds.get(guild.id)
+
+        if stats is not None and stats.tracked == tracked:
+            if stats.exact or time.time() - stats.built_at < self.max_age:
+                return stats
+
+        started = time.perf_counter()
+        exact = guild.chunked
+        members = await self.role_handler.reconciler.load_members(guild)
+        stats = self._guilds[guild.id] = self.build_from(members, tracked, exact)
+        logger.info(
+            "Counted roles of %d members in %s in %.3fs", stats.members, guild.name, time.perf_counter() - started,
+            extra={"event": "role_stats_built", "guild_id": guild.id}
+        )
+        return stats
+
+    def invalidate(self, guild_id: int):
+        """
+        Drops a guild's counts so the next request rebuilds them
+        """
+        self._guilds.pop(guild_id, None)
+
+    def member_updated(self, guild_id: int, before: Iterable[int], after: Iterable[int]):
+        """
+        Applies a change to a member's roles
+
+        Args:
+            guild_id: ID of the guild
+            before: The member's role IDs before the change
+            after: The member's role IDs after the change
+        """
+        stats = self._guilds.get(guild_id)
+        if stats is not None:
+            stats.apply(before, after)
+
+    def member_joined(self, member: discord.Member):
+        """
+        Counts a member who joined
+        """
+        stats = self._guilds.get(member.guild.id)
+        if stats is not None:
+            stats.members += 1
+            stats.apply((), member_role_ids(member))
+
+    def member_left(self, guild_id: int, role_ids: Optional[Iterable[int]]):
+        """
+        Removes a member who left from the counts
+
+        Args:
+            guild_id: ID of the guild
+            role_ids: The member's role IDs, or None if they aren't known
+        """
+        stats = self._guilds.get(guild_id)
+        if stats is None:
+            return
+
+        stats.members -= 1
+        if role_ids is None:
+            stats.untracked_leaves += 1
+        else:
+            stats.apply(role_ids, ())
+
+    def category_breakdown(self, guild: discord.Guild, stats: GuildRoleStats) -> Dict[str, List[Tuple[str, str, int]]]:
+        """
+        Member counts per role, grouped by category
+
+        Returns:
+            category name -> list of (emoji, role name, members)
+        """
+        breakdown = {}
+        for name, category in self.role_handler.catalog_for(guild.id).categories.items():
+            rows = []
+            for emoji, role_name in category.roles.items():
+                role = self.role_handler.role_index.get(guild, role_name)
+                rows.append((emoji, role_name, stats.count(role.id) if role is not None else 0))
+            breakdown[name] = rows
+        return breakdown
+
+    def crosstab(self, guild: discord.Guild, stats: GuildRoleStats, rows: str, columns: str) -> Tuple[List[str], List[str], List[List[int]]]:
+        """
+        Members holding each combination of roles from two categories
+
+        Args:
+            guild: The guild
+            stats: The guild's counts
+            rows: Category whose roles become the rows
+            columns: Category whose roles become the columns
+
+        Returns:
+            Row role names, column role names and the counts, one list per row
+
+        Raises:
+            ValueError: If either category doesn't exist
+        """
+        catalog = self.role_handler.catalog_for(guild.id)
+        row_category = catalog.get(rows)
+        column_category = catalog.get(columns)
+        for name, category in ((rows, row_category), (columns, column_category)):
+            if category is None:
+                raise ValueError(f"Category '{name}' not found")
+
+        def resolve(category) -> List[Tuple[str, Optional[int]]]:
+            resolved = []
+            for role_name in category.roles.values():
+                role = self.role_handler.role_index.get(guild, role_name)
+                resolved.append((role_name, role.id if role is not None else None))
+            return resolved
+
+        row_roles = resolve(row_category)
+        column_roles = resolve(column_category)
+        table = [
+            [
+                stats.count_both(row_id, column_id) if row_id is not None and column_id is not None else 0
+                for _, column_id in column_roles
+            ]
+            for _, row_id in row_roles
+        ]
+        return [name for name, _ in row_roles], [name for name, _ in column_roles], table
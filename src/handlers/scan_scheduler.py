@@ -0,0 +1,171 @@
+"""
+Scan scheduler module for reconnecting role messages in the background
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Channels whose names contain one of these are likely to hold role messages
+ROLE_CHANNEL_KEYWORDS = ['role', 'select', 'assign', 'reaction', 'class', 'profession']
+
+
+class ScanScheduler:
+    """
+    Runs startup verification and history scans as a background task
+
+    Channels are scanned concurrently up to a fixed limit, channels that
+    already hold registered role messages go first, and the startup scan only
+    runs once per process so a re-ready after a reconnect doesn't repeat it.
+    """
+    def __init__(self, role_handler, concurrency: int):
+        self.role_handler = role_handler
+        self.bot = role_handler.bot
+        self.concurrency = max(1, concurrency)
+        self._task = None
+        self._startup_scheduled = False
+        self.channels_total = 0
+        self.channels_done = 0
+        self.guild_durations = {}  # guild_id -> seconds spent scanning the guild
+        self.last_duration = None  # Seconds the last full scan took
+
+    @property
+    def task(self):
+        """
+        The current (or last) scan task, if any
+        """
+        return self._task
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether a scan is currently in progress
+        """
+        return self._task is not None and not self._task.done()
+
+    def schedule_startup(self, history_scan: bool) -> bool:
+        """
+        Starts the startup scan in the background unless it already ran
+
+        Args:
+            history_scan: Whether to scan channel history after verifying the registry
+
+        Returns:
+            True if a scan was scheduled
+        """
+        if self._startup_scheduled:
+            logger.info("Startup scan already ran in this session; skipping")
+            return False
+
+        self._startup_scheduled = True
+        self._task = asyncio.create_task(self._startup(history_scan))
+        return True
+
+    async def _startup(self, history_scan: bool):
+        """
+        Verifies the registry and optionally scans channel history
+        """
+        try:
+            removed = await self.role_handler.verify_registered_messages()
+            if removed > 0:
+                logger.info("Removed %d stale role messages from the registry.", removed)
+
+            resumed = self.role_handler.resume_deep_scans()
+            if resumed > 0:
+                logger.info("Resumed %d interrupted deep scans.", resumed)
+
+            if history_scan:
+                logger.info("Scanning for existing role messages...")
+                results = await self.scan_all()
+
+                total_reconnected = sum(results.values())
+                if total_reconnected > 0:
+                    logger.info(
+                        "✅ Successfully reconnected %d role messages across %d servers!",
+                        total_reconnected, len(results)
+                    )
+                else:
+                    logger.info("No existing role messages found to reconnect.")
+        except Exception:
+            logger.exception("Error during startup scan")
+
+    def _plan_channels(self) -> List[discord.TextChannel]:
+        """
+        Lists the channels to scan, channels with known role messages first
+        """
+        known_channel_ids = {data["channel_id"] for data in self.role_handler.role_messages.values()}
+        known = []
+        others = []
+
+        for guild in self.bot.guilds:
+            # First check channels that typically contain role messages
+            potential_channels = [
+                channel for channel in guild.text_channels
+                if channel.id in known_channel_ids
+                or any(keyword in channel.name.lower() for keyword in ROLE_CHANNEL_KEYWORDS)
+            ]
+
+            # If no channels found by name, check recent message history in all channels
+            if not potential_channels:
+                potential_channels = guild.text_channels
+
+            for channel in potential_channels:
+                # Skip channels we can't read instead of spending a request on a 403
+                if not channel.permissions_for(guild.me).read_message_history:
+                    continue
+                if channel.id in known_channel_ids:
+                    known.append(channel)
+                else:
+                    others.append(channel)
+
+        return known + others
+
+    async def scan_all(self) -> Dict[int, int]:
+        """
+        Scans every candidate channel in every guild with bounded concurrency
+
+        Returns:
+            Dictionary mapping guild IDs to number of reconnected messages
+        """
+        channels = self._plan_channels()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = {}
+        guild_started = {}
+        guild_remaining = {}
+        started = time.perf_counter()
+
+        self.channels_total = len(channels)
+        self.channels_done = 0
+        for channel in channels:
+            guild_remaining[channel.guild.id] = guild_remaining.get(channel.guild.id, 0) + 1
+
+        progress_step = max(1, len(channels) // 10)
+
+        async def scan(channel):
+            async with semaphore:
+                guild_id = channel.guild.id
+                guild_started.setdefault(guild_id, time.perf_counter())
+
+                reconnected = await self.role_handler.scan_channel_roles(channel)
+                if reconnected > 0:
+                    results[guild_id] = results.get(guild_id, 0) + reconnected
+                    logger.info("Reconnected %d role messages in #%s", reconnected, channel.name)
+
+                guild_remaining[guild_id] -= 1
+                if guild_remaining[guild_id] == 0:
+                    self.guild_durations[guild_id] = time.perf_counter() - guild_started[guild_id]
+                    if guild_id in results:
+                        logger.info("Total reconnected messages in %s: %d", channel.guild.name, results[guild_id])
+
+                self.channels_done += 1
+                if self.channels_done % progress_step == 0 or self.channels_done == self.channels_total:
+                    logger.info("Scan progress: %d/%d channels", self.channels_done, self.channels_total)
+
+        await asyncio.gather(*(scan(channel) for channel in channels))
+
+        self.last_duration = time.perf_counter() - started
+        logger.info("Scanned %d channels in %.1fs", len(channels), self.last_duration)
+        return results
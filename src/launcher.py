@@ -0,0 +1,139 @@
+"""
+Cluster launcher for running the bot's shards across several worker processes
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+import discord
+
+# Workers always run as an AutoShardedBot; set before the bot modules read the config
+os.environ["SHARDED"] = "true"
+
+import config.config as config
+from handlers.cluster_status import read_cluster_status, format_cluster_status
+from utils.shard_utils import split_shards, format_shard_ids
+
+# Seconds to wait before restarting a worker that exited with an error
+RESTART_DELAY = 10
+
+async def fetch_recommended_shards(token: str) -> int:
+    """
+    Asks Discord how many shards the bot should run
+
+    Args:
+        token: The bot token
+
+    Returns:
+        Recommended shard count
+    """
+    client = discord.Client(intents=discord.Intents.none())
+    try:
+        await client.login(token)
+        gateway = await client.http.get_bot_gateway()
+        return gateway[0]
+    finally:
+        await client.close()
+
+def run_worker(worker_id, shard_ids, shard_count):
+    """
+    Entry point of a worker process
+
+    Args:
+        worker_id: Worker number
+        shard_ids: Shards this worker runs
+        shard_count: Total number of shards
+    """
+    from main import run_bot
+    run_bot(shard_ids=shard_ids, shard_count=shard_count, worker_id=worker_id)
+
+def start_worker(worker_id, shard_ids, shard_count):
+    """
+    Starts a worker process
+
+    Returns:
+        The started process
+    """
+    process = multiprocessing.Process(
+        target=run_worker,
+        args=(worker_id, shard_ids, shard_count),
+        name=f"worker-{worker_id}"
+    )
+    process.start()
+    print(f"Started worker {worker_id} (pid {process.pid}) for shards {format_shard_ids(shard_ids)}")
+    return process
+
+def launch(workers, shard_count):
+    """
+    Splits the shards across worker processes and keeps them running
+
+    Args:
+        workers: Number of worker processes
+        shard_count: Total number of shards (None to use Discord's recommendation)
+    """
+    if not config.TOKEN:
+        print("Error: Bot token not found! Add DISCORD_TOKEN to your .env file.")
+        sys.exit(1)
+
+    if not shard_count:
+        shard_count = asyncio.run(fetch_recommended_shards(config.TOKEN))
+        print(f"Discord recommends {shard_count} shards")
+
+    shard_ranges = split_shards(shard_count, workers)
+    processes = {
+        worker_id: start_worker(worker_id, shard_ids, shard_count)
+        for worker_id, shard_ids in enumerate(shard_ranges)
+    }
+
+    try:
+        while True:
+            time.sleep(1)
+            for worker_id, process in list(processes.items()):
+                if process.is_alive():
+                    continue
+
+                if process.exitcode == 0:
+                    print(f"Worker {worker_id} shut down")
+                    del processes[worker_id]
+                    continue
+
+                print(f"Worker {worker_id} exited with code {process.exitcode}; restarting in {RESTART_DELAY}s")
+                time.sleep(RESTART_DELAY)
+                processes[worker_id] = start_worker(worker_id, shard_ranges[worker_id], shard_count)
+
+            if not processes:
+                break
+    except KeyboardInterrupt:
+        print("Shutting down workers...")
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join()
+
+def show_status():
+    """
+    Prints the combined status of every worker
+    """
+    statuses = read_cluster_status(config.STATUS_DIR)
+    if not statuses:
+        print(f"No worker status found in {config.STATUS_DIR}")
+        return
+
+    print(format_cluster_status(statuses, stale_after=config.STATUS_INTERVAL * 3))
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the role bot's shards across worker processes")
+    parser.add_argument("command", nargs="?", choices=["run", "status"], default="run")
+    parser.add_argument("--workers", type=int, default=config.CLUSTER_WORKERS, help="number of worker processes")
+    parser.add_argument("--shards", type=int, default=config.SHARD_COUNT, help="total shard count")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        show_status()
+    else:
+        launch(args.workers, args.shards)
+
+if __name__ == "__main__":
+    main()
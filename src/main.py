@@ -8,59 +8,180 @@ import discord
 from discord.ext import commands
 import config.config as config
 from handlers.role_handler import RoleHandler
+from handlers.cluster_status import ClusterStatus
+from handlers.role_picker import RoleSelect, RoleClearButton
+from utils.metrics import metrics, MetricsServer, Gauge, CounterCallback
+from utils.log_pipeline import setup_logging
+from utils.perf import perf, LoopMonitor
 import logging
 import datetime
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('bot.log', encoding='utf-8')
-    ]
-)
-
-class RoleManagementBot(commands.Bot):
+# One gateway connection per process, or Discord's sharding handled by discord.py
+BotBase = commands.AutoShardedBot if config.SHARDED else commands.Bot
+
+class RoleManagementBot(BotBase):
     """
     Main bot class that handles initialization and event processing
     """
-    def __init__(self):
+    def __init__(self, shard_ids=None, shard_count=None, worker_id=0):
         # Set up required intents
         try:
             intents = discord.Intents.default()
-            intents.message_content = True  # Privileged intent
+            intents.message_content = config.PREFIX_COMMANDS  # Privileged intent, only needed for prefix commands
             intents.members = True          # Privileged intent
             intents.reactions = True
 
+            if not config.PREFIX_COMMANDS:
+                # Slash commands arrive as interactions; skip every message event
+                intents.messages = False
+
+            options = {}
+            if config.LOW_MEMORY_MODE:
+                # Members are resolved per reaction instead of cached for every guild
+                options["chunk_guilds_at_startup"] = False
+                options["member_cache_flags"] = discord.MemberCacheFlags.none()
+
+            if config.SHARDED:
+                options["shard_ids"] = shard_ids or config.SHARD_IDS
+                options["shard_count"] = shard_count or config.SHARD_COUNT
+
             super().__init__(
                 command_prefix=commands.when_mentioned_or(config.PREFIX),
                 intents=intents,
-                help_command=None
+                help_command=None,
+                **options
             )
 
+            self.worker_id = worker_id
             self.role_handler = RoleHandler(self)
+            self.cluster_status = ClusterStatus(self, config.STATUS_DIR, config.STATUS_INTERVAL, worker_id)
+            self.loop_monitor = None
+            if config.LOOP_MONITOR_INTERVAL > 0:
+                self.loop_monitor = LoopMonitor(config.LOOP_MONITOR_INTERVAL, config.LOOP_STALL_THRESHOLD)
             self.last_reconnect_time = None
             self.reconnect_attempts = 0
+            self.total_reconnects = 0
+
+            self.metrics_server = None
+            if config.METRICS_PORT:
+                self.metrics_server = MetricsServer(metrics, config.METRICS_HOST, config.METRICS_PORT + worker_id)
+                self.register_metrics()
 
         except Exception as e:
             logging.error("Error initializing bot: %s", str(e))
             raise
 
+    def register_metrics(self):
+        """
+        Registers the gauges and counters read from the bot's state at scrape time
+        """
+        handler = self.role_handler
+        rest = handler.rest
+
+        metrics.register(CounterCallback(
+            "rolebot_rest_requests_total", "REST requests sent through the scheduler per route", ("route",),
+            callback=lambda: {(route,): count for route, count in rest.calls.items()}
+        ))
+        metrics.register(CounterCallback(
+            "rolebot_rest_rate_limited_total", "429 responses received per Discord route", ("route",),
+            callback=lambda: {(route,): count for route, count in rest.rate_limited.items()}
+        ))
+        metrics.register(Gauge(
+            "rolebot_pending_role_edits", "Members with role changes waiting to be flushed",
+            callback=lambda: {(): handler.role_edits.pending_count}
+        ))
+        metrics.register(Gauge(
+            "rolebot_reaction_queue_depth", "Reaction events waiting for a worker",
+            callback=lambda: {(): handler.reaction_queue.depth}
+        ))
+        metrics.register(Gauge(
+            "rolebot_reaction_queue_max_guild_depth", "Reaction events waiting in the fullest guild queue",
+            callback=lambda: {(): max(handler.reaction_queue.guild_depths().values(), default=0)}
+        ))
+        metrics.register(Gauge(
+            "rolebot_reaction_workers_busy", "Reaction workers handling an event",
+            callback=lambda: {(): handler.reaction_queue.busy}
+        ))
+        metrics.register(Gauge(
+            "rolebot_scan_duration_seconds", "Time the last history scan spent on each guild", ("guild",),
+            callback=lambda: {(guild_id,): duration for guild_id, duration in handler.scan_scheduler.guild_durations.items()}
+        ))
+        metrics.register(Gauge(
+            "rolebot_registered_messages", "Role messages in the registry",
+            callback=lambda: {(): len(handler.role_messages)}
+        ))
+        metrics.register(Gauge(
+            "rolebot_gateway_latency_seconds", "Gateway heartbeat latency per shard", ("shard",),
+            callback=lambda: {
+                (shard,): latency
+                for shard, latency in (getattr(self, "latencies", None) or [(0, self.latency)])
+                if latency == latency  # NaN until the first heartbeat
+            }
+        ))
+        metrics.register(CounterCallback(
+            "rolebot_reconnects_total", "Gateway disconnects since the bot started",
+            callback=lambda: {(): self.total_reconnects}
+        ))
+        if self.loop_monitor:
+            metrics.register(CounterCallback(
+                "rolebot_event_loop_stalls_total", "Times the event loop was blocked longer than LOOP_STALL_THRESHOLD",
+                callback=lambda: {(): self.loop_monitor.stalls}
+            ))
+
     async def setup_hook(self):
         """
         Loads all commands when the bot starts
         """
         try:
+            # Restore role messages recorded by previous runs
+            loaded = self.role_handler.load_registry()
+            logging.info('Loaded %d role messages from the registry', loaded)
+
+            # Handle reactions with a bounded worker pool
+            self.role_handler.reaction_queue.start()
+
+            # Route clicks on every component role picker, including ones posted before this run
+            self.add_dynamic_items(RoleSelect, RoleClearButton)
+
+            # Share this process's health with the launcher's status view
+            self.cluster_status.start()
+
+            # Split handler time into REST and local work, and watch for a blocked loop
+            perf.instrument_http(self.http)
+            if self.loop_monitor:
+                self.loop_monitor.start()
+
+            if self.metrics_server:
+                await self.metrics_server.start()
+
             # Load all command modules
             for filename in os.listdir('./src/commands'):
                 if filename.endswith('.py'):
                     await self.load_extension(f'commands.{filename[:-3]}')
                     logging.info('Loaded command module: %s', filename[:-3])
+
+            # Launcher workers share one application; only the first registers the commands
+            if config.SYNC_COMMANDS and self.worker_id == 0:
+                await self.sync_commands()
         except Exception as e:
             logging.error("Error loading extensions: %s", str(e))
             raise
 
+    async def sync_commands(self):
+        """
+        Registers the slash commands with Discord
+
+        With SERVER_ID set they are copied to that server, where they update
+        instantly; otherwise they are registered globally.
+        """
+        if config.SERVER_ID:
+            guild = discord.Object(id=config.SERVER_ID)
+            self.tree.copy_global_to(guild=guild)
+            synced = await self.tree.sync(guild=guild)
+        else:
+            synced = await self.tree.sync()
+        logging.info('Synced %d slash commands', len(synced))
+
     async def on_ready(self):
         """
         Called when the bot is ready and connected to Discord
@@ -79,19 +200,39 @@ class RoleManagementBot(commands.Bot):
                 )
             )
 
-            # Auto-scan for role messages
-            logging.info("Scanning for existing role messages...")
-            results = await self.role_handler.auto_scan_all_guilds()
+            # Verify the registry (and optionally scan history) without blocking reactions;
+            # this only runs on the first ready of the session
+            self.role_handler.scan_scheduler.schedule_startup(config.STARTUP_HISTORY_SCAN)
 
-            total_reconnected = sum(results.values())
-            if (total_reconnected > 0):
-                logging.info(f"✅ Successfully reconnected {total_reconnected} role messages across {len(results)} servers!")
-            else:
-                logging.info("No existing role messages found to reconnect.")
+            # Pick up bulk role jobs a previous run didn't finish
+            resumed = self.role_handler.bulk_jobs.resume()
+            if resumed:
+                logging.info('Resumed %d bulk role jobs', resumed)
+
+            # Repair roles for reactions added or removed while the bot was offline
+            if config.RECONCILE_ON_READY:
+                self.role_handler.reconciler.schedule(
+                    prune=config.RECONCILE_PRUNE,
+                    after=self.role_handler.scan_scheduler.task
+                )
 
         except Exception as e:
             logging.error(f"Error during startup: {e}")
 
+    async def close(self):
+        """
+        Flushes pending role changes before shutting down
+        """
+        await self.role_handler.reaction_queue.stop()
+        await self.role_handler.bulk_jobs.stop()
+        await self.role_handler.role_edits.flush_all()
+        self.cluster_status.stop()
+        if self.loop_monitor:
+            self.loop_monitor.stop()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        await super().close()
+
     async def on_connect(self):
         """Called when the bot connects to Discord"""
         logging.info("Bot connected to Discord!")
@@ -100,6 +241,7 @@ class RoleManagementBot(commands.Bot):
         """Called when the bot disconnects from Discord"""
         logging.warning("Bot disconnected from Discord. Will attempt to reconnect...")
         self.reconnect_attempts += 1
+        self.total_reconnects += 1
 
     async def on_resumed(self):
         """Called when the bot resumes a session"""
@@ -127,23 +269,48 @@ def check_intents():
     print("3. Go to the 'Bot' section")
     print("4. Enable the following Privileged Gateway Intents:")
     print("   - SERVER MEMBERS INTENT")
-    print("   - MESSAGE CONTENT INTENT")
+    if config.PREFIX_COMMANDS:
+        print("   - MESSAGE CONTENT INTENT (or set PREFIX_COMMANDS=false to use slash commands only)")
     print("\nAfter enabling the intents, restart the bot.")
 
-if __name__ == "__main__":
+def run_bot(shard_ids=None, shard_count=None, worker_id=0):
+    """
+    Creates the bot and runs it until it shuts down
+
+    Args:
+        shard_ids: Shards this process runs (sharded mode only)
+        shard_count: Total number of shards (sharded mode only)
+        worker_id: Worker number assigned by the launcher
+    """
+    # Log through a background writer so disk I/O never blocks the event loop
+    setup_logging(
+        config.LOG_FILE,
+        level=config.LOG_LEVEL,
+        max_bytes=config.LOG_MAX_BYTES,
+        rotate_interval=config.LOG_ROTATE_HOURS * 3600,
+        backup_count=config.LOG_BACKUPS,
+        sample_window=config.LOG_SAMPLE_WINDOW,
+        sample_burst=config.LOG_SAMPLE_BURST,
+        sample_rate=config.LOG_SAMPLE_RATE,
+        worker_id=worker_id
+    )
+
     try:
         # Check if token is configured
         check_token()
 
         # Create bot instance
-        bot = RoleManagementBot()
+        bot = RoleManagementBot(shard_ids=shard_ids, shard_count=shard_count, worker_id=worker_id)
 
-        # Start the bot
-        bot.run(config.TOKEN)
+        # Start the bot; discord.py logs through the pipeline instead of its own handler
+        bot.run(config.TOKEN, log_handler=None)
     except discord.errors.PrivilegedIntentsRequired:
         print("\nError: Privileged Intents are not enabled!")
         check_intents()
         sys.exit(1)
     except Exception as e:
-        print(f"Error starting bot: {e}")
+        logging.exception("Error starting bot: %s", e)
         sys.exit(1)
+
+if __name__ == "__main__":
+    run_bot()
@@ -0,0 +1,118 @@
+"""
+Command line entry for provisioning roles and role messages across many servers
+
+Runs a fleet job with a light client that only connects to read the guild
+list, so it can run next to the main bot. Role messages it posts are
+recorded in the shared registry; the main bot picks them up after a restart
+or !scan_roles.
+"""
+import argparse
+import logging
+import sys
+import discord
+import config.config as config
+from handlers.role_handler import RoleHandler
+from utils.log_pipeline import setup_logging
+from main import check_token
+
+
+class ProvisionClient(discord.AutoShardedClient):
+    """
+    Client that runs one fleet job, or retries one, and then disconnects
+    """
+    def __init__(self, args):
+        # Guilds and their roles and channels are all a fleet job needs; sharded
+        # so it can see every guild of a bot too large for one connection
+        super().__init__(
+            intents=discord.Intents(guilds=True),
+            chunk_guilds_at_startup=False,
+            member_cache_flags=discord.MemberCacheFlags.none()
+        )
+        self.args = args
+        self.role_handler = RoleHandler(self)
+        self.job = None
+        self.error = None
+        self._started = False
+
+    async def setup_hook(self):
+        # Categories that already have a role message are skipped when posting
+        self.role_handler.load_registry()
+
+    async def on_ready(self):
+        if self._started:
+            return
+        self._started = True
+
+        try:
+            fleet = self.role_handler.fleet
+            if self.args.retry is not None:
+                self.job = await fleet.retry(self.args.retry or None)
+                if self.job is None:
+                    self.error = "No such fleet job"
+            else:
+                guild_ids = fleet.select_guilds(self.args.guilds)
+                print(f"Provisioning {len(guild_ids)} servers...")
+                self.job = await fleet.start(guild_ids, self.args.channel, self.args.mode)
+        except ValueError as e:
+            self.error = str(e)
+        finally:
+            await self.close()
+
+def print_job(job):
+    """
+    Prints a fleet job's totals and result table
+    """
+    print(job.summary())
+    print("\n".join(job.table_lines()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Provision the role catalog's roles and role messages across servers")
+    parser.add_argument("--guilds", default="all", help="'all', or server IDs separated by commas")
+    parser.add_argument("--channel", help="name of the channel to post missing role messages in; roles only if omitted")
+    parser.add_argument("--mode", choices=["reactions", "components"], help="how members pick roles on posted messages")
+    parser.add_argument("--retry", nargs="?", type=int, const=0, metavar="JOB", help="retry the failed servers of a job (default: latest)")
+    parser.add_argument("--status", nargs="?", type=int, const=0, metavar="JOB", help="show a job's results (default: latest) without connecting")
+    args = parser.parse_args()
+
+    if args.status is not None:
+        # Read straight from the journal; no need to log in
+        client = discord.Client(intents=discord.Intents.none())
+        job = RoleHandler(client).fleet.load(args.status or None)
+        if job is None:
+            print("No such fleet job")
+            sys.exit(1)
+        print_job(job)
+        return
+
+    setup_logging(
+        config.LOG_FILE,
+        level=config.LOG_LEVEL,
+        max_bytes=config.LOG_MAX_BYTES,
+        rotate_interval=config.LOG_ROTATE_HOURS * 3600,
+        backup_count=config.LOG_BACKUPS,
+        sample_window=config.LOG_SAMPLE_WINDOW,
+        sample_burst=config.LOG_SAMPLE_BURST,
+        sample_rate=config.LOG_SAMPLE_RATE
+    )
+    check_token()
+
+    client = ProvisionClient(args)
+    try:
+        client.run(config.TOKEN, log_handler=None)
+    except Exception as e:
+        logging.exception("Error running fleet job: %s", e)
+        sys.exit(1)
+
+    if client.error:
+        print(f"Error: {client.error}")
+        sys.exit(1)
+    if client.job is None:
+        sys.exit(1)
+
+    print_job(client.job)
+    if client.job.count("done") < len(client.job.guilds):
+        print(f"Run `python src/provision.py --retry {client.job.job_id}` to retry the servers that didn't finish")
+        sys.exit(2)
+
+if __name__ == "__main__":
+    main()
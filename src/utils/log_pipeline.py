@@ -0,0 +1,226 @@
+"""
+Logging pipeline that keeps disk writes off the event loop
+
+Records are put on a queue by the thread that logs them and written by a
+background thread: JSON lines to a rotating file and plain text to stdout.
+"""
+import atexit
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+# Extra record attributes copied into every JSON line when set
+CONTEXT_FIELDS = ("event", "guild_id", "channel_id", "member_id", "message_id", "role_id")
+
+# Sampling keys tracked before stale ones are dropped
+MAX_SAMPLING_KEYS = 1000
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line
+
+    Context passed with extra={"guild_id": ...} becomes a field of its own,
+    so logs can be filtered by guild, channel, member or event.
+    """
+    def __init__(self, worker_id: int = 0):
+        super().__init__()
+        self.worker_id = worker_id
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "worker": self.worker_id,
+        }
+
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Thins out a message that repeats many times within a short window
+
+    Each message (its event field, or its format string) may be logged
+    `burst` times per window; after that only every `rate`-th record gets
+    through, carrying the number of records dropped since the last one.
+    Errors are never sampled.
+    """
+    def __init__(self, window: float, burst: int, rate: int):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.rate = rate
+        self._seen = {}  # key -> [window start, records this window, records dropped]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0 or record.levelno >= logging.ERROR:
+            return True
+
+        key = (record.name, getattr(record, "event", None) or record.msg)
+        now = record.created
+        state = self._seen.get(key)
+
+        if state is None or now - state[0] >= self.window:
+            if state is None and len(self._seen) >= MAX_SAMPLING_KEYS:
+                self._forget_stale(now)
+            # Drops from the last window are reported by the next record that gets through
+            state = self._seen[key] = [now, 0, state[2] if state else 0]
+
+        state[1] += 1
+        if state[1] > self.burst and (self.rate <= 0 or state[1] % self.rate):
+            state[2] += 1
+            return False
+
+        record.suppressed, state[2] = state[2], 0
+        return True
+
+    def _forget_stale(self, now: float):
+        for key, state in list(self._seen.items()):
+            if now - state[0] >= self.window:
+                del self._seen[key]
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that keeps the traceback apart from the message
+
+    The stock handler folds the traceback into the message text; keeping it
+    in exc_text lets the JSON formatter give it a field of its own.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self.formatter.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotating file handler that also rolls over when the file gets too old
+    """
+    def __init__(self, filename: str, max_bytes: int, interval: float, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.interval = interval
+        self.rollover_at = time.time() + interval if interval > 0 else None
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.interval > 0:
+            self.rollover_at = time.time() + self.interval
+
+
+def worker_log_path(path: str, worker_id: int) -> str:
+    """
+    Gives each launcher worker its own log file, since rotation isn't safe across processes
+
+    Args:
+        path: Configured log file path
+        worker_id: Worker number assigned by the launcher
+
+    Returns:
+        The path unchanged for worker 0, otherwise with the worker number added
+    """
+    if not worker_id:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.worker{worker_id}{ext}"
+
+
+def setup_logging(
+    path: str,
+    level: str = "INFO",
+    max_bytes: int = 0,
+    rotate_interval: float = 0,
+    backup_count: int = 5,
+    sample_window: float = 10,
+    sample_burst: int = 0,
+    sample_rate: int = 0,
+    worker_id: int = 0
+) -> logging.handlers.QueueListener:
+    """
+    Routes the root logger through a queue to a background writer thread
+
+    Args:
+        path: JSON log file (empty to log to stdout only)
+        level: Root log level
+        max_bytes: Rotate the file once it reaches this size (0 disables)
+        rotate_interval: Rotate the file after this many seconds (0 disables)
+        backup_count: Rotated files to keep
+        sample_window: Seconds over which repeated messages are counted
+        sample_burst: Times a message is logged per window before sampling (0 disables sampling)
+        sample_rate: Keep one in this many records of a sampled message (0 drops them all)
+        worker_id: Worker number, added to every line and to the file name
+
+    Returns:
+        The started queue listener; it is stopped and flushed at exit
+    """
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
+    handlers = [console]
+
+    if path:
+        path = worker_log_path(path, worker_id)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        file_handler = SizeAndTimeRotatingFileHandler(path, max_bytes, rotate_interval, backup_count)
+        file_handler.setFormatter(JsonFormatter(worker_id))
+        handlers.append(file_handler)
+
+    # Logging threads only format the message and enqueue it; the listener does the I/O
+    log_queue = queue.SimpleQueue()
+    queue_handler = LogQueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter())
+    if sample_burst > 0:
+        queue_handler.addFilter(SamplingFilter(sample_window, sample_burst, sample_rate))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    def stop():
+        # The listener may already have been stopped by its owner
+        if listener._thread is not None:
+            listener.stop()
+
+    atexit.register(stop)
+    return listener
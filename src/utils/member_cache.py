@@ -0,0 +1,82 @@
+"""
+Bounded LRU/TTL cache for members fetched on demand
+"""
+import time
+from collections import OrderedDict
+from typing import Optional
+import discord
+
+
+class MemberCache:
+    """
+    Keeps recently seen members, evicting the least recently used past max_size
+
+    Used in low-memory mode, where discord.py doesn't cache members, so memory
+    grows with the number of active reactors instead of total guild size.
+    Entries expire after ttl seconds so stale role lists aren't reused for long.
+    """
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (guild_id, member_id) -> (member, expires_at)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, guild_id: int, member_id: int) -> Optional[discord.Member]:
+        """
+        Looks up a member
+
+        Args:
+            guild_id: ID of the guild
+            member_id: ID of the member
+
+        Returns:
+            The cached member, or None if missing or expired
+        """
+        key = (guild_id, member_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        member, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return member
+
+    def put(self, member: discord.Member):
+        """
+        Stores (or refreshes) a member
+
+        Args:
+            member: The member to cache
+        """
+        key = (member.guild.id, member.id)
+        self._entries[key] = (member, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def remove(self, guild_id: int, member_id: int):
+        """
+        Drops a member, e.g. when they leave the guild
+
+        Args:
+            guild_id: ID of the guild
+            member_id: ID of the member
+        """
+        self._entries.pop((guild_id, member_id), None)
+
+    def clear_guild(self, guild_id: int):
+        """
+        Drops every member of a guild
+
+        Args:
+            guild_id: ID of the guild
+        """
+        for key in [key for key in self._entries if key[0] == guild_id]:
+            del self._entries[key]
@@ -0,0 +1,316 @@
+"""
+Handler timing, split into REST and local time, and event loop lag monitoring
+"""
+import asyncio
+import collections
+import contextlib
+import contextvars
+import functools
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional
+from config.config import PERF_SAMPLES
+from utils.metrics import metrics, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Buckets in seconds for handler and loop lag timings, which are mostly well under a second
+TIMING_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+handler_duration = metrics.register(Histogram(
+    "rolebot_handler_seconds", "Wall time of each handler call", ("handler",), buckets=TIMING_BUCKETS
+))
+handler_rest_duration = metrics.register(Histogram(
+    "rolebot_handler_rest_seconds", "Time each handler call spent waiting on REST requests", ("handler",),
+    buckets=TIMING_BUCKETS
+))
+loop_lag = metrics.register(Histogram(
+    "rolebot_event_loop_lag_seconds", "How late the event loop woke up the lag monitor", buckets=TIMING_BUCKETS
+))
+
+_current_span = contextvars.ContextVar("perf_span", default=None)
+_in_rest = contextvars.ContextVar("perf_in_rest", default=False)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of a sorted list
+
+    Args:
+        values: Sorted values
+        fraction: Percentile between 0 and 1
+
+    Returns:
+        The percentile, or 0 for an empty list
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Span:
+    """
+    One running handler call and the REST time spent inside it
+    """
+    __slots__ = ("name", "parent", "started", "rest")
+
+    def __init__(self, name: str, parent: Optional["Span"]):
+        self.name = name
+        self.parent = parent  # Enclosing handler call, which shares this call's REST time
+        self.started = time.perf_counter()
+        self.rest = 0.0
+
+
+class HandlerStats:
+    """
+    Recent timings of one handler
+    """
+    def __init__(self, max_samples: int):
+        self.calls = 0
+        self.errors = 0
+        self.samples = collections.deque(maxlen=max_samples)  # (wall seconds, REST seconds)
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Percentiles of the recent samples
+
+        Returns:
+            calls, errors and p50/p95/p99 wall time, p50/p95 REST time and the REST share of the total
+        """
+        walls = sorted(wall for wall, rest in self.samples)
+        rests = sorted(rest for wall, rest in self.samples)
+        total_wall = sum(walls)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "p50": percentile(walls, 0.5),
+            "p95": percentile(walls, 0.95),
+            "p99": percentile(walls, 0.99),
+            "rest_p50": percentile(rests, 0.5),
+            "rest_p95": percentile(rests, 0.95),
+            "rest_share": sum(rests) / total_wall if total_wall else 0.0,
+        }
+
+
+class PerfTracker:
+    """
+    Records how long handlers take and how much of that is REST
+
+    Handler calls are tracked with a context variable, so REST requests made
+    anywhere below a handler, including nested handlers, are charged to it.
+    Tasks started by a handler inherit the context too; REST they do after
+    the handler finishes is not counted.
+    """
+    def __init__(self, max_samples: int = PERF_SAMPLES):
+        self.max_samples = max_samples
+        self.handlers = {}  # handler name -> HandlerStats
+
+    def start(self, name: str):
+        """
+        Starts timing a handler call
+
+        Args:
+            name: Handler name
+
+        Returns:
+            Token to pass to finish()
+        """
+        span = Span(name, _current_span.get())
+        return span, _current_span.set(span)
+
+    def finish(self, token, failed: bool = False):
+        """
+        Stops timing a handler call and records it
+
+        Args:
+            token: Token returned by start()
+            failed: Whether the handler raised
+        """
+        span, context_token = token
+        _current_span.reset(context_token)
+        wall = time.perf_counter() - span.started
+
+        stats = self.handlers.get(span.name)
+        if stats is None:
+            stats = self.handlers[span.name] = HandlerStats(self.max_samples)
+        stats.calls += 1
+        if failed:
+            stats.errors += 1
+        stats.samples.append((wall, span.rest))
+
+        handler_duration.observe(wall, span.name)
+        handler_rest_duration.observe(span.rest, span.name)
+
+    def timed(self, name: Optional[str] = None):
+        """
+        Decorator that times every call of a coroutine function
+
+        Args:
+            name: Handler name (defaults to the function's qualified name)
+        """
+        def decorate(func):
+            label = name or func.__qualname__
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                token = self.start(label)
+                failed = True
+                try:
+                    result = await func(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    self.finish(token, failed)
+
+            return wrapper
+
+        return decorate
+
+    @contextlib.contextmanager
+    def rest(self):
+        """
+        Charges the time spent in the block to the running handler calls as REST time
+
+        Nested blocks are only counted once.
+        """
+        span = _current_span.get()
+        if span is None or _in_rest.get():
+            yield
+            return
+
+        token = _in_rest.set(True)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            _in_rest.reset(token)
+            elapsed = time.perf_counter() - started
+            while span is not None:
+                span.rest += elapsed
+                span = span.parent
+
+    def instrument_http(self, http):
+        """
+        Counts every request of a discord.py HTTP client as REST time
+
+        Args:
+            http: The bot's HTTPClient
+        """
+        request = http.request
+
+        async def timed_request(*args, **kwargs):
+            with self.rest():
+                return await request(*args, **kwargs)
+
+        http.request = timed_request
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Percentiles of every handler that has run, slowest p95 first
+        """
+        summaries = {name: stats.summary() for name, stats in self.handlers.items()}
+        return dict(sorted(summaries.items(), key=lambda item: item[1]["p95"], reverse=True))
+
+
+class LoopMonitor:
+    """
+    Measures event loop lag and logs where the loop is stuck when it stalls
+
+    A task on the loop records how late each of its wakeups is. A watchdog
+    thread notices when those wakeups stop, and logs the loop thread's stack
+    at the stall threshold and again each time the stall doubles.
+    """
+    def __init__(self, interval: float, stall_threshold: float):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0  # Stalls longer than the threshold
+        self.lags = collections.deque(maxlen=PERF_SAMPLES)
+        self._heartbeat = time.monotonic()
+        self._loop_thread = None
+        self._task = None
+        self._watchdog = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """
+        Starts monitoring the running event loop
+        """
+        if self._task is not None:
+            return
+
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._measure())
+
+        if self.stall_threshold > 0:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def stop(self):
+        """
+        Stops monitoring
+        """
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _measure(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+
+            lag = max(0.0, now - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.lags.append(lag)
+            loop_lag.observe(lag)
+
+    def _watch(self):
+        reported_beat = None
+        next_report = self.stall_threshold
+
+        while not self._stopped.wait(min(self.interval, self.stall_threshold)):
+            beat = self._heartbeat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.stall_threshold:
+                continue
+
+            if beat != reported_beat:
+                # A new stall
+                reported_beat = beat
+                next_report = self.stall_threshold
+                self.stalls += 1
+
+            if stalled >= next_report:
+                next_report *= 2
+                frame = sys._current_frames().get(self._loop_thread)
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else "unavailable"
+                logger.warning(
+                    "Event loop blocked for %.3fs; loop thread stack:\n%s", stalled, stack,
+                    extra={"event": "loop_blocked"}
+                )
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Percentiles of the recent lag samples
+        """
+        lags = sorted(self.lags)
+        return {
+            "p50": percentile(lags, 0.5),
+            "p99": percentile(lags, 0.99),
+            "max": self.max_lag,
+            "stalls": self.stalls,
+        }
+
+
+# Tracker shared by every module
+perf = PerfTracker()
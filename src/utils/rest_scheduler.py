@@ -0,0 +1,171 @@
+"""
+REST scheduler for pipelining Discord API calls by rate limit bucket
+"""
+import asyncio
+import logging
+import re
+from collections import Counter
+from urllib.parse import urlsplit
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Tuple
+import discord
+from config.config import REST_CONCURRENCY
+from utils.perf import perf
+
+logger = logging.getLogger(__name__)
+
+# Times a request is retried after a 429 that discord.py didn't absorb
+MAX_RATE_LIMIT_RETRIES = 3
+
+# Start of the warning discord.py logs for every 429 response, retried or not
+RATE_LIMITED_MESSAGE = "We are being rate limited."
+
+
+def discord_route(method: str, url: str) -> str:
+    """
+    Turns a request URL into its route, e.g. 'PATCH /guilds/{id}/members/{id}'
+
+    Emojis, tokens and IDs are replaced so every route gets one label.
+    """
+    path = re.sub(r"^/api/v\d+", "", urlsplit(url).path)
+    path = re.sub(r"/reactions/[^/]+", "/reactions/{emoji}", path)
+    path = re.sub(r"/(webhooks|interactions)/(\d+)/[^/]+", r"/\1/\2/{token}", path)
+    return f"{method} " + re.sub(r"\d{15,}", "{id}", path)
+
+
+class RateLimitCounter(logging.Handler):
+    """
+    Counts the 429 responses discord.py logs, per route
+
+    discord.py waits out most rate limits inside the request and only logs
+    them, so the scheduler never sees them as errors.
+    """
+    def __init__(self, counts: Counter):
+        super().__init__(logging.WARNING)
+        self.counts = counts
+
+    def emit(self, record: logging.LogRecord):
+        if isinstance(record.msg, str) and record.msg.startswith(RATE_LIMITED_MESSAGE) and len(record.args) >= 2:
+            self.counts[discord_route(*record.args[:2])] += 1
+
+
+class RestScheduler:
+    """
+    Schedules REST calls per Discord rate limit bucket
+
+    Discord limits most routes per "major parameter" (the channel for
+    reactions, the guild for role and member edits). Calls in the same bucket
+    run one after another, in submission order, with no padding sleeps;
+    discord.py's own limiter waits exactly as long as the bucket headers
+    require. Calls in different buckets run concurrently, up to
+    max_concurrency requests in flight.
+
+    Requests made through the scheduler are counted per route name. Every 429
+    discord.py receives, from any request, is counted per Discord route from
+    the warning it logs.
+    """
+    def __init__(self, max_concurrency: int = REST_CONCURRENCY):
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._buckets = {}  # (route, major_id) -> asyncio.Lock
+        self.calls = Counter()  # route name -> number of requests sent through the scheduler
+        self.rate_limited = Counter()  # Discord route -> number of 429 responses received
+        logging.getLogger("discord.http").addHandler(RateLimitCounter(self.rate_limited))
+
+    def _bucket(self, key: Tuple[str, Hashable]) -> asyncio.Lock:
+        lock = self._buckets.get(key)
+        if lock is None:
+            lock = self._buckets[key] = asyncio.Lock()
+        return lock
+
+    async def run(
+        self,
+        route: str,
+        major_id: Hashable,
+        func: Callable[..., Awaitable[Any]],
+        *args,
+        **kwargs
+    ) -> Any:
+        """
+        Runs a REST call in its rate limit bucket
+
+        Args:
+            route: Name of the API route, e.g. 'add_reaction'
+            major_id: The bucket's major parameter (channel or guild ID)
+            func: Coroutine function that performs the request
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Whatever func returns
+        """
+        # Waiting for the bucket and for retries counts as REST time as well
+        with perf.rest():
+            async with self._bucket((route, major_id)):
+                for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+                    async with self._semaphore:
+                        self.calls[route] += 1
+                        try:
+                            return await func(*args, **kwargs)
+                        except discord.HTTPException as e:
+                            if e.status != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                                raise
+                            retry_after = float(e.response.headers.get("Retry-After", 1.0))
+
+                    logger.warning("Rate limited on %s, retrying in %.2fs", route, retry_after)
+                    await asyncio.sleep(retry_after)
+
+    async def add_reactions(self, message: discord.Message, emojis: Iterable[str]) -> List[bool]:
+        """
+        Adds reactions to a message in order, as fast as the channel's bucket allows
+
+        Args:
+            message: The message to react to
+            emojis: The emojis to add
+
+        Returns:
+            Success status for each emoji
+        """
+        results = []
+        for emoji in emojis:
+            try:
+                await self.run("add_reaction", message.channel.id, message.add_reaction, emoji)
+                results.append(True)
+            except discord.HTTPException as e:
+                logger.warning("Error adding reaction %s: %s", emoji, e)
+                results.append(False)
+        return results
+
+    async def create_role(self, guild: discord.Guild, **kwargs) -> discord.Role:
+        """
+        Creates a role in the guild's role bucket
+
+        Args:
+            guild: The guild to create the role in
+            **kwargs: Arguments for guild.create_role
+
+        Returns:
+            The created role
+        """
+        return await self.run("create_role", guild.id, guild.create_role, **kwargs)
+
+    async def edit_member(self, member: discord.Member, **kwargs) -> Any:
+        """
+        Edits a member in the guild's member bucket
+
+        Args:
+            member: The member to edit
+            **kwargs: Arguments for member.edit
+
+        Returns:
+            Whatever member.edit returns
+        """
+        return await self.run("edit_member", member.guild.id, member.edit, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Returns scheduler request counts per route name and 429 counts per Discord route
+        """
+        return {"calls": dict(self.calls), "rate_limited": dict(self.rate_limited)}
+
+
+# Scheduler shared by every module so all requests see the same buckets
+rest_scheduler = RestScheduler()
@@ -0,0 +1,112 @@
+"""
+Compact shadow of member roles for skipping role edits that would change nothing
+"""
+import bisect
+import time
+from array import array
+from collections import OrderedDict
+from typing import Iterable, Optional
+import discord
+from utils.metrics import metrics, Counter
+from utils.role_utils import member_role_ids
+
+noop_role_edits = metrics.register(Counter(
+    "rolebot_noop_role_edits_skipped_total",
+    "Role changes skipped because the member already had the requested roles",
+    ("source",)
+))
+
+
+class RoleShadow:
+    """
+    Remembers the role IDs of recently seen members as sorted 64-bit arrays
+
+    A member's roles are stored whole, from a payload member, a member update,
+    a fetch or an edit the bot made, so a member is either fully known or not
+    known at all. That takes a fraction of the memory of a cached Member, and
+    lets reaction removes be checked without fetching the member. Entries
+    expire after ttl seconds, which bounds how long a role change the bot
+    didn't see (possible when members aren't cached) can be missed.
+    """
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (guild_id, member_id) -> (sorted role ID array, expires_at)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def observe(self, member: discord.Member):
+        """
+        Records a member's current roles
+
+        Args:
+            member: A member with up to date roles
+        """
+        self.set_roles(member.guild.id, member.id, member_role_ids(member))
+
+    def set_roles(self, guild_id: int, member_id: int, role_ids: Iterable[int]):
+        """
+        Records the roles a member has
+
+        Args:
+            guild_id: ID of the guild
+            member_id: ID of the member
+            role_ids: IDs of every role the member has (excluding @everyone)
+        """
+        key = (guild_id, member_id)
+        self._entries[key] = (array("Q", sorted(role_ids)), time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def has_role(self, guild_id: int, member_id: int, role_id: int) -> Optional[bool]:
+        """
+        Checks whether a member has a role
+
+        Args:
+            guild_id: ID of the guild
+            member_id: ID of the member
+            role_id: ID of the role
+
+        Returns:
+            Whether the member has the role, or None if the member's roles aren't known
+        """
+        key = (guild_id, member_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        role_ids, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        index = bisect.bisect_left(role_ids, role_id)
+        return index < len(role_ids) and role_ids[index] == role_id
+
+    def roles(self, guild_id: int, member_id: int) -> Optional[array]:
+        """
+        Gets a member's remembered role IDs
+
+        Returns:
+            Sorted role IDs, or None if the member's roles aren't known
+        """
+        entry = self._entries.get((guild_id, member_id))
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    def forget(self, guild_id: int, member_id: int):
+        """
+        Forgets a member, e.g. after they leave the guild
+        """
+        self._entries.pop((guild_id, member_id), None)
+
+    def forget_guild(self, guild_id: int):
+        """
+        Forgets every member of a guild, e.g. after one of its roles is deleted
+        """
+        for key in [key for key in self._entries if key[0] == guild_id]:
+            del self._entries[key]
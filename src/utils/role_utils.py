@@ -3,79 +3,86 @@ Utility functions for role management
 """
 import discord
 import asyncio
-from typing import List, Dict, Any, Optional
+import logging
+from typing import List, Dict, Any, Iterable, Optional
+from utils.rest_scheduler import RestScheduler, rest_scheduler
+
+logger = logging.getLogger(__name__)
 
 async def batch_process_roles(
     guild: discord.Guild,
     role_names: List[str],
     color: discord.Color,
-    chunk_size: int = 5,
-    delay: float = 1.0
+    scheduler: Optional[RestScheduler] = None
 ) -> List[discord.Role]:
     """
-    Process role creation in batches to avoid rate limits
+    Create any missing roles, paced by the guild's rate limit bucket
 
     Args:
         guild: The guild to create roles in
         role_names: List of role names to create
         color: Color to apply to the roles
-        chunk_size: Number of roles to create per batch
-        delay: Delay between batches in seconds
+        scheduler: REST scheduler to send requests through (defaults to the shared one)
 
     Returns:
         List of created role objects
     """
-    created_roles = []
-
-    # Process in chunks to avoid rate limits
-    for i in range(0, len(role_names), chunk_size):
-        chunk = role_names[i:i + chunk_size]
-
-        # Create roles in this chunk
-        for role_name in chunk: 
-            existing_role = discord.utils.get(guild.roles, name=role_name)
-            if existing_role:
-                created_roles.append(existing_role)
-            else:
-                try:
-                    new_role = await guild.create_role(
-                        name=role_name,
-                        color=color,
-                        mentionable=True
-                    )
-                    created_roles.append(new_role)
-                except discord.HTTPException as e:
-                    print(f"Error creating role {role_name}: {e}")
-
-        # Wait between chunks to avoid rate limits
-        if i + chunk_size < len(role_names):
-            await asyncio.sleep(delay)
-
-    return created_roles
+    scheduler = scheduler or rest_scheduler
+    created_roles = [None] * len(role_names)
+
+    # Index existing roles once instead of scanning guild.roles for every name
+    existing_roles = {}
+    for role in guild.roles:
+        existing_roles.setdefault(role.name, role)
+
+    async def create(position, role_name):
+        try:
+            created_roles[position] = await scheduler.create_role(
+                guild,
+                name=role_name,
+                color=color,
+                mentionable=True
+            )
+        except discord.HTTPException as e:
+            logger.warning(
+                "Error creating role %s: %s", role_name, e,
+                extra={"event": "role_create_failed", "guild_id": guild.id}
+            )
+
+    pending = []
+    queued = set()
+    for position, role_name in enumerate(role_names):
+        existing_role = existing_roles.get(role_name)
+        if existing_role:
+            created_roles[position] = existing_role
+        elif role_name not in queued:
+            queued.add(role_name)
+            pending.append(create(position, role_name))
+
+    # Queue all creations at once; the scheduler sends them as fast as the bucket allows
+    await asyncio.gather(*pending)
+
+    return [role for role in created_roles if role is not None]
 
 async def safely_add_reaction(
     message: discord.Message,
     emoji: str,
-    delay: float = 0.5
+    scheduler: Optional[RestScheduler] = None
 ) -> bool:
     """
-    Safely add a reaction to a message with rate limiting consideration
+    Safely add a reaction to a message through the channel's rate limit bucket
 
     Args:
         message: The message to add reaction to
         emoji: The emoji to react with
-        delay: Delay after adding reaction
+        scheduler: REST scheduler to send the request through (defaults to the shared one)
 
     Returns:
         Success status as boolean
     """
-    try:
-        await message.add_reaction(emoji)
-        await asyncio.sleep(delay)
-        return True
-    except discord.HTTPException as e:
-        print(f"Error adding reaction {emoji}: {e}")
-        return False
+    scheduler = scheduler or rest_scheduler
+    results = await scheduler.add_reactions(message, [emoji])
+    return results[0]
 
 def build_role_embed(
     title: str,
@@ -136,3 +143,61 @@ async def get_or_fetch_channel(
             return None
 
     return channel
+
+def member_role_ids(member: discord.Member) -> Iterable[int]:
+    """
+    Get the IDs of a member's roles without building Role objects
+
+    Args:
+        member: The member
+
+    Returns:
+        Iterable of role IDs (excluding @everyone)
+    """
+    # Member.roles resolves and sorts Role objects on every call, which is
+    # far too slow for passes over every member of a large guild
+    role_ids = getattr(member, "_roles", None)
+    if role_ids is None:
+        return [role.id for role in member.roles[1:]]
+    return role_ids
+
+async def category_autocomplete(interaction: discord.Interaction, current: str) -> List[discord.app_commands.Choice[str]]:
+    """
+    Suggests the categories of the server's role catalog for slash command options
+
+    Args:
+        interaction: The autocomplete interaction
+        current: What the user has typed so far
+
+    Returns:
+        Up to 25 matching categories
+    """
+    catalog = interaction.client.role_handler.catalog_for(interaction.guild_id)
+    current = current.lower()
+    return [
+        discord.app_commands.Choice(name=category, value=category)
+        for category in catalog
+        if current in category.lower()
+    ][:25]
+
+async def role_autocomplete(interaction: discord.Interaction, current: str) -> List[discord.app_commands.Choice[str]]:
+    """
+    Suggests the role names of the server's role catalog for slash command options
+
+    Args:
+        interaction: The autocomplete interaction
+        current: What the user has typed so far
+
+    Returns:
+        Up to 25 matching role names
+    """
+    catalog = interaction.client.role_handler.catalog_for(interaction.guild_id)
+    current = current.lower()
+    role_names = dict.fromkeys(
+        role_name for category in catalog.categories.values() for role_name in category.roles.values()
+    )
+    return [
+        discord.app_commands.Choice(name=role_name, value=role_name)
+        for role_name in role_names
+        if current in role_name.lower()
+    ][:25]
@@ -0,0 +1,82 @@
+"""
+Utility functions for working with shards
+"""
+from typing import Any, List, Optional, Sequence
+
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """
+    Get the shard a guild is assigned to
+
+    Args:
+        guild_id: ID of the guild
+        shard_count: Total number of shards
+
+    Returns:
+        The shard ID
+    """
+    return (guild_id >> 22) % shard_count
+
+
+def owns_guild(bot: Any, guild_id: int) -> bool:
+    """
+    Check whether a guild belongs to one of the shards this process runs
+
+    Args:
+        bot: Bot instance
+        guild_id: ID of the guild
+
+    Returns:
+        True if this process is responsible for the guild
+    """
+    shard_ids = getattr(bot, "shard_ids", None)
+    shard_count = getattr(bot, "shard_count", None)
+
+    # An unsharded bot, or one running every shard, owns everything
+    if not shard_ids or not shard_count:
+        return True
+
+    return shard_for_guild(guild_id, shard_count) in shard_ids
+
+
+def split_shards(shard_count: int, workers: int) -> List[List[int]]:
+    """
+    Split shards into contiguous ranges, one per worker
+
+    Args:
+        shard_count: Total number of shards
+        workers: Number of worker processes
+
+    Returns:
+        List of shard ID lists; workers beyond shard_count get nothing to do and are dropped
+    """
+    workers = max(1, min(workers, shard_count))
+    per_worker, extra = divmod(shard_count, workers)
+
+    ranges = []
+    start = 0
+    for worker in range(workers):
+        size = per_worker + (1 if worker < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+
+    return ranges
+
+
+def format_shard_ids(shard_ids: Optional[Sequence[int]]) -> str:
+    """
+    Format shard IDs compactly, e.g. '0-3' or '4,6'
+
+    Args:
+        shard_ids: Shard IDs, or None for all shards
+
+    Returns:
+        Human readable description
+    """
+    if not shard_ids:
+        return "all"
+
+    shard_ids = sorted(shard_ids)
+    if shard_ids == list(range(shard_ids[0], shard_ids[-1] + 1)) and len(shard_ids) > 1:
+        return f"{shard_ids[0]}-{shard_ids[-1]}"
+    return ",".join(str(shard) for shard in shard_ids)